@@ -1,21 +1,29 @@
+import time
+
+# Startup timings are measured from here; see log_startup()
+_STARTED = time.perf_counter()
+
+import importlib
 import sys
 import sqlite3
-import configparser
 import os
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QLabel, 
     QVBoxLayout, QWidget, QFileDialog, QMessageBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 from PyQt5.QtGui import QIcon
-from customers_window import CustomersWindow  # Importing the Customers Window
-from options_window import OptionsWindow  # Importing the Options Window
 from pathlib import Path
 import traceback
+import logging
+import multiprocessing
 
-from config import DB_PATH, SETTINGS_FILE, LOG_FILE
-from db_utils import initialize_database
+from config import DB_PATH, LOG_FILE, APP_LOG_FILE
+from db_utils import initialize_database, close_connection
+from db_worker import get_db_worker
+import themes
+from windows import WindowManager
 
 
 # === CONFIGURATION ===
@@ -33,25 +41,54 @@ def log_uncaught_exceptions(ex_cls, ex, tb):
 sys.excepthook = log_uncaught_exceptions
 
 
+# === STARTUP ===
+# The Customers, Reports and Options windows (and NumPy, which order entry
+# prices with) are imported when first opened, or while the main menu sits
+# idle, so the main menu does not wait for them. reportlab is only ever loaded
+# by the invoice worker process.
+PRELOAD_MODULES = ("customers_window", "reports_window", "options_window")
+# How long the main menu is left alone before preloading starts
+PRELOAD_DELAY_MS = 500
+
+startup_logger = logging.getLogger("avon_hello.startup")
+
+
+def log_startup(stage):
+    """Log how long after launch a startup stage was reached."""
+    startup_logger.info("startup %s at %.0f ms", stage, (time.perf_counter() - _STARTED) * 1000)
+
+
+def preload_modules(modules=PRELOAD_MODULES):
+    """Import the window modules one per event loop pass, so clicks in between are still answered."""
+    if not modules:
+        log_startup("preload finished")
+        return
+    if modules[0] not in sys.modules:
+        started = time.perf_counter()
+        importlib.import_module(modules[0])
+        startup_logger.info("preloaded %s in %.0f ms", modules[0], (time.perf_counter() - started) * 1000)
+    QTimer.singleShot(0, lambda: preload_modules(modules[1:]))
+
+
+def shutdown_invoices():
+    """Stop the invoice worker process, if anything ever started it."""
+    invoices = sys.modules.get("invoices")
+    if invoices is not None:
+        invoices.shutdown()
+
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     if hasattr(sys, '_MEIPASS'):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
-
-def is_dark_mode_enabled():
-    config = configparser.ConfigParser()
-    if os.path.exists(SETTINGS_FILE):
-        config.read(SETTINGS_FILE)
-        return config.getboolean("Appearance", "dark_mode", fallback=False)
-    return False
-
 class MainMenu(QMainWindow):
     """Main Menu for Avon Hello."""
 
     def __init__(self):
         super().__init__()
+        self.setObjectName("mainMenu")  # themes.py styles the main menu by this name
         self.setWindowTitle("Avon Hello - Main Menu")
         self.setGeometry(200, 200, 600, 400)
         icon_path = resource_path("Avon256.ico")
@@ -60,94 +97,8 @@ class MainMenu(QMainWindow):
         # Set global font
         self.setFont(QFont("Segoe UI", 10))
 
-        # Apply global stylesheet
-        if is_dark_mode_enabled():
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #121212;
-                }
-
-                QLabel#titleLabel {
-                    font-size: 24px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #2f80ed;
-                    padding: 12px;
-                }
-
-                QLabel#dbLabel {
-                    background-color: #2d2d2d;
-                    border: 1px solid #444;
-                    padding: 8px;
-                    color: #e0e0e0;
-                    font-weight: 500;
-                }
-
-                QPushButton {
-                    background-color: #3a3f44;
-                    color: white;
-                    padding: 10px;
-                    font-size: 16px;
-                    border: 1px solid #555;
-                    border-radius: 5px;
-                }
-
-                QPushButton:hover {
-                    background-color: #50565c;
-                }
-
-                QPushButton#exitButton {
-                    background-color: #c0392b;
-                }
-
-                QPushButton#exitButton:hover {
-                    background-color: #96281b;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #f5f7fa;
-                }
-
-                QLabel#titleLabel {
-                    font-size: 24px;
-                    font-weight: bold;
-                    color: white;
-                    background-color: #2f80ed;
-                    padding: 12px;
-                }
-
-                QLabel#dbLabel {
-                    background-color: #fff3cd;
-                    border: 1px solid #ffeeba;
-                    padding: 8px;
-                    color: #856404;
-                    font-weight: 500;
-                }
-
-                QPushButton {
-                    background-color: #2d9cdb;
-                    color: white;
-                    padding: 10px;
-                    font-size: 16px;
-                    border: none;
-                    border-radius: 5px;
-                }
-
-                QPushButton:hover {
-                    background-color: #1b7fc3;
-                }
-
-                QPushButton#exitButton {
-                    background-color: #e74c3c;
-                }
-
-                QPushButton#exitButton:hover {
-                    background-color: #c0392b;
-                }
-            """)
-
+        # Windows are built once and shown again on later clicks
+        self.windows = WindowManager()
         self.init_ui()
 
     def init_ui(self):
@@ -169,10 +120,14 @@ class MainMenu(QMainWindow):
         btn_customers = QPushButton("Customers")
         btn_customers.clicked.connect(self.open_customers)
 
+        btn_reports = QPushButton("Reports")
+        btn_reports.clicked.connect(self.open_reports)
+
         btn_options = QPushButton("Options")
         btn_options.clicked.connect(self.open_options)
 
         layout.addWidget(btn_customers)
+        layout.addWidget(btn_reports)
         layout.addWidget(btn_options)
 
         # Exit Button
@@ -188,33 +143,59 @@ class MainMenu(QMainWindow):
 
     def open_customers(self):
         """Opens the Customers Management Window."""
-        self.customers_window = CustomersWindow()
-        self.customers_window.show()
+        from customers_window import CustomersWindow
+        self.windows.open(CustomersWindow)
+
+    def open_reports(self):
+        """Opens the Reports Window."""
+        from reports_window import ReportsWindow
+        self.windows.open(ReportsWindow)
 
     def open_options(self):
         """Opens the Options Window."""
-        self.options_window = OptionsWindow()
-        self.options_window.show()
+        from options_window import OptionsWindow
+        self.windows.open(OptionsWindow)
 
 if __name__ == "__main__":
+    # Invoice rendering uses worker processes; a frozen build must let them start
+    multiprocessing.freeze_support()
+
     import ctypes
     from PyQt5.QtGui import QIcon
     from db_utils import initialize_database  # ✅ Make sure this is imported
 
+    logging.basicConfig(
+        filename=APP_LOG_FILE,
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+    )
+
     # Taskbar icon fix
     app_id = "com.avon.hello"
     ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(app_id)
 
+    log_startup("imports done")
+
     # ✅ Initialize DB before doing anything else
     initialize_database()
+    log_startup("database ready")
 
     app = QApplication(sys.argv)
+    # Let queued saves finish before the connections go away
+    app.aboutToQuit.connect(lambda: get_db_worker().close())
+    app.aboutToQuit.connect(close_connection)
+    app.aboutToQuit.connect(shutdown_invoices)
 
     # Set the icon globally
     icon_path = resource_path("Avon256.ico")
     app.setWindowIcon(QIcon(icon_path))
+    # One stylesheet for every window, swapped in place when dark mode changes
+    themes.install()
 
     window = MainMenu()
     window.show()
+    # Fires once the event loop is running, i.e. the main menu is on screen
+    QTimer.singleShot(0, lambda: log_startup("main menu shown"))
+    QTimer.singleShot(PRELOAD_DELAY_MS, preload_modules)
     sys.exit(app.exec_())
 
@@ -0,0 +1,327 @@
+"""Performance benchmarks for Avon Hello.
+
+Runs against a throwaway database in a temporary folder, never your real data.
+
+    python benchmarks.py save            # order save path, 10/100/1000 lines
+    python benchmarks.py load            # order entry loading, 50/500/5000 lines
+    python benchmarks.py invoice         # invoice PDF rendering, 15/150 lines
+    python benchmarks.py reports         # campaign reports and balances over ten years of orders
+    python benchmarks.py catalog         # Product # lookups and completions, 20,000 products
+    python benchmarks.py startup         # launch to main menu, plus a python -X importtime breakdown
+"""
+import argparse
+import os
+import shutil
+import json
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# config.py builds its paths from %APPDATA%; point it somewhere disposable
+_BENCH_DIR = tempfile.mkdtemp(prefix="avon_hello_bench_")
+os.environ["APPDATA"] = _BENCH_DIR
+
+import db_utils  # noqa: E402  (must come after APPDATA is set)
+
+
+def _setup_database():
+    db_utils.initialize_database()
+    with db_utils.transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO customers (first_name, last_name, status)
+            VALUES ('Bench', 'Customer', 'Active')
+        """)
+        return cursor.lastrowid
+
+
+def _make_lines(count):
+    return [
+        (f"{10000 + i}", str(i % 120), f"Product {i}", "", "1.7 oz", 1 + i % 3,
+         4.99, 9.99, i % 2, 0.0, 4.99 * (1 + i % 3), 0, 0.0)
+        for i in range(count)
+    ]
+
+
+def _price_lines(lines):
+    from pricing import price_order
+
+    _, _, _, _, _, qty, unit_price, reg_price, tax, discount, _, processing, _ = zip(*lines)
+    return price_order(qty, unit_price, reg_price, discount, tax, processing)
+
+
+def _report(label, timings):
+    timings_ms = [t * 1000 for t in timings]
+    print(f"{label:<24} median {statistics.median(timings_ms):8.2f} ms"
+          f"   min {min(timings_ms):8.2f} ms   runs {len(timings_ms)}")
+
+
+def bench_save(repeat):
+    """Time insert_order() for orders of 10, 100 and 1000 lines."""
+    customer_id = _setup_database()
+    for size in (10, 100, 1000):
+        lines = _make_lines(size)
+        pricing = _price_lines(lines)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            db_utils.insert_order(customer_id, 2025, 1, pricing, lines)
+            timings.append(time.perf_counter() - started)
+        _report(f"save {size}-line order", timings)
+
+
+def bench_load(repeat):
+    """Time OrderEntryDialog.load_order_details() for orders of 50, 500 and 5000 lines, query included."""
+    from PyQt5.QtWidgets import QApplication
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    from customers_window import OrderEntryDialog
+    from db_worker import get_db_worker
+
+    customer_id = _setup_database()
+    for size in (50, 500, 5000):
+        lines = _make_lines(size)
+        order_id = db_utils.insert_order(customer_id, 2025, 1, _price_lines(lines), lines)
+        timings = []
+        for _ in range(repeat):
+            dialog = OrderEntryDialog(customer_id, 2025, 1)
+            started = time.perf_counter()
+            dialog.load_order_details(order_id)
+            get_db_worker().wait()  # query on the worker, then the table fill on this thread
+            app.processEvents()
+            timings.append(time.perf_counter() - started)
+            dialog.deleteLater()
+        _report(f"load {size}-line order", timings)
+    get_db_worker().close()
+
+
+def bench_invoice(repeat):
+    """Time render_invoice() for invoices of 15 and 150 lines; the first render also pays the one-off setup."""
+    from invoices import Invoice, render_invoice
+
+    rep_info = {
+        "rep_name": "Bench Rep", "rep_address": "1 Main St", "rep_office": "5550100100",
+        "rep_cell": "5550100101", "rep_email": "rep@example.com", "rep_website": "example.com",
+    }
+    filename = os.path.join(_BENCH_DIR, "invoice.pdf")
+    first = True
+    for size in (15, 150):
+        lines = [
+            (page, product_number, description, shade, qty, unit_price, reg_price, discount, tax, processing)
+            for product_number, page, description, shade, _, qty, unit_price, reg_price, tax, discount, _, processing, _
+            in _make_lines(size)
+        ]
+        invoice = Invoice("Bench Customer", "2 Side St", "5550100102", "", rep_info, 1,
+                          "Monday, January 6, 2025", lines)
+        if first:
+            started = time.perf_counter()
+            render_invoice(invoice, filename)
+            _report(f"first invoice ({size} lines)", [time.perf_counter() - started])
+            first = False
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render_invoice(invoice, filename)
+            timings.append(time.perf_counter() - started)
+        _report(f"invoice {size} lines", timings)
+
+
+def _seed_campaign_history(years=10, campaigns=26, orders_per_campaign=150, customers=400):
+    """Fill the database with years of orders (about 8 lines each), written in bulk."""
+    import random
+
+    from pricing import price_line, price_orders
+
+    rng = random.Random(1)
+    with db_utils.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO customers (first_name, last_name, status) VALUES (?, ?, 'Active')",
+            [(f"First{i}", f"Last{i}") for i in range(customers)],
+        )
+        cursor.execute("SELECT customer_id FROM customers")
+        customer_ids = [row[0] for row in cursor.fetchall()]
+
+        order_id = 0
+        orders, lines = [], []
+        for year in range(2025 - years + 1, 2026):
+            for campaign in range(1, campaigns + 1):
+                for _ in range(orders_per_campaign):
+                    order_id += 1
+                    orders.append([order_id, rng.choice(customer_ids), year, campaign])
+                    for _ in range(rng.randint(1, 15)):
+                        number = rng.randint(10000, 12999)
+                        qty, price = rng.randint(1, 3), rng.choice((3.99, 4.99, 9.99, 14.99))
+                        lines.append((order_id, str(number), f"Product {number}", qty, price, price + 5,
+                                       rng.random() < 0.6, rng.choice((0, 0, 0, 10, 25)), rng.random() < 0.1))
+
+        pricing = price_orders(*zip(*[(line[0], line[3], line[4], line[5], line[7], line[6], line[8])
+                                      for line in lines]))
+        cursor.executemany("""
+            INSERT INTO orders (order_id, customer_id, campaign_year, campaign_number, order_total, net_due,
+                                subtotal, discount_total, tax_total, processing_total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(*order, p.grand_total, p.grand_total, p.subtotal, p.discount_total, p.tax, p.processing)
+              for order in orders for p in (pricing[order[0]],)])
+        cursor.executemany("""
+            INSERT INTO order_products (order_id, product_number, description, qty, unit_price, reg_price,
+                                        tax, discount, processing, total_price, line_discount)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(*line, *price_line(line[3], line[4], line[5], line[7])) for line in lines])
+        # Most orders paid in full; the triggers post them to the balance ledger
+        cursor.execute("""
+            INSERT INTO payments (customer_id, order_id, amount)
+            SELECT customer_id, order_id, order_total FROM orders WHERE order_id % 5 != 0
+        """)
+    return len(orders), len(lines)
+
+
+def bench_reports(repeat):
+    """Time each report over ten years of campaigns (26 a year, 150 orders each)."""
+    import reports
+
+    db_utils.initialize_database()
+    orders, lines = _seed_campaign_history()
+    print(f"{orders} orders, {lines} lines")
+    cases = {
+        reports.CAMPAIGN: [("2025 campaign 12", (2025, 12))],
+        reports.YEAR: [("2025", (2025, None)), ("all years", (None, None))],
+        reports.ACCOUNT: [("all customers", ())],
+    }
+    for report in reports.REPORTS:
+        for label, args in cases[report.scope]:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                reports.run_report(report, *args)
+                timings.append(time.perf_counter() - started)
+            _report(f"{report.title.lower()}, {label}", timings)
+
+    timings = []
+    for customer_id in range(1, repeat + 1):
+        started = time.perf_counter()
+        db_utils.get_customer_balance(customer_id)
+        timings.append(time.perf_counter() - started)
+    _report("one customer's balance", timings)
+
+
+def bench_catalog(repeat):
+    """Time loading a 20,000-product catalog, then exact lookups and completions against it."""
+    import random
+
+    import catalog
+
+    db_utils.initialize_database()
+    rng = random.Random(1)
+    words = ["Skin", "So", "Soft", "Original", "Bath", "Oil", "Lipstick", "Matte", "Cream", "Lotion",
+             "Anew", "Vitale", "Mascara", "Glow", "Rose", "Velvet", "Body", "Wash", "Hand", "Serum"]
+    with db_utils.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO products (product_code, name, price, shade, size) VALUES (?, ?, ?, ?, ?)",
+            [(f"{100000 + i}", " ".join(rng.sample(words, 4)), rng.choice((3.99, 4.99, 9.99, 14.99)),
+              rng.choice(("", "Red", "Nude", "Plum")), rng.choice(("", "1.7 oz", "8.4 oz")))
+             for i in range(20000)],
+        )
+
+    started = time.perf_counter()
+    products = catalog.get_catalog()
+    _report(f"load {len(products)} products", [time.perf_counter() - started])
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        catalog.get_catalog()
+        timings.append(time.perf_counter() - started)
+    _report("cached catalog", timings)
+
+    for label, fn in (("lookup", lambda: products.lookup("112345")),
+                      ("complete '1'", lambda: products.complete("1")),
+                      ("complete '1123'", lambda: products.complete("1123")),
+                      ("complete 'ros'", lambda: products.complete("ros"))):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        _report(label, timings)
+
+
+# Modules the main menu should not wait for (see avon_hello.PRELOAD_MODULES)
+STARTUP_DEFERRED = ("customers_window", "reports_window", "options_window", "invoices", "numpy", "reportlab")
+# Imports cheaper than this are left out of the importtime breakdown
+IMPORTTIME_THRESHOLD_US = 2000
+
+# Run in a fresh interpreter: import avon_hello and show the main menu the way launching the app does
+_STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import avon_hello
+imported = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+avon_hello.initialize_database()
+app = QApplication(sys.argv)
+avon_hello.themes.install()
+window = avon_hello.MainMenu()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+print(json.dumps({"import": imported - started, "shown": shown - started,
+                  "loaded": [name for name in sys.argv[1:] if name in sys.modules]}))
+"""
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _run_startup_probe(*options):
+    result = subprocess.run(
+        [sys.executable, *options, "-c", _STARTUP_PROBE, *STARTUP_DEFERRED],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def bench_startup(repeat):
+    """Time launching to the main menu in fresh interpreters, then break the imports down like python -X importtime."""
+    db_utils.initialize_database()  # migrate once, so every run times an ordinary launch
+    runs = [_run_startup_probe()[0] for _ in range(repeat)]
+    _report("import avon_hello", [run["import"] for run in runs])
+    _report("main menu shown", [run["shown"] for run in runs])
+
+    timings, importtime = _run_startup_probe("-X", "importtime")
+    loaded = set(timings["loaded"])
+    print(f"deferred: {', '.join(name for name in STARTUP_DEFERRED if name not in loaded) or 'none'}")
+    print(f"loaded before the main menu: {', '.join(name for name in STARTUP_DEFERRED if name in loaded) or 'none'}")
+
+    print(f"\nimports over {IMPORTTIME_THRESHOLD_US / 1000:g} ms (microseconds, nested imports indented):")
+    print("import time: self [us] | cumulative | imported package")
+    for line in importtime.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and int(match.group(2)) >= IMPORTTIME_THRESHOLD_US:
+            print(line)
+
+
+BENCHMARKS = {
+    "save": bench_save,
+    "load": bench_load,
+    "invoice": bench_invoice,
+    "reports": bench_reports,
+    "catalog": bench_catalog,
+    "startup": bench_startup,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement (default 20)")
+    args = parser.parse_args(argv)
+
+    try:
+        BENCHMARKS[args.benchmark](args.repeat)
+    finally:
+        db_utils.close_connection()
+        shutil.rmtree(_BENCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Product catalog: an in-memory copy of the products table for order entry.
+
+Order entry looks a Product # up on every keystroke, so the catalog is read
+once into memory and kept in sorted lists that bisect narrows to a prefix in
+O(log n) - product codes, and every word-start of every product name. The
+triggers on products bump catalog_version whenever the catalog changes;
+get_catalog() reads that one row and reloads only when it has moved.
+"""
+import threading
+from bisect import bisect_left
+from operator import itemgetter
+
+from db_utils import get_connection
+
+# Most completions offered for one prefix
+COMPLETION_LIMIT = 50
+
+PRODUCT_COLUMNS = ("product_code", "name", "description", "price", "shade", "size")
+
+
+def _key(text):
+    return str(text).strip().casefold()
+
+
+class Product:
+    """One row of the products table."""
+
+    __slots__ = ("code", "name", "description", "price", "shade", "size")
+
+    def __init__(self, code, name, description="", price=0.0, shade="", size=""):
+        self.code = code
+        self.name = name
+        self.description = description or ""
+        self.price = price or 0.0
+        self.shade = shade or ""
+        self.size = size or ""
+
+    @property
+    def label(self):
+        """How the product is listed in the Product # completions."""
+        details = ", ".join(part for part in (self.shade, self.size) if part)
+        text = f"{self.code}  {self.name}"
+        if details:
+            text += f" ({details})"
+        return f"{text}  ${self.price:.2f}"
+
+
+class PrefixIndex:
+    """Sorted (key, value) pairs searched by key prefix."""
+
+    def __init__(self, pairs):
+        pairs = sorted(pairs, key=itemgetter(0))
+        self._keys = [key for key, _ in pairs]
+        self._values = [value for _, value in pairs]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, prefix, limit):
+        """Up to limit values whose key starts with prefix, in key order."""
+        matches = []
+        for i in range(bisect_left(self._keys, prefix), len(self._keys)):
+            if len(matches) == limit or not self._keys[i].startswith(prefix):
+                break
+            matches.append(self._values[i])
+        return matches
+
+
+def _word_starts(name):
+    """name from each word onwards, so a search can begin at any word."""
+    words = _key(name).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class Catalog:
+    """Every product, indexed by code and by name prefix."""
+
+    def __init__(self, products, version=0):
+        self.version = version
+        self._by_code = {_key(product.code): product for product in products}
+        self._codes = PrefixIndex(self._by_code.items())
+        self._names = PrefixIndex(
+            (start, product) for product in self._by_code.values() if product.name
+            for start in _word_starts(product.name)
+        )
+
+    def __len__(self):
+        return len(self._by_code)
+
+    def lookup(self, code):
+        """The product with exactly this code (case-insensitive), or None."""
+        return self._by_code.get(_key(code))
+
+    def complete(self, prefix, limit=COMPLETION_LIMIT):
+        """Products whose code, or a word of whose name, starts with prefix - codes first."""
+        prefix = _key(prefix)
+        if not prefix:
+            return []
+        matches = self._codes.search(prefix, limit)
+        if len(matches) < limit:
+            seen = {id(product) for product in matches}
+            # Names can match more than once (one entry per word), so ask for extra
+            for product in self._names.search(prefix, limit * 2):
+                if id(product) not in seen:
+                    seen.add(id(product))
+                    matches.append(product)
+                    if len(matches) == limit:
+                        break
+        return matches
+
+
+# === CACHE ===
+# One catalog per process, shared by every order entry dialog.
+
+_lock = threading.Lock()
+_catalog = None
+
+
+def get_catalog_version():
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT version FROM catalog_version")
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def load_catalog(version=None):
+    """Read every product into a new Catalog."""
+    if version is None:
+        version = get_catalog_version()
+    cursor = get_connection().cursor()
+    cursor.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM products")
+    return Catalog([Product(*row) for row in cursor.fetchall()], version)
+
+
+def get_catalog():
+    """The cached catalog, reloaded first if products changed since it was read (runs on DbWorker)."""
+    global _catalog
+    version = get_catalog_version()
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            _catalog = load_catalog(version)
+        return _catalog
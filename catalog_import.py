@@ -0,0 +1,218 @@
+"""Brochure price lists into the products table.
+
+Rows are read one at a time and written in executemany batches inside a
+single transaction, so a 50,000-line catalog imports in seconds without ever
+being held in memory. Products are upserted on product_code: new codes are
+added, changed ones updated, identical ones left alone.
+
+Files are CSV (any common delimiter, header row required), JSON Lines (one
+object per line; .jsonl/.ndjson) or JSON (an array of objects, or
+{"products": [...]}; read whole, since the json module cannot stream).
+Column names are matched loosely - "Product #", "code" and "SKU" all mean
+product_code; see COLUMN_ALIASES.
+
+    python catalog_import.py C25_prices.csv
+    python catalog_import.py C25_prices.jsonl
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from itertools import chain, islice
+
+from db_utils import initialize_database, transaction
+
+logger = logging.getLogger(__name__)
+
+# Rows per executemany call
+BATCH_SIZE = 1000
+
+# products column -> header names accepted for it (compared after _header())
+COLUMN_ALIASES = {
+    "product_code": ("product_code", "code", "product_number", "product_#", "product_no", "item", "item_number", "sku"),
+    "name": ("name", "product_name", "product", "title"),
+    "description": ("description", "desc", "details"),
+    "price": ("price", "unit_price", "sale_price", "brochure_price"),
+    "shade": ("shade", "shade/fragrance", "fragrance", "color", "colour"),
+    "size": ("size",),
+}
+IMPORT_COLUMNS = tuple(COLUMN_ALIASES)
+
+_UPSERT = f"""
+    INSERT INTO products ({", ".join(IMPORT_COLUMNS)})
+    VALUES ({", ".join("?" * len(IMPORT_COLUMNS))})
+    ON CONFLICT (product_code) DO UPDATE SET
+        {", ".join(f"{column} = excluded.{column}" for column in IMPORT_COLUMNS[1:])}
+    WHERE {" OR ".join(f"{column} IS NOT excluded.{column}" for column in IMPORT_COLUMNS[1:])}
+"""
+
+
+class ImportResult:
+    """How an import went: rows read, products added or changed, rows skipped."""
+
+    __slots__ = ("read", "changed", "skipped", "elapsed")
+
+    def __init__(self, read, changed, skipped, elapsed):
+        self.read = read
+        self.changed = changed
+        self.skipped = skipped  # no product code or name
+        self.elapsed = elapsed
+
+    @property
+    def rate(self):
+        """Rows read per second."""
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        text = (f"{self.read:,} rows in {self.elapsed:.2f} s ({self.rate:,.0f} rows/sec): "
+                f"{self.changed:,} products added or updated")
+        if self.skipped:
+            text += f", {self.skipped:,} rows skipped (no product code or name)"
+        return text
+
+
+def _header(name):
+    return str(name).strip().lower().replace(" ", "_")
+
+
+def _column_map(headers):
+    """{products column: key in each record} for the headers a file actually has."""
+    by_header = {_header(header): header for header in headers if header is not None}
+    found = {}
+    for column, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in by_header:
+                found[column] = by_header[alias]
+                break
+    if "product_code" not in found or not ({"name", "description"} & set(found)):
+        raise ValueError(
+            "The catalog needs a product code column and a name or description column; "
+            f"found {', '.join(map(str, headers)) or 'no columns'}"
+        )
+    return found
+
+
+def _checked(record, number):
+    """record, if it is an object with named columns (a dict); ValueError otherwise."""
+    if not isinstance(record, dict):
+        raise ValueError(
+            f"Each catalog record must be an object with named columns; record {number} is "
+            f"{type(record).__name__} {record!r:.40}"
+        )
+    return record
+
+
+def _price(value):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    text = str(value).replace("$", "").replace(",", "").strip()
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ""
+
+
+def read_csv(path):
+    """Yield each row of a CSV file as a dict keyed by its header."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.DictReader(f, dialect=dialect)
+
+
+def read_json(path):
+    """Yield each object of a JSON Lines file, or of a JSON array / {"products": [...]}."""
+    with open(path, encoding="utf-8-sig") as f:
+        if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        data = json.load(f)
+    products = data.get("products") if isinstance(data, dict) else data
+    if not isinstance(products, list):
+        raise ValueError(
+            'Expected a JSON array of products or {"products": [...]}; '
+            f"found {'an object without a products array' if isinstance(data, dict) else type(data).__name__}"
+        )
+    yield from products
+
+
+def read_catalog(path):
+    """Yield the records of a catalog file, picking the reader from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".json", ".jsonl", ".ndjson"):
+        return read_json(path)
+    return read_csv(path)
+
+
+def import_records(records):
+    """Upsert catalog records (dicts) into products in one transaction. Returns an ImportResult."""
+    started = time.perf_counter()
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return ImportResult(0, 0, 0, time.perf_counter() - started)
+    columns = _column_map(_checked(first, 1).keys())
+    counts = {"read": 0, "skipped": 0}
+
+    def product_rows():
+        for record in chain([first], records):
+            counts["read"] += 1
+            record = _checked(record, counts["read"])
+            values = {column: record.get(key) for column, key in columns.items()}
+            code = _text(values.get("product_code"))
+            name = _text(values.get("name")) or _text(values.get("description"))
+            if not code or not name:
+                counts["skipped"] += 1
+                continue
+            yield (code, name, _text(values.get("description")), _price(values.get("price")),
+                   _text(values.get("shade")), _text(values.get("size")))
+
+    changed = 0
+    rows = product_rows()
+    with transaction() as cursor:
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            cursor.executemany(_UPSERT, batch)
+            changed += cursor.rowcount
+    return ImportResult(counts["read"], changed, counts["skipped"], time.perf_counter() - started)
+
+
+def import_catalog(path):
+    """Import a CSV/JSON catalog file into products (runs on DbWorker from the Options window)."""
+    result = import_records(read_catalog(path))
+    logger.info("catalog import path=%s read=%d changed=%d skipped=%d elapsed_s=%.2f per_s=%.0f",
+                path, result.read, result.changed, result.skipped, result.elapsed, result.rate)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="CSV, JSON or JSON Lines catalog file")
+    args = parser.parse_args(argv)
+    initialize_database()
+
+    try:
+        result = import_catalog(args.path)
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"Could not import {args.path}: {e}")
+        return 1
+    print(result)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
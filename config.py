@@ -8,3 +8,4 @@ APPDATA_PATH.mkdir(parents=True, exist_ok=True)
 DB_PATH = str(APPDATA_PATH / "avon_hello.db")
 SETTINGS_FILE = str(APPDATA_PATH / "settings.conf")
 LOG_FILE = str(APPDATA_PATH / "error_log.txt")
+APP_LOG_FILE = str(APPDATA_PATH / "avon_hello.log")
@@ -0,0 +1,388 @@
+import logging
+import re
+from bisect import bisect_left
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex
+
+from db_utils import fetch_all, get_connection
+from db_worker import get_db_worker
+from migrations import digits_only
+
+logger = logging.getLogger(__name__)
+
+# Customers are fetched per letter group, this many at a time, as the tree scrolls
+PAGE_SIZE = 200
+
+# Python equivalent of SQLite's NOCASE collation (folds ASCII letters only)
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# (group letter expression, ordering columns) for each grouping mode. The
+# expressions must match the customer index definitions in migrations.py.
+GROUPINGS = {
+    "last": ("UPPER(SUBSTR(last_name, 1, 1))", ("last_name", "first_name")),
+    "first": ("UPPER(SUBSTR(first_name, 1, 1))", ("first_name", "last_name")),
+}
+
+_TOP_LEVEL = 0
+
+_WORD = re.compile(r"\w+")
+
+
+def has_search_index():
+    """True when the FTS5 customer index exists (SQLite builds without FTS5 skip it). Runs on DbWorker."""
+    cursor = get_connection().cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'")
+    return cursor.fetchone() is not None
+
+
+def _like_prefix(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def build_search_filter(first="", last="", other="", use_index=True):
+    """Return (sql, params) restricting customers to a search, or ("", []) when every box is empty.
+
+    Every word typed is matched as a prefix. first and last search the name
+    columns; other searches phone numbers, email and city.
+    """
+    phone_digits = re.sub(r"\D", "", other)
+    phone_only = bool(phone_digits) and not re.search(r"[^\d\s().+-]", other)
+
+    if use_index:
+        terms = [f'first_name : "{word}"*' for word in _WORD.findall(first)]
+        terms += [f'last_name : "{word}"*' for word in _WORD.findall(last)]
+        if phone_only:
+            terms.append(f'phone : "{phone_digits}"*')
+        else:
+            terms += [f'{{phone email city}} : "{word}"*' for word in _WORD.findall(other)]
+        if not terms:
+            return "", []
+        return ("customer_id IN (SELECT rowid FROM customers_fts WHERE customers_fts MATCH ?)",
+                [" AND ".join(terms)])
+
+    # Without the index, match each box's whole text as a prefix
+    conditions, params = [], []
+    for column, text in (("first_name", first.strip()), ("last_name", last.strip())):
+        if text:
+            conditions.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(_like_prefix(text))
+    if phone_only:
+        # Phones are stored as typed, so compare them as bare digits like the index does
+        conditions.append(f"({digits_only('cell_phone')} LIKE ? OR {digits_only('office_phone')} LIKE ?)")
+        params += [phone_digits + "%"] * 2
+    elif other.strip():
+        conditions.append("(cell_phone LIKE ? ESCAPE '\\' OR office_phone LIKE ? ESCAPE '\\' "
+                          "OR email LIKE ? ESCAPE '\\' OR city LIKE ? ESCAPE '\\')")
+        params += [_like_prefix(other.strip())] * 4
+    return " AND ".join(conditions), params
+
+
+class _Group:
+    __slots__ = ("letter", "count", "rows", "keys", "exhausted", "fetching")
+
+    def __init__(self, letter, count):
+        self.letter = letter
+        self.count = count
+        self.rows = []  # (customer_id, first_name, last_name)
+        self.keys = []  # sort key per row, kept parallel to rows for bisect
+        self.exhausted = count == 0
+        self.fetching = False  # a page is on its way from DbWorker
+
+
+class CustomerTreeModel(QAbstractItemModel):
+    """Customers grouped by first letter, with each group's rows fetched lazily through DbWorker.
+
+    Nothing here queries SQLite on the GUI thread: pages and single customers
+    are read on DbWorker and inserted when they arrive. Results that arrive
+    after the tree was reloaded (see set_groups()) are dropped.
+    """
+
+    HEADERS = ["Customer Name", "Details"]
+
+    def __init__(self, group_by="last", parent=None):
+        super().__init__(parent)
+        self.group_by = group_by
+        self.db = get_db_worker()
+        self._groups = []
+        self._loads = 0  # bumped by set_groups(); results read before a reload are stale
+        self._fetching = False  # views may ask for more while rows are being inserted
+        self._filter_sql, self._filter_params = "", []
+        # Until DbWorker answers, searches use LIKE, which works with or without the index
+        self._use_search_index = None
+        self.db.submit(self, has_search_index, name="search_index", on_result=self._set_use_search_index)
+
+    def _set_use_search_index(self, use_index):
+        self._use_search_index = use_index
+
+    # --- Loading ---
+
+    def current_view(self):
+        """The grouping and search the tree shows now, as (group_by, filter_sql, filter_params)."""
+        return self.group_by, self._filter_sql, list(self._filter_params)
+
+    def search_view(self, first="", last="", other="", group_by=None):
+        """A view of the customers matching the search boxes; empty boxes match everyone."""
+        filter_sql, filter_params = build_search_filter(first, last, other, use_index=bool(self._use_search_index))
+        return group_by or self.group_by, filter_sql, filter_params
+
+    def groups_query(self, view):
+        """(sql, params) counting a view's customers per letter group.
+
+        Run it anywhere (e.g. on DbWorker) and pass the rows to set_groups().
+        """
+        group_by, filter_sql, filter_params = view
+        letter_expr, _ = GROUPINGS[group_by]
+        return f"""
+            SELECT {letter_expr} AS letter, COUNT(*)
+            FROM customers
+            {self._where(filter_sql)}
+            GROUP BY letter
+            ORDER BY letter
+        """, list(filter_params)
+
+    def set_groups(self, rows, view):
+        """Switch to a view, showing the (letter, count) rows groups_query() returned for it."""
+        for group in self._groups:
+            if group.fetching:
+                self.db.cancel(self, f"page {group.letter}")
+        self.beginResetModel()
+        self._loads += 1
+        self.group_by, self._filter_sql, self._filter_params = view
+        self._groups = [_Group(letter, count) for letter, count in rows]
+        self.endResetModel()
+
+    def _where(self, filter_sql, *conditions):
+        conditions = [c for c in (filter_sql, *conditions) if c]
+        return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    def _sort_key(self, customer_id, first_name, last_name):
+        names = (last_name, first_name) if self.group_by == "last" else (first_name, last_name)
+        return (names[0].translate(_NOCASE), names[1].translate(_NOCASE), customer_id)
+
+    def _page_query(self, group):
+        """(sql, params) for the next page of a group, after the rows already loaded."""
+        letter_expr, (primary, secondary) = GROUPINGS[self.group_by]
+        conditions, params = [f"{letter_expr} = ?"], [*self._filter_params, group.letter]
+        if group.rows:
+            customer_id, first_name, last_name = group.rows[-1]
+            last = {"first_name": first_name, "last_name": last_name}
+            conditions.append(f"({primary} COLLATE NOCASE, {secondary} COLLATE NOCASE, customer_id) > (?, ?, ?)")
+            params += [last[primary], last[secondary], customer_id]
+        return f"""
+            SELECT customer_id, first_name, last_name
+            FROM customers
+            {self._where(self._filter_sql, *conditions)}
+            ORDER BY {primary} COLLATE NOCASE, {secondary} COLLATE NOCASE, customer_id
+            LIMIT ?
+        """, (*params, PAGE_SIZE)
+
+    def canFetchMore(self, parent):
+        group = self._group_for(parent)
+        return (group is not None and parent.column() == 0
+                and not group.exhausted and not group.fetching and not self._fetching)
+
+    def fetchMore(self, parent):
+        """Ask DbWorker for the group's next page; the rows are inserted when it arrives."""
+        if not self.canFetchMore(parent):
+            return
+        group = self._group_for(parent)
+        group.fetching = True
+        loads = self._loads
+        self.db.submit(
+            self, fetch_all, *self._page_query(group), name=f"page {group.letter}",
+            on_result=lambda rows: self._add_page(group, rows, loads),
+            on_error=lambda e: self._page_failed(group, e, loads),
+        )
+
+    def _add_page(self, group, rows, loads):
+        if loads != self._loads or group not in self._groups:
+            return  # the tree was reloaded, or the group emptied, meanwhile
+        group.fetching = False
+        if len(rows) < PAGE_SIZE:
+            group.exhausted = True
+        if not rows:
+            return
+        parent = self.index(self._groups.index(group), 0)
+        start = len(group.rows)
+        self._fetching = True
+        try:
+            self.beginInsertRows(parent, start, start + len(rows) - 1)
+            group.rows.extend(rows)
+            group.keys.extend(self._sort_key(*row) for row in rows)
+            self.endInsertRows()
+        finally:
+            self._fetching = False
+
+    def _page_failed(self, group, error, loads):
+        if loads != self._loads:
+            return
+        group.fetching = False
+        # Stop asking, or the view would retry straight away; Refresh Tree tries again
+        group.exhausted = True
+        logger.warning("customer page failed letter=%s: %s", group.letter, error)
+
+    # --- Incremental updates ---
+
+    def add_customer(self, customer_id):
+        """Insert one customer into its group without reloading the tree, once DbWorker has read it.
+
+        Customers that don't match the current search are left out.
+        """
+        letter_expr, _ = GROUPINGS[self.group_by]
+        loads = self._loads
+        self.db.submit(
+            self, fetch_all, f"""
+                SELECT customer_id, first_name, last_name, {letter_expr}
+                FROM customers
+                {self._where(self._filter_sql, "customer_id = ?")}
+            """, (*self._filter_params, customer_id),
+            on_result=lambda rows: self._insert_customer(rows, loads),
+            on_error=lambda e: logger.warning("customer %s not refreshed: %s", customer_id, e),
+        )
+
+    def _insert_customer(self, rows, loads):
+        if loads != self._loads or not rows:
+            return  # reloaded meanwhile (the reload has it), or outside the search
+        found = rows[0]
+        row, letter = tuple(found[:3]), found[3]
+
+        letters = [group.letter for group in self._groups]
+        group_row = bisect_left(letters, letter)
+        if group_row == len(self._groups) or self._groups[group_row].letter != letter:
+            self.beginInsertRows(QModelIndex(), group_row, group_row)
+            group = _Group(letter, 1)
+            group.rows.append(row)
+            group.keys.append(self._sort_key(*row))
+            group.exhausted = True
+            self._groups.insert(group_row, group)
+            self.endInsertRows()
+            return
+
+        group = self._groups[group_row]
+        key = self._sort_key(*row)
+        position = bisect_left(group.keys, key)
+        if position < len(group.rows) and group.rows[position][0] == row[0]:
+            return  # a page fetched meanwhile already brought it
+        group.count += 1
+        # Rows sorting after the loaded page will arrive with the next fetch
+        if position < len(group.rows) or group.exhausted:
+            self.beginInsertRows(self.index(group_row, 0), position, position)
+            group.rows.insert(position, row)
+            group.keys.insert(position, key)
+            self.endInsertRows()
+        self.dataChanged.emit(self.index(group_row, 1), self.index(group_row, 1))
+
+    def remove_customers(self, customer_ids):
+        """Remove deleted customers from the tree, then recount its groups through DbWorker.
+
+        Deleted customers that were never fetched are still counted in their
+        group's header, and which group they were in is no longer in the
+        database, so the counts are read again; any group left empty is dropped.
+        """
+        self._remove_loaded(customer_ids)
+        loads = self._loads
+        self.db.submit(
+            self, fetch_all, *self.groups_query(self.current_view()), name="counts",
+            on_result=lambda rows: self._set_counts(rows, loads),
+            on_error=lambda e: logger.warning("customer group counts not refreshed: %s", e),
+        )
+
+    def _set_counts(self, rows, loads):
+        if loads != self._loads:
+            return  # reloaded meanwhile, with fresh counts
+        counts = dict(rows)
+        for group_row in reversed(range(len(self._groups))):
+            group = self._groups[group_row]
+            count = counts.get(group.letter, 0)
+            if count == group.count:
+                continue
+            group.count = count
+            if count <= 0:
+                self.beginRemoveRows(QModelIndex(), group_row, group_row)
+                del self._groups[group_row]
+                self.endRemoveRows()
+            else:
+                self.dataChanged.emit(self.index(group_row, 1), self.index(group_row, 1))
+
+    def _remove_loaded(self, customer_ids):
+        """Remove customers' loaded rows, counting them out of their groups and dropping any group left empty."""
+        customer_ids = set(customer_ids)
+        for group_row in reversed(range(len(self._groups))):
+            group = self._groups[group_row]
+            group_index = self.index(group_row, 0)
+            for position in reversed(range(len(group.rows))):
+                if group.rows[position][0] in customer_ids:
+                    self.beginRemoveRows(group_index, position, position)
+                    del group.rows[position]
+                    del group.keys[position]
+                    group.count -= 1
+                    self.endRemoveRows()
+            if group.count <= 0:
+                self.beginRemoveRows(QModelIndex(), group_row, group_row)
+                del self._groups[group_row]
+                self.endRemoveRows()
+            else:
+                self.dataChanged.emit(self.index(group_row, 1), self.index(group_row, 1))
+
+    def update_customer(self, customer_id):
+        """Re-read one customer (through DbWorker), moving it if its name (and so its group) changed."""
+        self._remove_loaded([customer_id])
+        self.add_customer(customer_id)
+
+    # --- QAbstractItemModel ---
+
+    def _group_for(self, index):
+        if index.isValid() and index.internalId() == _TOP_LEVEL:
+            return self._groups[index.row()]
+        return None
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, _TOP_LEVEL)
+        # Customer rows remember their group as group_row + 1
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == _TOP_LEVEL:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, _TOP_LEVEL)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._groups)
+        group = self._group_for(parent)
+        return len(group.rows) if group is not None and parent.column() == 0 else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._groups)
+        group = self._group_for(parent)
+        return group is not None and parent.column() == 0 and group.count > 0
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        group = self._group_for(index)
+        if group is not None:
+            if role == Qt.DisplayRole:
+                if index.column() == 0:
+                    return group.letter or "#"
+                return f"{group.count} customer{'s' if group.count != 1 else ''}"
+            return None
+
+        customer_id, first_name, last_name = self._groups[index.internalId() - 1].rows[index.row()]
+        if role == Qt.DisplayRole and index.column() == 0:
+            return f"{first_name} {last_name} (#{customer_id})"
+        if role == Qt.UserRole:
+            return customer_id
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
@@ -1,38 +1,41 @@
-import sqlite3
 import os
 import sys
-import pathlib
-import configparser
+import time
+import logging
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import (
-    QMainWindow, QVBoxLayout, QPushButton, QTreeWidget, 
-    QTreeWidgetItem, QWidget, QLabel, QLineEdit, QHBoxLayout, 
+    QMainWindow, QVBoxLayout, QPushButton, QTreeView,
+    QWidget, QLabel, QLineEdit, QHBoxLayout, 
     QRadioButton, QMessageBox, QDialog, QComboBox, QGroupBox,
-    QCheckBox, QTableWidget, QHeaderView, QTableWidgetItem, QCheckBox
+    QHeaderView, QTableView, QAbstractItemView, QInputDialog
 )
 
-from db_utils import DB_PATH, SETTINGS_FILE, get_representative_info, get_current_campaign_settings
+from customer_model import CustomerTreeModel
+from db_worker import get_db_worker, watch_future
+from order_model import (
+    CHECK_COLUMNS, PRODUCT_NUMBER, CheckBoxDelegate, OrderLine, OrderTableModel, ProductNumberDelegate
+)
+from catalog import get_catalog
+from invoices import (
+    Invoice, downloads_path, invoice_filename, load_campaign_invoices, open_pdf, statement_filename,
+    submit_invoice, submit_statement
+)
+from db_utils import (
+    get_data_versions, with_data_versions, get_connection, get_representative_info, get_current_campaign_settings, fetch_all,
+    get_customer, insert_customer, update_customer, get_latest_order, get_order_history, get_order,
+    delete_customers, delete_orders, insert_order, update_order, get_customer_balance, record_payment
+)
 
 from datetime import datetime
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.styles import ParagraphStyle
+logger = logging.getLogger(__name__)
 
-from db_utils import DB_PATH, SETTINGS_FILE
-
-def is_dark_mode_enabled():
-    config = configparser.ConfigParser()
-    if os.path.exists(SETTINGS_FILE):
-        config.read(SETTINGS_FILE)
-        return config.getboolean("Appearance", "dark_mode", fallback=False)
-    return False
+# Pause in typing before the customer search runs
+SEARCH_DELAY_MS = 150
+# Tables the customer tree shows; see CustomersWindow.refresh()
+CUSTOMER_TABLES = ("customers",)
 
 def resource_path(relative_path):
     """Get the absolute path to a resource, works for dev and PyInstaller."""
@@ -48,44 +51,14 @@ class CustomersWindow(QMainWindow):
         self.setWindowTitle("Customer Search")
         self.setWindowIcon(QIcon("Avon256.png"))
         self.setGeometry(250, 250, 800, 500)
+        self.db = get_db_worker()
+        self.data_versions = None  # as of the last tree load
+        self._edit_customer_dialog = None
         self.init_ui()
-
-    def apply_stylesheet(self):
-        if is_dark_mode_enabled():
-            self.setStyleSheet("""
-                QWidget {
-                    background-color: #121212;
-                    color: #f0f0f0;
-                }
-                QPushButton {
-                    background-color: #2c3e50;
-                    color: white;
-                    padding: 6px;
-                }
-                QLineEdit, QComboBox, QTreeWidget {
-                    background-color: #1e1e1e;
-                    color: white;
-                    border: 1px solid #333;
-                }
-                QTreeWidget::item {
-                    color: #f0f0f0;
-                }
-                QLabel, QRadioButton {
-                    color: #f0f0f0;
-                }
-                QHeaderView::section {
-                background-color: #2c3e50;
-                color: white;
-                padding: 4px;
-                border: 1px solid #444;
-                }                              
-            """)
-        else:
-            self.setStyleSheet("")
+        # Build the customer dialog while nothing else is happening, so the first double-click is quick too
+        QTimer.singleShot(0, self.edit_customer_dialog)
 
     def init_ui(self):
-        self.apply_stylesheet()
-
         layout = QVBoxLayout()
 
         header_label = QLabel("Customer Search", self)
@@ -98,13 +71,26 @@ class CustomersWindow(QMainWindow):
         self.last_name_input = QLineEdit()
         self.last_name_input.setPlaceholderText("Last Name")
 
+        self.contact_input = QLineEdit()
+        self.contact_input.setPlaceholderText("Phone, Email or City")
+
         search_layout.addWidget(QLabel("First Name:"))
         search_layout.addWidget(self.first_name_input)
         search_layout.addWidget(QLabel("Last Name:"))
         search_layout.addWidget(self.last_name_input)
+        search_layout.addWidget(QLabel("Contact:"))
+        search_layout.addWidget(self.contact_input)
 
         layout.addLayout(search_layout)
 
+        # Search as you type, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        for search_input in (self.first_name_input, self.last_name_input, self.contact_input):
+            search_input.textChanged.connect(self.search_timer.start)
+
         self.sort_by_first = QRadioButton("By First Name")
         self.sort_by_last = QRadioButton("By Last Name")
         self.sort_by_last.setChecked(True)
@@ -116,11 +102,15 @@ class CustomersWindow(QMainWindow):
 
         layout.addLayout(sort_layout)
 
-        self.customer_tree = QTreeWidget()
-        self.customer_tree.setHeaderLabels(["Customer Name", "Details"])
+        self.customer_model = CustomerTreeModel(group_by="last", parent=self)
+        self.customer_tree = QTreeView()
+        self.customer_tree.setModel(self.customer_model)
+        self.customer_tree.setUniformRowHeights(True)
         self.customer_tree.setColumnWidth(0, 250)
-        self.customer_tree.itemDoubleClicked.connect(self.open_edit_customer)
+        self.customer_tree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.customer_tree.doubleClicked.connect(self.open_edit_customer)
         layout.addWidget(self.customer_tree)
+        self.sort_by_first.toggled.connect(self.change_grouping)
 
         btn_tree_layout = QHBoxLayout()
         self.btn_expand = QPushButton("Expand All")
@@ -143,6 +133,8 @@ class CustomersWindow(QMainWindow):
         self.btn_all_customers = QPushButton("All Customers")
         self.btn_add_customer = QPushButton("Add Customer")
         self.btn_delete_customer = QPushButton("Delete Customer")
+        self.btn_print_statement = QPushButton("Print Statement")
+        self.btn_print_statement.setToolTip("One PDF with the current campaign's invoices for the selected customers")
         self.btn_exit = QPushButton("Exit")
 
         self.btn_all_customers.setStyleSheet("background-color: #3498db; color: white; font-size: 14px; padding: 6px;")
@@ -153,13 +145,15 @@ class CustomersWindow(QMainWindow):
         btn_layout.addWidget(self.btn_all_customers)
         btn_layout.addWidget(self.btn_add_customer)
         btn_layout.addWidget(self.btn_delete_customer)
+        btn_layout.addWidget(self.btn_print_statement)
         btn_layout.addWidget(self.btn_exit)
 
         layout.addLayout(btn_layout)
 
-        self.btn_all_customers.clicked.connect(self.load_customers)
+        self.btn_all_customers.clicked.connect(self.show_all_customers)
         self.btn_add_customer.clicked.connect(self.add_customer_dialog)
         self.btn_delete_customer.clicked.connect(self.delete_selected_customer)
+        self.btn_print_statement.clicked.connect(self.print_statement)
         self.btn_exit.clicked.connect(self.close)
 
         central_widget = QWidget()
@@ -172,81 +166,138 @@ class CustomersWindow(QMainWindow):
         """Open Add Customer Dialog."""
         dialog = AddCustomerDialog(self)
         if dialog.exec_():  # If dialog was accepted (customer added)
-            self.load_customers()  # Refresh the list
+            self.customer_model.add_customer(dialog.customer_id)
+
+    def selected_customer_ids(self):
+        return [
+            index.data(Qt.UserRole)
+            for index in self.customer_tree.selectionModel().selectedRows(0)
+            if index.data(Qt.UserRole)
+        ]
 
     def delete_selected_customer(self):
-        selected_item = self.customer_tree.currentItem()
-        if not selected_item:
+        customer_ids = self.selected_customer_ids()
+        if not customer_ids:
             QMessageBox.warning(self, "No Selection", "Please select a customer to delete.")
             return
 
-        customer_id = selected_item.data(0, Qt.UserRole)
-        if not customer_id:
-            QMessageBox.warning(self, "Invalid", "Please select a valid customer item.")
-            return
-
+        if len(customer_ids) == 1:
+            message = "Are you sure you want to delete this customer and all related orders?"
+        else:
+            message = f"Are you sure you want to delete these {len(customer_ids)} customers and all related orders?"
         confirm = QMessageBox.question(
             self,
             "Confirm Delete",
-            "Are you sure you want to delete this customer and all related orders?",
+            message,
             QMessageBox.Yes | QMessageBox.No,
         )
 
         if confirm == QMessageBox.Yes:
-            try:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-
-                # Delete order_products tied to this customer's orders
-                cursor.execute("SELECT order_id FROM orders WHERE customer_id = ?", (customer_id,))
-                order_ids = cursor.fetchall()
-                for (order_id,) in order_ids:
-                    cursor.execute("DELETE FROM order_products WHERE order_id = ?", (order_id,))
-
-                # Delete orders
-                cursor.execute("DELETE FROM orders WHERE customer_id = ?", (customer_id,))
-                # Delete customer
-                cursor.execute("DELETE FROM customers WHERE customer_id = ?", (customer_id,))
-                conn.commit()
-                conn.close()
-
-                QMessageBox.information(self, "Deleted", "Customer and all related orders deleted successfully.")
-                self.load_customers()
-
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to delete customer: {e}")
-
-    def load_customers(self):
-        """Load all customers and display in a tree view."""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("SELECT customer_id, first_name, last_name FROM customers")
-        rows = cursor.fetchall()
-        conn.close()
-
-        self.populate_tree(rows)
-
-    def populate_tree(self, rows):
-        """Display customers in a tree view grouped by first letter."""
-        self.customer_tree.clear()
-        letter_groups = {}
-
-        sort_key = 1 if self.sort_by_first.isChecked() else 2
-
-        for row in rows:
-            customer_id, first_name, last_name = row
-            key = first_name[0].upper() if self.sort_by_first.isChecked() else last_name[0].upper()
-
-            if key not in letter_groups:
-                letter_groups[key] = QTreeWidgetItem(self.customer_tree, [key])
-                self.customer_tree.addTopLevelItem(letter_groups[key])
-
-            customer_item = QTreeWidgetItem(letter_groups[key], [f"{first_name} {last_name} (#{customer_id})"])
-            customer_item.setData(0, Qt.UserRole, customer_id)
-            letter_groups[key].addChild(customer_item)
+            self.btn_delete_customer.setEnabled(False)
+            self.db.submit(
+                self, delete_customers, customer_ids,
+                on_result=lambda _: self._customers_deleted(customer_ids),
+                on_error=self._delete_failed,
+            )
+
+    def _customers_deleted(self, customer_ids):
+        self.btn_delete_customer.setEnabled(True)
+        QMessageBox.information(self, "Deleted", "Customer and all related orders deleted successfully.")
+        self.customer_model.remove_customers(customer_ids)
+
+    def _delete_failed(self, error):
+        self.btn_delete_customer.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to delete customer: {error}")
+
+    def print_statement(self):
+        """Put the selected customers' invoices for the current campaign into one PDF and open it."""
+        customer_ids = self.selected_customer_ids()
+        if not customer_ids:
+            QMessageBox.warning(self, "No Selection", "Please select the customers to print.")
+            return
+
+        self.btn_print_statement.setEnabled(False)
+        self.db.submit(
+            self, _load_statement_invoices, customer_ids,
+            on_result=self._render_statement, on_error=self._statement_failed,
+        )
+
+    def _render_statement(self, result):
+        campaign_year, campaign_number, invoices = result
+        if not invoices:
+            self.btn_print_statement.setEnabled(True)
+            QMessageBox.information(
+                self, "No Orders",
+                f"The selected customers have no orders in campaign {campaign_number} of {campaign_year}.",
+            )
+            return
 
+        filename = downloads_path(
+            statement_filename(campaign_year, campaign_number, datetime.now().strftime("%Y-%m-%d"))
+        )
+        future = submit_statement(invoices, filename, f"Campaign {campaign_number} of {campaign_year}")
+        watch_future(self, future, self._statement_printed, self._statement_failed)
+
+    def _statement_printed(self, filename):
+        self.btn_print_statement.setEnabled(True)
+        open_pdf(filename)
+
+    def _statement_failed(self, error):
+        self.btn_print_statement.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to create the statement: {error}")
+
+    def load_customers(self, view=None):
+        """Reload the customer tree in the background; each letter group fetches its customers as it is shown.
+
+        view is a grouping and search from the model (the current one by default).
+        """
+        view = view or self.customer_model.current_view()
+        self.db.submit(
+            self, with_data_versions, CUSTOMER_TABLES, fetch_all, *self.customer_model.groups_query(view),
+            name="customer_groups",
+            on_result=lambda result: self._show_customer_groups(*result, view),
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to load customers: {e}"),
+        )
+
+    def _show_customer_groups(self, data_versions, rows, view):
+        self.data_versions = data_versions
+        self.customer_model.set_groups(rows, view)
         self.customer_tree.expandAll()
 
+    def refresh(self):
+        """Called when the window is opened again: reload the tree only if customers changed meanwhile."""
+        self.db.submit(
+            self, get_data_versions, CUSTOMER_TABLES, name="data_versions",
+            on_result=self._check_data_versions,
+        )
+
+    def _check_data_versions(self, data_versions):
+        if data_versions != self.data_versions:
+            self.load_customers()
+
+    def apply_search(self):
+        """Filter the tree to the customers matching the search boxes."""
+        self.load_customers(self.customer_model.search_view(
+            self.first_name_input.text(), self.last_name_input.text(), self.contact_input.text(),
+            group_by=self.grouping(),
+        ))
+
+    def show_all_customers(self):
+        """Clear the search boxes and show every customer."""
+        self.search_timer.stop()
+        for search_input in (self.first_name_input, self.last_name_input, self.contact_input):
+            search_input.blockSignals(True)
+            search_input.clear()
+            search_input.blockSignals(False)
+        self.apply_search()
+
+    def grouping(self):
+        return "first" if self.sort_by_first.isChecked() else "last"
+
+    def change_grouping(self):
+        # Rebuilt from the search boxes so a search still in flight isn't lost
+        self.apply_search()
+
     def expand_tree(self):
         """Expand all tree items."""
         self.customer_tree.expandAll()
@@ -255,55 +306,81 @@ class CustomersWindow(QMainWindow):
         """Collapse all tree items."""
         self.customer_tree.collapseAll()
 
-    def open_edit_customer(self, item, column):
+    def open_edit_customer(self, index):
         """Open the Edit Customer Window when a customer is double-clicked."""
-        customer_id = item.data(0, Qt.UserRole)
+        customer_id = index.data(Qt.UserRole)
         if customer_id:
-            self.edit_customer_dialog = EditCustomerDialog(customer_id, self)
-            self.edit_customer_dialog.exec_()
-            self.load_customers()  # Refresh after edit
+            dialog = self.edit_customer_dialog()
+            dialog.load(customer_id)
+            dialog.exec_()
+            self.customer_model.update_customer(customer_id)  # Refresh after edit
+
+    def edit_customer_dialog(self):
+        """The Edit Customer dialog, built once and reloaded for each customer opened."""
+        if self._edit_customer_dialog is None:
+            self._edit_customer_dialog = EditCustomerDialog(parent=self)
+        return self._edit_customer_dialog
+
+def _load_statement_invoices(customer_ids):
+    campaign_year, campaign_number = get_current_campaign_settings()
+    invoices = load_campaign_invoices(campaign_year, campaign_number, customer_ids)
+    return campaign_year, campaign_number, [invoice for _, _, invoice in invoices]
+
+
+def _fetch_order_summary(customer_id):
+    """Latest order, order history, account balance and current campaign for EditCustomerDialog (runs on DbWorker)."""
+    return (get_latest_order(customer_id), get_order_history(customer_id),
+            get_customer_balance(customer_id), get_current_campaign_settings())
+
+
+def _unless_reloaded(dialog, callback, stale=None):
+    """Wrap a write's callback so it runs only while dialog still shows the record the write was for.
+
+    The customer and order dialogs are reused, so one can be loaded with
+    another record while a save for the previous one is still running. A
+    stale success is ignored; a stale failure goes to stale(error) instead.
+    """
+    loads = dialog.loads
+
+    def call(value):
+        if dialog.loads == loads:
+            callback(value)
+        elif stale is not None:
+            stale(value)
+    return call
+
 
 class EditCustomerDialog(QDialog):
     """Dialog to Edit a Customer and View Orders."""
 
-    def __init__(self, customer_id, parent=None):
+    # Reads that belong to the customer on show; dropped when another one is loaded
+    LOAD_REQUESTS = ("customer", "order_summary", "order_details")
+
+    def __init__(self, customer_id=None, parent=None):
         super().__init__(parent)
         self.customer_id = customer_id
         self.setWindowTitle("Edit Customer")
         self.setMinimumWidth(400)
+        self.db = get_db_worker()
+        self.current_campaign = None  # (year, campaign), loaded with the order summary
+        self.balance = 0.0
+        self.order_entry_dialog = None  # built on first use, see order_entry()
+        self.loads = 0  # bumped by load(); see _unless_reloaded()
         layout = QVBoxLayout()
 
-        # Fetch customer data
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT first_name, last_name, address, city, state, zip_code, 
-                   cell_phone, office_phone, email, status 
-            FROM customers 
-            WHERE customer_id = ?
-        """, (customer_id,))
-        customer = cursor.fetchone()
-        conn.close()
-
-        if not customer:
-            QMessageBox.critical(self, "Error", "Customer not found in database!")
-            self.reject()
-            return
-
-        # Customer fields
-        self.first_name_input = QLineEdit(customer[0])
-        self.last_name_input = QLineEdit(customer[1])
-        self.address_input = QLineEdit(customer[2])
-        self.city_input = QLineEdit(customer[3])
-        self.state_input = QLineEdit(customer[4])
-        self.zip_code_input = QLineEdit(customer[5])
-        self.cell_phone_input = QLineEdit(customer[6])
-        self.office_phone_input = QLineEdit(customer[7])
-        self.email_input = QLineEdit(customer[8])
+        # Customer fields, filled in once the customer has been loaded
+        self.first_name_input = QLineEdit()
+        self.last_name_input = QLineEdit()
+        self.address_input = QLineEdit()
+        self.city_input = QLineEdit()
+        self.state_input = QLineEdit()
+        self.zip_code_input = QLineEdit()
+        self.cell_phone_input = QLineEdit()
+        self.office_phone_input = QLineEdit()
+        self.email_input = QLineEdit()
 
         self.status_input = QComboBox()
         self.status_input.addItems(["Active", "Closed", "Deleted"])
-        self.status_input.setCurrentText(customer[9])
 
         form_fields = [
             ("First Name:", self.first_name_input),
@@ -325,9 +402,8 @@ class EditCustomerDialog(QDialog):
         order_group = QGroupBox("Order Summary (Current Campaign)")
         order_layout = QVBoxLayout()
 
-        current_year, current_campaign = get_current_campaign_settings()
-        self.order_year = QLabel(f"Campaign Year: {current_year}")
-        self.order_campaign = QLabel(f"Campaign Number: {current_campaign}")
+        self.order_year = QLabel("Campaign Year: ")
+        self.order_campaign = QLabel("Campaign Number: ")
 
         self.order_total = QLabel("Order Total: $0.00")
         self.previous_balance = QLabel("Previous Balance: $0.00")
@@ -346,8 +422,20 @@ class EditCustomerDialog(QDialog):
         order_group.setLayout(order_layout)
         layout.addWidget(order_group)
 
+        # Account balance across every order and payment
+        balance_layout = QHBoxLayout()
+        self.account_balance = QLabel("Account Balance: $0.00")
+        self.account_balance.setStyleSheet("font-weight: bold;")
+        self.btn_record_payment = QPushButton("Record Payment")
+        self.btn_record_payment.clicked.connect(self.record_payment)
+        balance_layout.addWidget(self.account_balance)
+        balance_layout.addStretch()
+        balance_layout.addWidget(self.btn_record_payment)
+        layout.addLayout(balance_layout)
+
         # Buttons and controls
         self.btn_order_entry = QPushButton("New Order Entry")
+        self.btn_order_entry.setEnabled(False)  # until the current campaign is known
         self.btn_order_entry.clicked.connect(self.open_order_entry)
         layout.addWidget(self.btn_order_entry)
 
@@ -375,45 +463,101 @@ class EditCustomerDialog(QDialog):
         layout.addLayout(btn_order_actions)
 
 
-        btn_save = QPushButton("Save Changes")
-        btn_save.clicked.connect(self.save_customer)
-        layout.addWidget(btn_save)
+        self.btn_save = QPushButton("Save Changes")
+        self.btn_save.setEnabled(False)  # until the customer has been loaded
+        self.btn_save.clicked.connect(self.save_customer)
+        layout.addWidget(self.btn_save)
 
         self.setLayout(layout)
+
+        if customer_id is not None:
+            self.load(customer_id)
+
+    def load(self, customer_id):
+        """Show customer_id in this dialog, clearing whatever the previous customer left behind."""
+        for name in self.LOAD_REQUESTS:
+            self.db.cancel(self, name)
+        self.loads += 1
+        self.customer_id = customer_id
+        self.current_campaign = None
+        self.balance = 0.0
+        for widget in self._customer_inputs():
+            widget.clear()
+        self.status_input.setCurrentIndex(0)
+        self.btn_save.setEnabled(False)  # until the customer has been loaded
+        self.btn_order_entry.setEnabled(False)  # until the current campaign is known
+        self.btn_record_payment.setEnabled(True)
+        self.account_balance.setText("Account Balance: $0.00")
+        self.order_year.setText("Campaign Year: ")
+        self.order_campaign.setText("Campaign Number: ")
+        self._show_order_totals(None)
+        self.order_history.clear()
+        self.first_name_input.setFocus()
+
+        self.db.submit(
+            self, get_customer, customer_id, name="customer",
+            on_result=self.show_customer, on_error=self._load_failed,
+        )
         self.refresh_order_summary()
 
-    def open_order_entry(self):
-        current_year, current_campaign = get_current_campaign_settings()
-        self.order_entry_dialog = OrderEntryDialog(
-            self.customer_id, current_year, current_campaign, self
+    def show_customer(self, customer):
+        if not customer:
+            QMessageBox.critical(self, "Error", "Customer not found in database!")
+            self.reject()
+            return
+
+        for widget, value in zip(self._customer_inputs(), customer):
+            widget.setText(value or "")
+        self.status_input.setCurrentText(customer[9])
+        self.btn_save.setEnabled(True)
+
+    def _customer_inputs(self):
+        return (
+            self.first_name_input, self.last_name_input, self.address_input,
+            self.city_input, self.state_input, self.zip_code_input,
+            self.cell_phone_input, self.office_phone_input, self.email_input,
         )
-        if self.order_entry_dialog.exec_():  # Wait until dialog is closed
-            self.refresh_order_summary()     # This will also call load_order_history()
-            
-            # Re-fetch and highlight the most recent order
-            self.load_order_history()
-            if self.order_history.count() > 0:
-                self.order_history.setCurrentIndex(0)
+
+    def _load_failed(self, error):
+        QMessageBox.critical(self, "Error", f"Failed to load customer: {error}")
+
+    def order_entry(self, campaign_year, campaign_number, order_id=None):
+        """The Order Entry dialog, built once and reloaded for each order after that."""
+        if self.order_entry_dialog is None:
+            self.order_entry_dialog = OrderEntryDialog(
+                self.customer_id, campaign_year, campaign_number, self, order_id=order_id
+            )
+        else:
+            self.order_entry_dialog.load(self.customer_id, campaign_year, campaign_number, order_id)
+        return self.order_entry_dialog
+
+    def open_order_entry(self):
+        current_year, current_campaign = self.current_campaign
+        if self.order_entry(current_year, current_campaign).exec_():  # Wait until dialog is closed
+            # Reloads the history too, highlighting the most recent order
+            self.refresh_order_summary()
 
     def refresh_order_summary(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT campaign_year, campaign_number, order_total, 
-                   previous_balance, payment, net_due, 
-                   time_submitted, last_edited
-            FROM orders
-            WHERE customer_id = ?
-            ORDER BY time_submitted DESC
-            LIMIT 1
-        """, (self.customer_id,))
-        order_data = cursor.fetchone()
-        conn.close()
-
-        current_year, current_campaign = get_current_campaign_settings()
+        self.db.submit(
+            self, _fetch_order_summary, self.customer_id, name="order_summary",
+            on_result=self.show_order_summary, on_error=self._load_failed,
+        )
+
+    def show_order_summary(self, summary):
+        order_data, orders, balance, self.current_campaign = summary
+        self.btn_order_entry.setEnabled(True)
+        self.balance = balance[2]
+        self.account_balance.setText(
+            f"Account Balance: ${self.balance:.2f}  (Ordered ${balance[0]:.2f}, Paid ${balance[1]:.2f})"
+        )
+
+        current_year, current_campaign = self.current_campaign
         self.order_year.setText(f"Campaign Year: {current_year}")
         self.order_campaign.setText(f"Campaign Number: {current_campaign}")
+        self._show_order_totals(order_data)
+        self.load_order_history(orders)
 
+    def _show_order_totals(self, order_data):
         if order_data:
             self.order_total.setText(f"Order Total: ${order_data[2]:.2f}")
             self.previous_balance.setText(f"Previous Balance: ${order_data[3]:.2f}")
@@ -429,20 +573,7 @@ class EditCustomerDialog(QDialog):
             self.time_submitted_label.setText("Time Submitted: N/A")
             self.last_edited_label.setText("Last Edited: N/A")
 
-        self.load_order_history()
-
-    def load_order_history(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT order_id, campaign_year, campaign_number, order_total, net_due
-            FROM orders
-            WHERE customer_id = ?
-            ORDER BY time_submitted DESC
-        """, (self.customer_id,))
-        orders = cursor.fetchall()
-        conn.close()
-
+    def load_order_history(self, orders):
         self.order_history.clear()
         for order in orders:
             order_id, year, campaign, total, net_due = order
@@ -456,17 +587,13 @@ class EditCustomerDialog(QDialog):
         if not order_id:
             return
 
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT campaign_year, campaign_number, order_total, 
-                   previous_balance, payment, net_due
-            FROM orders
-            WHERE order_id = ?
-        """, (order_id,))
-        order = cursor.fetchone()
-        conn.close()
+        # Scrolling through the history supersedes any order still loading
+        self.db.submit(
+            self, get_order, order_id, name="order_details",
+            on_result=self.show_order_details, on_error=self._load_failed,
+        )
 
+    def show_order_details(self, order):
         if order:
             self.order_year.setText(f"Campaign Year: {order[0]}")
             self.order_campaign.setText(f"Campaign Number: {order[1]}")
@@ -482,30 +609,29 @@ class EditCustomerDialog(QDialog):
         order_id = self.order_history.itemData(index)
         if not order_id:
             return
-        dialog = OrderEntryDialog(self.customer_id, 0, 0, self, order_id=order_id)
-        dialog.exec_()
+        self.order_entry(0, 0, order_id).exec_()
 
     def save_customer(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE customers SET
-                first_name = ?, last_name = ?, address = ?, city = ?, 
-                state = ?, zip_code = ?, 
-                cell_phone = ?, office_phone = ?, 
-                email = ?, status = ?
-            WHERE customer_id = ?
-        """, (
-            self.first_name_input.text(), self.last_name_input.text(), self.address_input.text(),
-            self.city_input.text(), self.state_input.text(), self.zip_code_input.text(),
-            self.cell_phone_input.text(), self.office_phone_input.text(),
-            self.email_input.text(), self.status_input.currentText(), self.customer_id
-        ))
-        conn.commit()
-        conn.close()
+        values = (*(widget.text() for widget in self._customer_inputs()), self.status_input.currentText())
+        self.btn_save.setEnabled(False)
+        self.db.submit(
+            self, update_customer, self.customer_id, values,
+            on_result=_unless_reloaded(self, self._customer_saved),
+            on_error=_unless_reloaded(self, self._save_failed, self._earlier_save_failed),
+        )
+
+    def _customer_saved(self, _):
         QMessageBox.information(self, "Success", "Customer updated successfully!")
         self.accept()
 
+    def _save_failed(self, error):
+        self.btn_save.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to save customer: {error}")
+
+    def _earlier_save_failed(self, error):
+        # A write for the customer shown before this one; still worth knowing about
+        QMessageBox.critical(self, "Error", f"A change to the previous customer could not be saved: {error}")
+
     def delete_selected_order(self):
         index = self.order_history.currentIndex()
         if index < 0:
@@ -523,22 +649,40 @@ class EditCustomerDialog(QDialog):
             QMessageBox.Yes | QMessageBox.No
         )
         if confirm == QMessageBox.Yes:
-            try:
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
+            self.db.submit(
+                self, delete_orders, [order_id],
+                on_result=_unless_reloaded(self, self._order_deleted),
+                on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to delete order: {e}"),
+            )
+
+    def record_payment(self):
+        """Record money received, against the order selected in the history if there is one."""
+        order_id = self.order_history.currentData()
+        applies_to = "the selected order" if order_id else "the account"
+        amount, ok = QInputDialog.getDouble(
+            self, "Record Payment", f"Amount received, applied to {applies_to}:",
+            max(self.balance, 0.0), 0.01, 100000.0, 2
+        )
+        if not ok:
+            return
+        self.btn_record_payment.setEnabled(False)
+        self.db.submit(
+            self, record_payment, self.customer_id, amount, order_id,
+            on_result=_unless_reloaded(self, self._payment_recorded),
+            on_error=_unless_reloaded(self, self._payment_failed, self._earlier_save_failed),
+        )
 
-                # First delete all products related to this order
-                cursor.execute("DELETE FROM order_products WHERE order_id = ?", (order_id,))
-                # Then delete the order itself
-                cursor.execute("DELETE FROM orders WHERE order_id = ?", (order_id,))
-                conn.commit()
-                conn.close()
+    def _payment_recorded(self, _):
+        self.btn_record_payment.setEnabled(True)
+        self.refresh_order_summary()
 
-                QMessageBox.information(self, "Deleted", "Order deleted successfully.")
-                self.refresh_order_summary()
+    def _payment_failed(self, error):
+        self.btn_record_payment.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to record payment: {error}")
 
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to delete order: {e}")
+    def _order_deleted(self, _):
+        QMessageBox.information(self, "Deleted", "Order deleted successfully.")
+        self.refresh_order_summary()
 
 class AddCustomerDialog(QDialog):
     """Dialog to Add a New Customer."""
@@ -546,6 +690,7 @@ class AddCustomerDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Add New Customer")
+        self.customer_id = None  # Set once the customer is saved
         layout = QVBoxLayout()
 
         # Field inputs
@@ -580,22 +725,15 @@ class AddCustomerDialog(QDialog):
             layout.addWidget(widget)
 
         # Save button
-        btn_save = QPushButton("Save Customer")
-        btn_save.clicked.connect(self.save_customer)
-        layout.addWidget(btn_save)
+        self.btn_save = QPushButton("Save Customer")
+        self.btn_save.clicked.connect(self.save_customer)
+        layout.addWidget(self.btn_save)
 
         self.setLayout(layout)
 
     def save_customer(self):
         """Insert new customer into the database."""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO customers (
-                first_name, last_name, address, city, state, zip_code,
-                cell_phone, office_phone, email, status
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        values = (
             self.first_name_input.text(),
             self.last_name_input.text(),
             self.address_input.text(),
@@ -606,13 +744,56 @@ class AddCustomerDialog(QDialog):
             self.office_phone_input.text(),
             self.email_input.text(),
             self.status_input.currentText()
-        ))
-        conn.commit()
-        conn.close()
+        )
+        self.btn_save.setEnabled(False)
+        get_db_worker().submit(
+            self, insert_customer, values,
+            on_result=self._customer_saved, on_error=self._save_failed,
+        )
 
+    def _customer_saved(self, customer_id):
+        self.customer_id = customer_id
         QMessageBox.information(self, "Success", "Customer added successfully!")
         self.accept()
 
+    def _save_failed(self, error):
+        self.btn_save.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to add customer: {error}")
+
+def _fetch_order(order_id):
+    """The order row and its OrderLines, for OrderEntryDialog (runs on DbWorker)."""
+    cursor = get_connection().cursor()
+    # Each line keeps its product_id so save_order can update these rows in
+    # place instead of re-inserting them
+    cursor.execute(f"""
+        SELECT {OrderLine.DB_COLUMNS}
+        FROM order_products
+        WHERE order_id = ?
+        ORDER BY product_id
+    """, (order_id,))
+    return get_order(order_id), [OrderLine.from_db_row(row) for row in cursor.fetchall()]
+
+
+def _write_order(customer_id, order_id, campaign_year, campaign_number, pricing, lines, product_ids):
+    """Insert a new order, or update an existing one in place (runs on DbWorker)."""
+    started = time.perf_counter()
+    order_total = pricing.grand_total
+    if order_id is None:
+        order_id = insert_order(customer_id, campaign_year, campaign_number, pricing, lines)
+        logger.info(
+            "order saved order_id=%s customer_id=%s lines=%d total=%.2f elapsed_ms=%.1f",
+            order_id, customer_id, len(lines), order_total, (time.perf_counter() - started) * 1000,
+        )
+    else:
+        changes = update_order(order_id, pricing, list(zip(product_ids, lines)))
+        logger.info(
+            "order updated order_id=%s inserted=%d updated=%d deleted=%d total=%.2f elapsed_ms=%.1f",
+            order_id, changes["inserted"], changes["updated"], changes["deleted"], order_total,
+            (time.perf_counter() - started) * 1000,
+        )
+    return order_id
+
+
 class OrderEntryDialog(QDialog):
     """Dialog to Enter Order Details for a Customer."""
     
@@ -620,16 +801,7 @@ class OrderEntryDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Order Entry")
         self.setGeometry(300, 200, 1000, 500)
-        self.customer_id = customer_id
-        # If order_id is provided, we will load that order’s details.
-        self.order_id = order_id
-        # Otherwise, use the provided campaign settings for a new order.
-        self.campaign_year = campaign_year
-        self.campaign_number = campaign_number
 
-        # Define order_date as the current date/time (or later overwritten if loading an existing order)
-        self.order_date = datetime.now().strftime("%A, %B %d, %Y %I:%M %p")
-        
         # Representative info can be set here or loaded from your database.
         self.rep_name = "Representative Name"
         self.rep_address = "Representative Address"
@@ -639,20 +811,24 @@ class OrderEntryDialog(QDialog):
 
         layout = QVBoxLayout()
 
-        # Set up Order Table
-        self.order_table = QTableWidget(0, 12)
-        self.order_table.setHorizontalHeaderLabels([
-            "Product #", "Page", "Description", "Shade/Fragrance", "Size", "QTY",
-            "Unit Price", "Reg Price", "Tax", "Discount %", "Total Price", "Proc. Fee"
-        ])
+        # Set up Order Table: lines live in the model, checkboxes are painted by a delegate
+        self.order_model = OrderTableModel(self)
+        self.order_model.totalsChanged.connect(self.update_total)
+        self.order_table = QTableView()
+        self.order_table.setModel(self.order_model)
+        self.order_table.setEditTriggers(
+            QAbstractItemView.DoubleClicked | QAbstractItemView.EditKeyPressed | QAbstractItemView.AnyKeyPressed
+        )
+        self.checkbox_delegate = CheckBoxDelegate(self.order_table)
+        for column in CHECK_COLUMNS:
+            self.order_table.setItemDelegateForColumn(column, self.checkbox_delegate)
+        self.product_delegate = ProductNumberDelegate(self.order_table)
+        self.order_table.setItemDelegateForColumn(PRODUCT_NUMBER, self.product_delegate)
         self.order_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         # Set minimum width for "Proc. Fee" to ensure checkbox is visible
         self.order_table.setColumnWidth(11, 90)
         layout.addWidget(self.order_table)
 
-        # Connect the itemChanged signal once.
-        self.order_table.itemChanged.connect(self.update_total)
-
         # Buttons for actions
         btn_layout = QHBoxLayout()
         self.btn_add_row = QPushButton("Add Product")
@@ -672,485 +848,149 @@ class OrderEntryDialog(QDialog):
 
         self.setLayout(layout)
 
+        self.loads = 0  # bumped by load(); see _unless_reloaded()
+        self.load(customer_id, campaign_year, campaign_number, order_id)
+
+    def load(self, customer_id, campaign_year, campaign_number, order_id=None):
+        """Start a new order, or open order_id, in this dialog; the table and delegates are kept."""
+        get_db_worker().cancel(self, "order")
+        self.loads += 1
+        self.customer_id = customer_id
+        # If order_id is provided, we will load that order’s details.
+        self.order_id = order_id
+        # Otherwise, use the provided campaign settings for a new order.
+        self.campaign_year = campaign_year
+        self.campaign_number = campaign_number
+
+        # Define order_date as the current date/time (or later overwritten if loading an existing order)
+        self.order_date = datetime.now().strftime("%A, %B %d, %Y %I:%M %p")
+
+        self.order_model.set_lines([])
+        self.total_label.setText("Total: $0.00")
+        self.btn_save_order.setEnabled(True)
+
+        # Product # lookups; until the catalog arrives lines are simply typed in full.
+        # get_catalog() only rereads products if they changed since the last order.
+        get_db_worker().submit(
+            self, get_catalog, name="catalog",
+            on_result=self.set_catalog,
+            on_error=lambda e: logger.warning("product catalog unavailable: %s", e),
+        )
+
         # If an order_id was provided, load its details.
         if self.order_id is not None:
             self.load_order_details(self.order_id)
 
+    def set_catalog(self, catalog):
+        self.order_model.catalog = catalog
+        self.product_delegate.set_catalog(catalog)
+
     def add_order_row(self):
         """Add a new row to the order table."""
-        row_position = self.order_table.rowCount()
-        self.order_table.insertRow(row_position)
-
-        # Adding input fields to each column
-        self.order_table.setItem(row_position, 0, QTableWidgetItem(""))  # Product Number
-        self.order_table.setItem(row_position, 1, QTableWidgetItem(""))  # Page
-        self.order_table.setItem(row_position, 2, QTableWidgetItem(""))  # Description
-        self.order_table.setItem(row_position, 3, QTableWidgetItem(""))  # Shade/Fragrance
-        self.order_table.setItem(row_position, 4, QTableWidgetItem(""))  # Size
-        self.order_table.setItem(row_position, 5, QTableWidgetItem("1"))  # QTY
-        self.order_table.setItem(row_position, 6, QTableWidgetItem("$0.00"))  # Unit Price
-        self.order_table.setItem(row_position, 7, QTableWidgetItem("$0.00"))  # Reg Price
-
-        # Tax Checkbox
-        tax_checkbox = QCheckBox()
-        tax_checkbox.setChecked(False)
-        tax_widget = QWidget()
-        tax_layout = QHBoxLayout(tax_widget)
-        tax_layout.addWidget(tax_checkbox)
-        tax_layout.setAlignment(Qt.AlignCenter)
-        tax_layout.setContentsMargins(0, 0, 0, 0)
-        self.order_table.setCellWidget(row_position, 8, tax_widget)
-        self.order_table.setItem(row_position, 8, QTableWidgetItem())
-        self.order_table.item(row_position, 8).setFlags(Qt.ItemIsEnabled)
-
-        # Processing Checkbox
-        proc_checkbox = QCheckBox()
-        proc_checkbox.setChecked(False)
-        proc_widget = QWidget()
-        proc_layout = QHBoxLayout(proc_widget)
-        proc_layout.addWidget(proc_checkbox)
-        proc_layout.setAlignment(Qt.AlignCenter)
-        proc_layout.setContentsMargins(0, 0, 0, 0)
-        self.order_table.setCellWidget(row_position, 11, proc_widget)
-        self.order_table.setItem(row_position, 11, QTableWidgetItem())
-        self.order_table.item(row_position, 11).setFlags(Qt.ItemIsEnabled)
-
-        # Discount %
-        self.order_table.setItem(row_position, 9, QTableWidgetItem("0"))
-
-        # Ensure Total Price column starts with "$0.00"
-        self.order_table.setItem(row_position, 10, QTableWidgetItem("$0.00"))
-
-        # Connect events
-        self.order_table.itemChanged.connect(self.update_total)
-
-    def update_total(self, changed_item):
-        if changed_item and changed_item.column() in (6, 7):
-            text = changed_item.text()
-            if text and not text.startswith("$"):
-                self.order_table.blockSignals(True)
-                cleaned_text = text.replace("$", "")
-                changed_item.setText(f"${cleaned_text}")
-                self.order_table.blockSignals(False)
-
-        total = 0.0
-        for row in range(self.order_table.rowCount()):
-            try:
-                qty_item = self.order_table.item(row, 5)
-                unit_price_item = self.order_table.item(row, 6)
-                discount_item = self.order_table.item(row, 9)
-                tax_widget = self.order_table.cellWidget(row, 8)
-
-                qty = float(qty_item.text()) if qty_item and qty_item.text().strip() else 0
-                unit_price = float(unit_price_item.text().replace("$", "")) if unit_price_item and unit_price_item.text().strip() else 0
-                discount = float(discount_item.text()) if discount_item and discount_item.text().strip() else 0
-
-                base_price = unit_price * qty
-                discounted_price = base_price * ((100 - discount) / 100)
-
-                # Properly access checkbox inside widget
-                tax_checkbox = tax_widget.layout().itemAt(0).widget() if tax_widget and tax_widget.layout().count() > 0 else None
-                tax_amount = discounted_price * 0.09386 if tax_checkbox and tax_checkbox.isChecked() else 0.0
-
-                final_price = discounted_price + tax_amount
-
-                total_price_item = self.order_table.item(row, 10)
-                if not total_price_item:
-                    self.order_table.setItem(row, 10, QTableWidgetItem(f"${final_price:.2f}"))
-                else:
-                    total_price_item.setText(f"${final_price:.2f}")
-
-                total += final_price
-
-            except Exception as e:
-                print(f"[Warning] Skipping row {row}: {e}")
-                continue
-
-        self.total_label.setText(f"Total: ${total:.2f}")
+        self.order_model.add_line()
 
-    def open_order_entry(self):
-        """Open Order Entry Window using current campaign settings."""
-        current_year, current_campaign = get_current_campaign_settings()
-        self.order_entry_dialog = OrderEntryDialog(self.customer_id, current_year, current_campaign, self)
-        self.order_entry_dialog.exec_()
-        # Refresh the order summary after closing the Order Entry dialog
-        self.refresh_order_summary()
+    def update_total(self, pricing):
+        """totalsChanged slot: show the order's grand total."""
+        self.total_label.setText(f"Total: ${pricing.grand_total:.2f}")
 
     def load_order_details(self, order_id):
-        """Load the order details and products from the database into the dialog."""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        # Updated query: use time_submitted instead of order_date
-        cursor.execute("""
-            SELECT campaign_year, campaign_number, order_total, previous_balance, payment, net_due, time_submitted
-            FROM orders
-            WHERE order_id = ?
-        """, (order_id,))
-        order_data = cursor.fetchone()
+        """Load the order details and products from the database into the dialog (in the background)."""
+        self.btn_save_order.setEnabled(False)  # until the lines to update are known
+        get_db_worker().submit(
+            self, _fetch_order, order_id, name="order",
+            on_result=self.show_order_details,
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to load the order: {e}"),
+        )
+
+    def show_order_details(self, order):
+        order_data, lines = order
         if order_data:
             self.campaign_year = order_data[0]
             self.campaign_number = order_data[1]
             # Update internal variable for display, if desired
             self.order_date = order_data[6]  # now using time_submitted
             self.total_label.setText(f"Total: ${order_data[2]:.2f}")
-        # Load the associated products (unchanged)
-        cursor.execute("""
-            SELECT product_number, page, description, shade, size, qty, unit_price, reg_price, tax, discount, total_price
-            FROM order_products
-            WHERE order_id = ?
-        """, (order_id,))
-        products = cursor.fetchall()
-        conn.close()
-        for product in products:
-            row_position = self.order_table.rowCount()
-            self.order_table.insertRow(row_position)
-            self.order_table.setItem(row_position, 0, QTableWidgetItem(product[0]))
-            self.order_table.setItem(row_position, 1, QTableWidgetItem(product[1]))
-            self.order_table.setItem(row_position, 2, QTableWidgetItem(product[2]))
-            self.order_table.setItem(row_position, 3, QTableWidgetItem(product[3]))
-            self.order_table.setItem(row_position, 4, QTableWidgetItem(product[4]))
-            self.order_table.setItem(row_position, 5, QTableWidgetItem(str(product[5])))
-            self.order_table.setItem(row_position, 6, QTableWidgetItem(f"${product[6]:.2f}"))
-            self.order_table.setItem(row_position, 7, QTableWidgetItem(f"${product[7]:.2f}"))
-            
-            tax_checkbox = QCheckBox()
-            tax_checkbox.setChecked(bool(product[8]))
-
-            tax_widget = QWidget()
-            tax_layout = QHBoxLayout(tax_widget)
-            tax_layout.addWidget(tax_checkbox)
-            tax_layout.setAlignment(Qt.AlignCenter)
-            tax_layout.setContentsMargins(0, 0, 0, 0)
-
-            self.order_table.setCellWidget(row_position, 8, tax_widget)
-
-            # --- Add after setting up Tax checkbox ---
-            proc_checkbox = QCheckBox()
-            # Optionally, you can load this from database if you add a new column
-            proc_checkbox.setChecked(False)  # Default: False
-
-            proc_widget = QWidget()
-            proc_layout = QHBoxLayout(proc_widget)
-            proc_layout.addWidget(proc_checkbox)
-            proc_layout.setAlignment(Qt.AlignCenter)
-            proc_layout.setContentsMargins(0, 0, 0, 0)
-
-            self.order_table.setCellWidget(row_position, 11, proc_widget)
-
-
-            self.order_table.setItem(row_position, 9, QTableWidgetItem(str(product[9])))
-            self.order_table.setItem(row_position, 10, QTableWidgetItem(f"${product[10]:.2f}"))
-        self.update_total(None)
+
+        # One model reset fills the table; hold off repainting until it is done
+        started = time.perf_counter()
+        self.order_table.setUpdatesEnabled(False)
+        try:
+            self.order_model.set_lines(lines)
+        finally:
+            self.order_table.setUpdatesEnabled(True)
+        self.btn_save_order.setEnabled(True)
+        logger.debug("order loaded order_id=%s lines=%d elapsed_ms=%.1f",
+                     self.order_id, len(lines), (time.perf_counter() - started) * 1000)
 
     def save_order(self):
         """Save order to the database and update order history."""
-        print("Save Order button clicked.")
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-
-            # Ensure orders table exists
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS orders (
-                    order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    customer_id INTEGER,
-                    campaign_year INTEGER,
-                    campaign_number INTEGER,
-                    order_total REAL DEFAULT 0,
-                    previous_balance REAL DEFAULT 0,
-                    payment REAL DEFAULT 0,
-                    net_due REAL DEFAULT 0,
-                    time_submitted TEXT DEFAULT (datetime('now', 'localtime')),
-                    last_edited TEXT DEFAULT (datetime('now', 'localtime'))
-                )
-            """)
-
-            # Ensure order_products table has 'processing' column
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS order_products (
-                    product_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    order_id INTEGER,
-                    product_number TEXT,
-                    page TEXT,
-                    description TEXT,
-                    shade TEXT,
-                    size TEXT,
-                    qty INTEGER,
-                    unit_price REAL,
-                    reg_price REAL,
-                    tax INTEGER,
-                    discount REAL,
-                    total_price REAL,
-                    processing INTEGER DEFAULT 0
-                )
-            """)
-
-            # Calculate order_total
-            order_total = 0.0
-            for row in range(self.order_table.rowCount()):
-                total_price_item = self.order_table.item(row, 10)
-                if total_price_item and total_price_item.text().strip():
-                    try:
-                        row_total = float(total_price_item.text().replace("$", ""))
-                        order_total += row_total
-                    except ValueError:
-                        print(f"Invalid total at row {row}: {total_price_item.text()}")
-                        continue
-
-            print(f"Calculated order total: {order_total}")
-
-            # Insert new order
-            cursor.execute("""
-                INSERT INTO orders (customer_id, campaign_year, campaign_number, order_total, previous_balance, payment, net_due)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                self.customer_id,
-                self.campaign_year,
-                self.campaign_number,
-                order_total,
-                0,
-                0,
-                order_total
-            ))
-            order_id = cursor.lastrowid
-            print(f"Order inserted with order_id: {order_id}")
-
-            # Save products
-            for row in range(self.order_table.rowCount()):
-                try:
-                    product_number = self.order_table.item(row, 0).text()
-                    page = self.order_table.item(row, 1).text()
-                    description = self.order_table.item(row, 2).text()
-                    shade = self.order_table.item(row, 3).text()
-                    if shade.strip():
-                        description += f" — {shade.strip()}"
-                    size = self.order_table.item(row, 4).text()
-                    qty = int(self.order_table.item(row, 5).text())
-                    unit_price = float(self.order_table.item(row, 6).text().replace("$", "").strip())
-                    reg_price = float(self.order_table.item(row, 7).text().replace("$", "").strip())
-
-                    # --- Tax checkbox ---
-                    tax_widget = self.order_table.cellWidget(row, 8)
-                    tax_checkbox = tax_widget.layout().itemAt(0).widget() if tax_widget and tax_widget.layout().count() > 0 else None
-                    tax = 1 if tax_checkbox and tax_checkbox.isChecked() else 0
-
-                    # --- Discount ---
-                    discount = float(self.order_table.item(row, 9).text())
-
-                    # --- Total Price ---
-                    total_price = float(self.order_table.item(row, 10).text().replace("$", "").strip())
-
-                    # --- Processing checkbox ---
-                    proc_widget = self.order_table.cellWidget(row, 11)
-                    proc_checkbox = proc_widget.layout().itemAt(0).widget() if proc_widget and proc_widget.layout().count() > 0 else None
-                    processing = 1 if proc_checkbox and proc_checkbox.isChecked() else 0
-
-                    cursor.execute("""
-                        INSERT INTO order_products 
-                        (order_id, product_number, page, description, shade, size, qty, unit_price, reg_price, tax, discount, total_price, processing)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        order_id, product_number, page, description, shade, size, qty,
-                        unit_price, reg_price, tax, discount, total_price, processing
-                    ))
-                    print(f"Inserted product for row {row}")
-
-                except Exception as e:
-                    print(f"Error inserting product for row {row}: {e}")
-                    continue
-
-            conn.commit()
-            conn.close()
-
-            QMessageBox.information(self, "Saved", "Order saved successfully!")
-            # Force refresh of parent window if it's an EditCustomerDialog
-            if isinstance(self.parent(), EditCustomerDialog):
-                self.parent().refresh_order_summary()
-
-            self.accept()
-
-        except Exception as e:
-            print("Error in save_order:", e)
-            QMessageBox.critical(self, "Error", f"An error occurred while saving the order: {e}")
+        # Price every line in one pass, then write them in one batch
+        pricing = self.order_model.pricing()
+        order_lines = self.order_model.lines
+        for line, line_total, line_discount in zip(order_lines, pricing.line_totals, pricing.line_discounts):
+            line.total_price, line.line_discount = line_total, line_discount
+        lines = [line.as_db_tuple() for line in order_lines]
+        product_ids = [line.product_id for line in order_lines]
+
+        self.btn_save_order.setEnabled(False)
+        get_db_worker().submit(
+            self, _write_order, self.customer_id, self.order_id, self.campaign_year, self.campaign_number,
+            pricing, lines, product_ids,
+            on_result=_unless_reloaded(self, self._order_saved, self._earlier_order_saved),
+            on_error=_unless_reloaded(self, self._save_failed, self._earlier_save_failed),
+        )
+
+    def _order_saved(self, _):
+        QMessageBox.information(self, "Saved", "Order saved successfully!")
+        # Force refresh of parent window if it's an EditCustomerDialog
+        if isinstance(self.parent(), EditCustomerDialog):
+            self.parent().refresh_order_summary()
+
+        self.accept()
+
+    def _save_failed(self, error):
+        self.btn_save_order.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"An error occurred while saving the order: {error}")
+
+    def _earlier_order_saved(self, _):
+        # Saved after the dialog moved on to another order; the summary should still show it
+        if isinstance(self.parent(), EditCustomerDialog):
+            self.parent().refresh_order_summary()
+
+    def _earlier_save_failed(self, error):
+        # The save of the order shown before this one
+        QMessageBox.critical(self, "Error", f"The previous order could not be saved: {error}")
 
     def print_order(self):
-        from reportlab.lib.pagesizes import letter
-        from reportlab.pdfgen import canvas
-        from reportlab.lib import colors
-        from reportlab.platypus import Table, TableStyle
-        from reportlab.lib.units import inch
-        from datetime import datetime
-        from db_utils import get_representative_info
-        import math
-
-        def format_phone(raw):
-            digits = ''.join(filter(str.isdigit, raw))
-            return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}" if len(digits) == 10 else raw
-        
-        def round_up(value):
-            return math.ceil(value * 100) / 100  # Always round up to the next cent
-
-
-        rep_info = get_representative_info()
-        campaign_number = self.parent().campaign_number if hasattr(self.parent(), "campaign_number") else "7"
-        campaign_date = datetime.now().strftime("%A, %B %d, %Y")
-        today_str = datetime.now().strftime("%Y-%m-%d")
-
-        # --- Customer info ---
-        customer_name = f"{self.parent().first_name_input.text()} {self.parent().last_name_input.text()}"
-        customer_address = self.parent().address_input.text()
-        customer_cell = self.parent().cell_phone_input.text()
-        customer_office = self.parent().office_phone_input.text()
-
-        downloads_folder = str(pathlib.Path.home() / "Downloads")
-        filename = os.path.join(downloads_folder, f"invoice-{customer_name.replace(' ', '_').lower()}-{today_str}.pdf")
-
-        c = canvas.Canvas(filename, pagesize=letter)
-        width, height = letter
-
-        # --- Header ---
-        c.setFont("Helvetica", 9)
-
-        # Customer Info (Top Left)
-        y_cust = 770
-        c.drawString(40, y_cust, customer_name)
-        y_cust -= 15
-        c.drawString(40, y_cust, customer_address)
-        if customer_cell.strip():
-            y_cust -= 15
-            c.drawString(40, y_cust, f"Cell: {format_phone(customer_cell)}")
-        if customer_office.strip():
-            y_cust -= 15
-            c.drawString(40, y_cust, f"Office: {format_phone(customer_office)}")
-
-        # Rep Info (Top Right)
-        y_rep = 770
-        c.drawRightString(width - 40, y_rep, rep_info["rep_name"])
-        c.drawRightString(width - 40, y_rep - 15, rep_info["rep_address"])
-        if rep_info.get("rep_office_phone", "").strip():
-            c.drawRightString(width - 40, y_rep - 30, f"Office: {format_phone(rep_info['rep_office_phone'])}")
-        if rep_info.get("rep_email", "").strip():
-            c.drawRightString(width - 40, y_rep - 45, f"Email: {rep_info['rep_email']}")
-        if rep_info.get("rep_website", "").strip():
-            c.drawRightString(width - 40, y_rep - 60, f"Visit my website at: {rep_info['rep_website']}")
-        if rep_info.get("rep_cell_phone", "").strip():
-            c.drawRightString(width - 40, y_rep - 75, f"Cell/Text: {format_phone(rep_info['rep_cell_phone'])}")
-
-        # Centered Title
-        c.setFont("Helvetica-Bold", 13)
-        c.drawCentredString(width / 2, 735, f"AVON BY {rep_info['rep_name']}")
-        c.setFont("Helvetica-Bold", 11)
-        c.drawCentredString(width / 2, 720, "*** CUSTOMER ORDER ***")
-        c.setFont("Helvetica", 10)
-        c.drawCentredString(width / 2, 705, f"Campaign #{campaign_number}")
-        c.drawCentredString(width / 2, 690, campaign_date)
-
-        styles = getSampleStyleSheet()
-        normal_style = styles["Normal"]
-
-        # Order Table
-        data = [["Page", "Product #", "Product", "Qty", "Unit Price", "Total"]]
-        subtotal = 0.0
-        total_discount = 0.0
-        processing_count = 0
-        apply_tax = False
-
-        for row in range(self.order_table.rowCount()):
-            try:
-                page = self.order_table.item(row, 1).text()
-                product_number = self.order_table.item(row, 0).text()
-                description = self.order_table.item(row, 2).text()
-                shade = self.order_table.item(row, 3).text()
-                if shade.strip():
-                    description += f" — {shade.strip()}"
-                qty = int(self.order_table.item(row, 5).text())
-                unit_price = float(self.order_table.item(row, 6).text().replace("$", "").strip())
-                reg_price = float(self.order_table.item(row, 7).text().replace("$", "").strip())
-                discount_percent = float(self.order_table.item(row, 9).text() or 0)
-
-                tax_widget = self.order_table.cellWidget(row, 8)
-                proc_widget = self.order_table.cellWidget(row, 11)
-
-                tax_checkbox = tax_widget.layout().itemAt(0).widget() if tax_widget and tax_widget.layout().count() > 0 else None
-                proc_checkbox = proc_widget.layout().itemAt(0).widget() if proc_widget and proc_widget.layout().count() > 0 else None
-
-                tax_checked = tax_checkbox.isChecked() if tax_checkbox else False
-                proc_checked = proc_checkbox.isChecked() if proc_checkbox else False
-
-                if proc_checked:
-                    processing_count += 1
-
-                if tax_checked:
-                    apply_tax = True
-
-                unit_discount = reg_price * (discount_percent / 100)
-                discounted_price = unit_price - unit_discount
-                total_price = round_up(discounted_price * qty)
-
-                if discount_percent > 0:
-                    discount_total = round_up(unit_discount * qty)
-                    description += f" (Discount {int(discount_percent)}% for -${discount_total:.2f})"
-                    total_discount += discount_total
-
-                subtotal += total_price
-
-                data.append([
-                    page,
-                    product_number,
-                    Paragraph(description, ParagraphStyle(name='Normal', fontName='Helvetica', fontSize=9)),
-                    str(qty),
-                    f"${unit_price:.2f}",
-                    f"${total_price:.2f}"
-                ])
-            except Exception as e:
-                print(f"Error in row {row}: {e}")
-
-        table = Table(data, colWidths=[0.7*inch, 1*inch, 2.4*inch, 0.6*inch, 1*inch, 1*inch])
-        table.setStyle(TableStyle([
-            ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-            ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
-            ('ALIGN', (0,0), (-1,0), 'CENTER'),
-            ('ALIGN', (3,1), (-1,-1), 'RIGHT'),
-            ('FONT', (0,0), (-1,0), 'Helvetica-Bold'),
-            ('FONT', (0,1), (-1,-1), 'Helvetica'),
-        ]))
-        table.wrapOn(c, width, height)
-        table.drawOn(c, 60, 520)
-
-        # Totals Section
-        tax_rate = 9.386 / 100
-        tax_amount = round_up(subtotal * tax_rate) if apply_tax else 0.0
-        processing_charge = round_up(0.50 * processing_count)
-        grand_total = round_up(subtotal + tax_amount + processing_charge)
-
-        totals_data = [["Sub Total:", f"${subtotal:.2f}"]]
-        if total_discount > 0:
-            totals_data.append(["Line Item Discounts:", f"-${total_discount:.2f}"])
-        if processing_count > 0:
-            totals_data.append(["Processing:", f"${processing_charge:.2f}"])
-        if apply_tax:
-            totals_data.append(["Tax (9.386%):", f"${tax_amount:.2f}"])
-        totals_data.append(["Grand Total:", f"${grand_total:.2f}"])
-
-
-        totals_table = Table(totals_data, colWidths=[1.5 * inch, 1 * inch])
-        totals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONT', (0, 0), (-1, -2), 'Helvetica'),
-            ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
-            ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ]))
-        totals_table.wrapOn(c, width, height)
-        totals_table.drawOn(c, width - 220, 400)
-
-        # --- Thank You Message (just under totals) ---
-        c.setFont("Helvetica-Oblique", 10)
-        c.drawCentredString(width / 2, 385, "Thank you for your order!")
-        c.save()
+        """Render this order's invoice in a worker process, then open it."""
+        customer = self.parent()
+        customer_name = f"{customer.first_name_input.text()} {customer.last_name_input.text()}"
+        lines = [
+            (line.page, line.product_number, line.description, line.shade, line.qty,
+             line.unit_price, line.reg_price, line.discount, line.tax, line.processing)
+            for line in self.order_model.lines
+        ]
+        invoice = Invoice(
+            customer_name, customer.address_input.text(),
+            customer.cell_phone_input.text(), customer.office_phone_input.text(),
+            get_representative_info(), self.campaign_number,
+            datetime.now().strftime("%A, %B %d, %Y"), lines,
+        )
+
+        self.btn_print_order.setEnabled(False)
+        try:
+            filename = downloads_path(invoice_filename(customer_name, datetime.now().strftime("%Y-%m-%d")))
+        except OSError as e:
+            self._invoice_failed(e)
+            return
+        watch_future(self, submit_invoice(invoice, filename), self._invoice_printed, self._invoice_failed)
+
+    def _invoice_printed(self, filename):
+        self.btn_print_order.setEnabled(True)
         QMessageBox.information(self, "Saved", f"Invoice exported to:\n{filename}")
+        open_pdf(filename)
 
-        # Auto open the PDF
-        import subprocess
-        subprocess.Popen([filename], shell=True)
\ No newline at end of file
+    def _invoice_failed(self, error):
+        self.btn_print_order.setEnabled(True)
+        logger.error("invoice failed customer_id=%s", self.customer_id, exc_info=error)
+        QMessageBox.critical(self, "Error", f"Failed to create the invoice: {error}")
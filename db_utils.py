@@ -1,117 +1,449 @@
-import sqlite3
+import logging
 import os
-from config import DB_PATH, SETTINGS_FILE, LOG_FILE
-import configparser
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from config import DB_PATH
+from migrations import DATA_VERSION_TABLES, migrate
 
-def initialize_database():
-    """Initialize all required database tables."""
-    conn = sqlite3.connect(DB_PATH)
+logger = logging.getLogger(__name__)
+
+# === CONNECTION MANAGER ===
+# Opening a connection on a network share is slow, so every thread keeps one
+# long-lived connection and reuses it (and its prepared statement cache).
+STATEMENT_CACHE_SIZE = 256
+BUSY_TIMEOUT_MS = 5000
+
+CONNECTION_PRAGMAS = (
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",  # ~8 MB page cache
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+)
+
+# WAL lets reads run alongside a write, but it relies on shared memory on the
+# machine that holds the file and does not work over a network filesystem.
+# A database on a share, which several PCs may open, keeps the rollback
+# journal with full syncs instead: slower writes, but no risk of corruption.
+LOCAL_JOURNAL_PRAGMAS = ("PRAGMA journal_mode = WAL", "PRAGMA synchronous = NORMAL")
+NETWORK_JOURNAL_PRAGMAS = ("PRAGMA journal_mode = DELETE", "PRAGMA synchronous = FULL")
+
+_DRIVE_REMOTE = 4  # GetDriveTypeW() result for a mapped network drive
+
+_local = threading.local()
+
+
+def is_network_path(path):
+    """True for a UNC path (\\\\server\\share\\...) or, on Windows, a path on a mapped network drive."""
+    if str(path).startswith(("\\\\", "//")):
+        return True
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(os.path.abspath(path))[0]
+        if drive:
+            return ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == _DRIVE_REMOTE
+    return False
+
+
+def _journal_pragmas():
+    return NETWORK_JOURNAL_PRAGMAS if is_network_path(DB_PATH) else LOCAL_JOURNAL_PRAGMAS
+
+
+def open_connection(check_same_thread=True):
+    """A new connection set up like every shared one; the caller owns it and must close it."""
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=check_same_thread,
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    journal_mode, synchronous = _journal_pragmas()
+    wanted = journal_mode.rsplit("=", 1)[1].strip().lower()
+    mode = conn.execute(journal_mode).fetchone()[0]
+    if mode != wanted:
+        # Switching out of WAL needs the only connection to the file; try again next time
+        logger.warning("database journal_mode is %s, wanted %s (database in use elsewhere?)", mode, wanted)
+    conn.execute(synchronous)
+    return conn
+
+
+def get_connection():
+    """Return this thread's shared database connection, opening it on first use.
+
+    Callers must not close the returned connection; use close_connection() instead.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = open_connection()
+        _local.conn = conn
+    return conn
+
+
+def close_connection():
+    """Close this thread's shared connection (e.g. on app exit or worker shutdown)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def use_connection(conn):
+    """Make conn this thread's shared connection until the block ends, without closing it.
+
+    For a worker that keeps one connection while its tasks run on pool
+    threads, which do not keep thread-locals between tasks.
+    """
+    previous = getattr(_local, "conn", None)
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = previous
+
+
+@contextmanager
+def transaction():
+    """Yield a cursor on the shared connection; commit on success, roll back on error."""
+    conn = get_connection()
     cursor = conn.cursor()
+    try:
+        yield cursor
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
 
-    # Customers Table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS customers (
-            customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT,
-            last_name TEXT,
-            address TEXT,
-            city TEXT,
-            state TEXT,
-            zip_code TEXT,
-            office_phone TEXT,
-            cell_phone TEXT,
-            email TEXT,
-            status TEXT
+
+def initialize_database():
+    """Create or upgrade the database schema. Call once at startup."""
+    migrate(get_connection())
+
+
+def fetch_all(sql, params=()):
+    """Run a read-only query and return every row (e.g. a query built on the GUI thread for DbWorker)."""
+    cursor = get_connection().cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def get_data_versions(tables=DATA_VERSION_TABLES):
+    """{table: change counter} for tables from DATA_VERSION_TABLES; triggers bump a table's counter on every write."""
+    cursor = get_connection().cursor()
+    cursor.execute(
+        f"SELECT name, version FROM data_versions WHERE name IN ({', '.join('?' * len(tables))})", tuple(tables)
+    )
+    return dict(cursor.fetchall())
+
+
+def with_data_versions(tables, fn, *args):
+    """(get_data_versions(tables), fn(*args)), for a window to compare against when it is shown again.
+
+    The counters are read first, so a write that lands in between is reloaded
+    next time rather than missed.
+    """
+    return get_data_versions(tables), fn(*args)
+
+# === CUSTOMERS ===
+# Column order for the customer value tuples used below
+CUSTOMER_COLUMNS = (
+    "first_name", "last_name", "address", "city", "state", "zip_code",
+    "cell_phone", "office_phone", "email", "status",
+)
+
+
+def get_customer(customer_id):
+    """Return the customer's values in CUSTOMER_COLUMNS order, or None if there is no such customer."""
+    cursor = get_connection().cursor()
+    cursor.execute(f"SELECT {', '.join(CUSTOMER_COLUMNS)} FROM customers WHERE customer_id = ?", (customer_id,))
+    return cursor.fetchone()
+
+
+def insert_customer(values):
+    """Insert a customer from values in CUSTOMER_COLUMNS order. Returns the new customer_id."""
+    with transaction() as cursor:
+        cursor.execute(
+            f"INSERT INTO customers ({', '.join(CUSTOMER_COLUMNS)}) VALUES ({_placeholders(CUSTOMER_COLUMNS)})",
+            tuple(values),
         )
-    """)
+        return cursor.lastrowid
+
+
+def update_customer(customer_id, values):
+    """Overwrite a customer with values in CUSTOMER_COLUMNS order."""
+    assignments = ", ".join(f"{column} = ?" for column in CUSTOMER_COLUMNS)
+    with transaction() as cursor:
+        cursor.execute(f"UPDATE customers SET {assignments} WHERE customer_id = ?", (*values, customer_id))
+
+# === ORDER READS ===
+# orders.net_due is what is left to pay on that order alone. The balance
+# carried onto an order - what is still owed on the customer's earlier
+# orders, with payments not made against a later order counted against it -
+# is worked out when the order is read, so editing or deleting an earlier
+# order or payment can never leave it stale. For the latest order, carried
+# balance plus net_due is the customer's customer_balances balance.
+_CARRIED_BALANCE = """
+    ROUND(IFNULL((SELECT SUM(earlier.order_total) FROM orders earlier
+                  WHERE earlier.customer_id = o.customer_id AND earlier.order_id < o.order_id), 0)
+          - IFNULL((SELECT SUM(paid.amount) FROM payments paid
+                    WHERE paid.customer_id = o.customer_id
+                      AND (paid.order_id IS NULL OR paid.order_id < o.order_id)), 0), 2)
+"""
+
+
+def _order_summary(where, params):
+    # (campaign_year, campaign_number, order_total, previous_balance, payment, net_due, time_submitted,
+    # last_edited) for the first order matching where, net_due including the carried balance
+    cursor = get_connection().cursor()
+    cursor.execute(f"""
+        SELECT campaign_year, campaign_number, order_total,
+               carried, payment, ROUND(carried + net_due, 2),
+               time_submitted, last_edited
+        FROM (SELECT o.*, {_CARRIED_BALANCE} AS carried FROM orders o WHERE {where} LIMIT 1)
+    """, params)
+    return cursor.fetchone()
+
+
+def get_latest_order(customer_id):
+    """The customer's most recent order as (campaign_year, campaign_number, order_total,
+    previous_balance, payment, net_due, time_submitted, last_edited), or None."""
+    return _order_summary("o.customer_id = ? ORDER BY o.time_submitted DESC, o.order_id DESC", (customer_id,))
 
-    # Orders Table
+
+def get_order_history(customer_id):
+    """(order_id, campaign_year, campaign_number, order_total, net_due) for each order, newest first."""
+    cursor = get_connection().cursor()
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS orders (
-            order_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_id INTEGER,
-            campaign_year INTEGER,
-            campaign_number INTEGER,
-            order_total REAL DEFAULT 0,
-            previous_balance REAL DEFAULT 0,
-            payment REAL DEFAULT 0,
-            net_due REAL DEFAULT 0,
-            time_submitted TEXT DEFAULT (datetime('now', 'localtime')),
-            last_edited TEXT DEFAULT (datetime('now', 'localtime')),
-            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        SELECT order_id, campaign_year, campaign_number, order_total, net_due
+        FROM orders
+        WHERE customer_id = ?
+        ORDER BY time_submitted DESC
+    """, (customer_id,))
+    return cursor.fetchall()
+
+
+def get_order(order_id):
+    """(campaign_year, campaign_number, order_total, previous_balance, payment, net_due, time_submitted)
+    for one order, or None."""
+    row = _order_summary("o.order_id = ?", (order_id,))
+    return row[:7] if row else None
+
+# === ORDER WRITES ===
+# Column order for the line tuples passed to insert_order()
+ORDER_PRODUCT_COLUMNS = (
+    "product_number", "page", "description", "shade", "size", "qty",
+    "unit_price", "reg_price", "tax", "discount", "total_price", "processing", "line_discount",
+)
+
+
+def _breakdown(pricing):
+    # orders.subtotal, discount_total, tax_total, processing_total (what the reports add up)
+    return (pricing.subtotal, pricing.discount_total, pricing.tax, pricing.processing)
+
+
+def insert_order(customer_id, campaign_year, campaign_number, pricing, lines):
+    """Insert an order and all of its product lines in one transaction. Returns the new order_id.
+
+    pricing is the order's pricing.OrderPricing; lines is a list of tuples in
+    ORDER_PRODUCT_COLUMNS order.
+    """
+    columns = ", ".join(ORDER_PRODUCT_COLUMNS)
+    marks = _placeholders(ORDER_PRODUCT_COLUMNS)
+    order_total = pricing.grand_total
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO orders (customer_id, campaign_year, campaign_number, order_total, previous_balance, payment, net_due,
+                                subtotal, discount_total, tax_total, processing_total, time_submitted, last_edited)
+            VALUES (?, ?, ?, ?, 0, 0, ?, ?, ?, ?, ?, datetime('now', 'localtime'), datetime('now', 'localtime'))
+        """, (customer_id, campaign_year, campaign_number, order_total, order_total, *_breakdown(pricing)))
+        order_id = cursor.lastrowid
+        cursor.executemany(
+            f"INSERT INTO order_products (order_id, {columns}) VALUES (?, {marks})",
+            [(order_id, *line) for line in lines],
         )
-    """)
+    return order_id
+
+
+def update_order(order_id, pricing, lines):
+    """Apply an edited order in place, touching only the product rows that changed.
 
-    # Order Products Table
+    pricing is the order's pricing.OrderPricing. lines is a list of
+    (product_id, line) pairs, with product_id None for rows added since the
+    order was loaded. Stored rows missing from lines are deleted.
+    Returns a dict with the number of rows inserted, updated and deleted.
+    """
+    order_total = pricing.grand_total
+    columns = ", ".join(ORDER_PRODUCT_COLUMNS)
+    marks = _placeholders(ORDER_PRODUCT_COLUMNS)
+    assignments = ", ".join(f"{column} = ?" for column in ORDER_PRODUCT_COLUMNS)
+
+    with transaction() as cursor:
+        cursor.execute(f"SELECT product_id, {columns} FROM order_products WHERE order_id = ?", (order_id,))
+        stored = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+        inserts, updates, kept = [], [], set()
+        for product_id, line in lines:
+            line = tuple(line)
+            if product_id in stored:
+                kept.add(product_id)
+                if stored[product_id] != line:
+                    updates.append((*line, product_id))
+            else:
+                inserts.append((order_id, *line))
+        deletes = [product_id for product_id in stored if product_id not in kept]
+
+        if inserts:
+            cursor.executemany(f"INSERT INTO order_products (order_id, {columns}) VALUES (?, {marks})", inserts)
+        if updates:
+            cursor.executemany(f"UPDATE order_products SET {assignments} WHERE product_id = ?", updates)
+        for chunk in _chunked(deletes):
+            cursor.execute(f"DELETE FROM order_products WHERE product_id IN ({_placeholders(chunk)})", chunk)
+
+        cursor.execute("""
+            UPDATE orders SET
+                order_total = ?,
+                net_due = ROUND(? - payment, 2),
+                subtotal = ?, discount_total = ?, tax_total = ?, processing_total = ?,
+                last_edited = datetime('now', 'localtime')
+            WHERE order_id = ?
+        """, (order_total, order_total, *_breakdown(pricing), order_id))
+
+    return {"inserted": len(inserts), "updated": len(updates), "deleted": len(deletes)}
+
+
+# === PAYMENTS AND BALANCES ===
+# customer_balances is a ledger kept current by triggers on orders and
+# payments (see migrations._add_customer_balances), so a balance is one
+# primary-key lookup however many orders the customer has.
+
+def _balance(cursor, customer_id):
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS order_products (
-            product_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            order_id INTEGER,
-            product_number TEXT,
-            page TEXT,
-            description TEXT,
-            shade TEXT,
-            size TEXT,
-            qty INTEGER,
-            unit_price REAL,
-            reg_price REAL,
-            tax INTEGER,
-            processing INTEGER,
-            discount REAL,
-            total_price REAL,
-            FOREIGN KEY (order_id) REFERENCES orders(order_id)
+        SELECT total_ordered, total_paid, balance FROM customer_balances WHERE customer_id = ?
+    """, (customer_id,))
+    return cursor.fetchone() or (0.0, 0.0, 0.0)
+
+
+def get_customer_balance(customer_id):
+    """(total_ordered, total_paid, balance) for a customer; zeros if they have never ordered or paid."""
+    return _balance(get_connection().cursor(), customer_id)
+
+
+def record_payment(customer_id, amount, order_id=None, note=""):
+    """Record money received from a customer, optionally against one order. Returns the new payment_id."""
+    with transaction() as cursor:
+        cursor.execute(
+            "INSERT INTO payments (customer_id, order_id, amount, note) VALUES (?, ?, ?, ?)",
+            (customer_id, order_id, round(amount, 2), note),
         )
-    """)
+        return cursor.lastrowid
+
 
-    # Campaign Settings Table
+def get_customers_owing():
+    """(customer_id, first_name, last_name, balance) for every customer who owes money, largest first."""
+    cursor = get_connection().cursor()
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS campaign_settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            year INTEGER DEFAULT 2025,
-            campaign INTEGER DEFAULT 1,
-            last_campaign INTEGER DEFAULT 30
-        )
+        SELECT c.customer_id, c.first_name, c.last_name, b.balance
+        FROM customer_balances b
+        JOIN customers c ON c.customer_id = b.customer_id
+        WHERE b.balance > 0
+        ORDER BY b.balance DESC
     """)
+    return cursor.fetchall()
 
-    # Representative Info Table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS representative_info (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            rep_name TEXT,
-            rep_address TEXT,
-            rep_office TEXT,
-            rep_cell TEXT,
-            rep_email TEXT,
-            rep_website TEXT
+
+# === BULK DELETES ===
+# SQLite caps the number of bound parameters per statement, so very large id
+# lists are deleted in chunks - still one statement per chunk, not per row.
+MAX_IDS_PER_STATEMENT = 500
+
+
+def _chunked(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), MAX_IDS_PER_STATEMENT):
+        yield ids[start:start + MAX_IDS_PER_STATEMENT]
+
+
+def _placeholders(values):
+    return ", ".join("?" * len(values))
+
+
+def delete_orders(order_ids):
+    """Delete the given orders and their products in one transaction.
+
+    Payments made against them stay on the customer's account.
+    """
+    with transaction() as cursor:
+        for chunk in _chunked(order_ids):
+            marks = _placeholders(chunk)
+            cursor.execute(f"UPDATE payments SET order_id = NULL WHERE order_id IN ({marks})", chunk)
+            cursor.execute(f"DELETE FROM order_products WHERE order_id IN ({marks})", chunk)
+            cursor.execute(f"DELETE FROM orders WHERE order_id IN ({marks})", chunk)
+
+
+def delete_customers(customer_ids):
+    """Delete the given customers with all of their orders, products and payments in one transaction."""
+    with transaction() as cursor:
+        for chunk in _chunked(customer_ids):
+            marks = _placeholders(chunk)
+            cursor.execute(f"DELETE FROM payments WHERE customer_id IN ({marks})", chunk)
+            cursor.execute(f"""
+                DELETE FROM order_products
+                WHERE order_id IN (SELECT order_id FROM orders WHERE customer_id IN ({marks}))
+            """, chunk)
+            cursor.execute(f"DELETE FROM orders WHERE customer_id IN ({marks})", chunk)
+            cursor.execute(f"DELETE FROM customers WHERE customer_id IN ({marks})", chunk)
+
+# === APP SETTINGS ===
+# The current campaign and the rep info live in the single app_settings row.
+# It is read once and served from memory; update_app_settings() drops the
+# copy so the next read sees the change. Campaign changes are logged to
+# campaign_history by a trigger.
+CAMPAIGN_KEYS = ("campaign_year", "campaign_number", "last_campaign")
+REP_INFO_KEYS = ("rep_name", "rep_address", "rep_office", "rep_cell", "rep_email", "rep_website")
+APP_SETTINGS_KEYS = CAMPAIGN_KEYS + REP_INFO_KEYS
+
+_app_settings = None
+_app_settings_lock = threading.Lock()
+
+
+def get_app_settings():
+    """{key: value} for every APP_SETTINGS_KEYS entry."""
+    global _app_settings
+    with _app_settings_lock:
+        if _app_settings is None:
+            cursor = get_connection().cursor()
+            cursor.execute(f"SELECT {', '.join(APP_SETTINGS_KEYS)} FROM app_settings WHERE id = 1")
+            _app_settings = dict(zip(APP_SETTINGS_KEYS, cursor.fetchone()))
+        return dict(_app_settings)
+
+
+def update_app_settings(values):
+    """Save {key: value} changes to app_settings in one write."""
+    global _app_settings
+    unknown = set(values) - set(APP_SETTINGS_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown app settings: {', '.join(sorted(unknown))}")
+    assignments = ", ".join(f"{key} = ?" for key in values)
+    with transaction() as cursor:
+        cursor.execute(
+            f"UPDATE app_settings SET {assignments}, updated_at = datetime('now', 'localtime') WHERE id = 1",
+            tuple(values.values()),
         )
-    """)
+    with _app_settings_lock:
+        _app_settings = None
 
-    conn.commit()
-    conn.close()
 
 def get_representative_info():
-    """Fetch representative info from the settings file."""
-    config = configparser.ConfigParser()
-    if not os.path.exists(SETTINGS_FILE):
-        return {}
-
-    config.read(SETTINGS_FILE)
-    return {
-        "rep_name": config.get("Representative", "rep_name", fallback=""),
-        "rep_address": config.get("Representative", "rep_address", fallback=""),
-        "rep_office": config.get("Representative", "rep_office", fallback=""),
-        "rep_cell": config.get("Representative", "rep_cell", fallback=""),
-        "rep_email": config.get("Representative", "rep_email", fallback=""),
-        "rep_website": config.get("Representative", "rep_website", fallback="")
-    }
+    """The rep info printed on invoices, as {key: text}."""
+    app_settings = get_app_settings()
+    return {key: app_settings[key] or "" for key in REP_INFO_KEYS}
+
 
 def get_current_campaign_settings():
-    """Retrieve the current campaign year and campaign number from the database."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute("SELECT year, campaign FROM campaign_settings ORDER BY id DESC LIMIT 1")
-    result = cursor.fetchone()
-    conn.close()
-    if result:
-        return result
-    return (2025, 1)
+    """(campaign_year, campaign_number) of the current campaign."""
+    app_settings = get_app_settings()
+    return app_settings["campaign_year"], app_settings["campaign_number"]
@@ -0,0 +1,209 @@
+"""Runs database work off the GUI thread.
+
+Windows submit a function (usually a query helper from db_utils) and get the
+result back on the GUI thread through a callback, so a slow or locked database
+file never freezes the interface.
+
+Reads are given a name scoped to the window that made them. Submitting again
+under the same name supersedes the earlier request: if it has not started it is
+dropped, and if it is already running its result is discarded. This is what
+keeps a fast-changing selection (like the order history combo) from showing
+stale data. Unnamed requests (writes) always run; cancelling them only
+discards their result.
+
+All requests share one connection, opened by the first and kept until
+close(), so its statement cache survives between them and a dialog's reads
+don't each pay for connecting to a database on a network share.
+
+watch_future() does the same result delivery for work running elsewhere,
+such as invoices rendered in a worker process.
+"""
+import itertools
+import logging
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QCoreApplication, QTimer, pyqtSignal
+
+from db_utils import open_connection, use_connection
+
+logger = logging.getLogger(__name__)
+
+# How often watch_future() checks on its future
+FUTURE_POLL_MS = 50
+
+
+class _Request:
+    __slots__ = ("request_id", "key", "name", "on_result", "on_error", "cancelled", "runnable")
+
+    def __init__(self, request_id, key, name, on_result, on_error):
+        self.request_id = request_id
+        self.key = key
+        self.name = name
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+        self.runnable = None
+
+
+class _Task(QRunnable):
+    def __init__(self, request, fn, args, relay, connection):
+        super().__init__()
+        self.setAutoDelete(False)  # DbWorker keeps it until the result is delivered
+        self.request = request
+        self.fn = fn
+        self.args = args
+        self.relay = relay
+        self.connection = connection
+
+    def run(self):
+        if self.request.cancelled and self.request.name is not None:
+            self._emit(False, None)
+            return
+        try:
+            # Pool threads don't keep Python thread-locals between runs, so the
+            # worker's connection is handed to get_connection() for each task
+            with use_connection(self.connection()):
+                result, ok = self.fn(*self.args), True
+        except Exception as e:
+            logger.exception("db request failed key=%s", self.request.key)
+            result, ok = e, False
+        self._emit(ok, result)
+
+    def _emit(self, ok, result):
+        try:
+            self.relay.done.emit(self.request.request_id, ok, result)
+        except RuntimeError:
+            pass  # the application is shutting down; there is no one left to tell
+
+
+class _Relay(QObject):
+    # Emitted from the pool thread; queued to the GUI thread that owns the relay
+    done = pyqtSignal(int, bool, object)
+
+
+class DbWorker(QObject):
+    """Runs functions on a background thread and delivers their results on the GUI thread."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        # SQLite allows one writer at a time anyway; a single thread also keeps
+        # writes in the order they were submitted
+        self._pool.setMaxThreadCount(1)
+        self._relay = _Relay()
+        self._relay.done.connect(self._deliver)
+        self._ids = itertools.count(1)
+        self._pending = {}  # request_id -> _Request
+        self._latest = {}  # (id(owner), name) -> _Request
+        self._owners = set()  # id() of owners whose destruction we watch
+        self._conn = None  # opened by the first task; see close()
+
+    def _connection(self):
+        # Only ever called on the pool's one thread, so tasks never share it at
+        # the same time; that thread may be replaced when idle, hence
+        # check_same_thread=False
+        if self._conn is None:
+            self._conn = open_connection(check_same_thread=False)
+        return self._conn
+
+    def submit(self, owner, fn, *args, name=None, on_result=None, on_error=None):
+        """Run fn(*args) in the background; on_result(value) or on_error(exception) runs afterwards.
+
+        A newer request with the same owner and name supersedes this one; leave
+        name as None for work that must not be dropped, such as writes.
+        Requests are cancelled when their owner is destroyed.
+        """
+        request_id = next(self._ids)
+        if name is None:
+            key = (id(owner), request_id)
+        else:
+            key = (id(owner), name)
+            self.cancel(owner, name)
+        if id(owner) not in self._owners:
+            self._owners.add(id(owner))
+            owner_id = id(owner)
+            owner.destroyed.connect(lambda *_: self._forget_owner(owner_id))
+
+        request = _Request(request_id, key, name, on_result, on_error)
+        request.runnable = _Task(request, fn, args, self._relay, self._connection)
+        self._pending[request.request_id] = request
+        self._latest[key] = request
+        self._pool.start(request.runnable)
+        return request_id
+
+    def cancel(self, owner, name=None):
+        """Cancel the owner's request with this name, or all of its requests when name is None."""
+        owner_id = id(owner)
+        keys = [key for key in self._latest if key[0] == owner_id and (name is None or key[1] == name)]
+        for key in keys:
+            self._cancel_request(self._latest.pop(key))
+
+    def _cancel_request(self, request):
+        request.cancelled = True
+        if request.name is not None and self._pool.tryTake(request.runnable):
+            # Never started: nothing will be delivered for it
+            self._pending.pop(request.request_id, None)
+
+    def _forget_owner(self, owner_id):
+        self._owners.discard(owner_id)
+        for key in [key for key in self._latest if key[0] == owner_id]:
+            self._cancel_request(self._latest.pop(key))
+
+    def _deliver(self, request_id, ok, value):
+        request = self._pending.pop(request_id, None)
+        if request is None or request.cancelled:
+            return
+        if self._latest.get(request.key) is request:
+            del self._latest[request.key]
+        callback = request.on_result if ok else request.on_error
+        if callback is not None:
+            callback(value)
+
+    def wait(self, msecs=-1):
+        """Block until queued work has finished and its results were delivered (for scripts and shutdown)."""
+        finished = self._pool.waitForDone(msecs)
+        QCoreApplication.processEvents()
+        return finished
+
+    def close(self):
+        """Finish queued work, then close the worker's connection (on app exit); the next request reopens it."""
+        self.wait()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_worker = None
+
+
+def get_db_worker():
+    """The application's shared DbWorker, created on first use (on the GUI thread)."""
+    global _worker
+    if _worker is None:
+        _worker = DbWorker(QCoreApplication.instance())
+    return _worker
+
+
+def watch_future(parent, future, on_result, on_error):
+    """Call on_result(value) or on_error(exception) on the GUI thread once a concurrent.futures.Future is done.
+
+    The future is polled from a timer owned by parent, so nothing is called
+    after parent has been destroyed.
+    """
+    timer = QTimer(parent)
+    timer.setInterval(FUTURE_POLL_MS)
+
+    def check():
+        if not future.done():
+            return
+        timer.stop()
+        timer.deleteLater()
+        try:
+            value = future.result()
+        except Exception as e:
+            on_error(e)
+            return
+        on_result(value)
+
+    timer.timeout.connect(check)
+    timer.start()
+    return timer
@@ -0,0 +1,333 @@
+"""Lays out invoice PDFs with reportlab's platypus.
+
+The first page carries the full customer/rep header, later pages a short
+"continued" header, and the order lines flow across as many pages as they
+need with the column headings repeated at the top of each one. Rows are
+turned into reportlab objects a page at a time, so a very large order does
+not hold thousands of Paragraphs and table cells in memory at once.
+
+Imported lazily by invoices.render_invoice(), usually inside a worker process.
+"""
+from xml.sax.saxutils import escape
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import (
+    ActionFlowable, BaseDocTemplate, Flowable, Frame, KeepTogether, NextPageTemplate, PageBreak, PageTemplate,
+    Paragraph, Spacer, Table, TableStyle,
+)
+
+from invoices import format_phone
+from pricing import TAX_RATE, price_order
+
+# Page streams are still compressed; ASCII85-armouring them on top only makes
+# the file bigger and, without reportlab's C accelerator, is a fifth of the
+# render time of a short invoice
+rl_config.useA85 = 0
+
+PAGE_WIDTH, PAGE_HEIGHT = letter
+MARGIN = 40
+FOOTER_Y = 30
+FIRST_PAGE_BODY_TOP = 675  # below the customer/rep header
+LATER_PAGE_BODY_TOP = 740  # below the "continued" header
+BODY_BOTTOM = 50
+
+LINE_HEADINGS = ["Page", "Product #", "Product", "Qty", "Unit Price", "Total"]
+LINE_COL_WIDTHS = [0.7*inch, 1*inch, 2.4*inch, 0.6*inch, 1*inch, 1*inch]
+LINE_FONT_SIZE = 9
+# Height of a one-line row (text plus the table's default 3pt top and bottom
+# padding); no row is shorter, which bounds how many rows could fit a page
+MIN_ROW_HEIGHT = LINE_FONT_SIZE * 1.2 + 6
+# Descriptions narrower than this are plain cells; only longer ones need a
+# (much slower to lay out) wrapping Paragraph
+DESCRIPTION_WIDTH = LINE_COL_WIDTHS[2] - 12
+
+LINE_STYLE = ParagraphStyle(name='Normal', fontName='Helvetica', fontSize=LINE_FONT_SIZE)
+THANKS_STYLE = ParagraphStyle(name='Thanks', fontName='Helvetica-Oblique', fontSize=10, alignment=TA_CENTER)
+
+LINE_TABLE_STYLE = TableStyle([
+    ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+    ('ALIGN', (0,0), (-1,0), 'CENTER'),
+    ('ALIGN', (3,1), (-1,-1), 'RIGHT'),
+    ('FONT', (0,0), (-1,0), 'Helvetica-Bold'),
+    ('FONT', (0,1), (-1,-1), 'Helvetica'),
+    ('FONT', (2,1), (2,-1), 'Helvetica', LINE_FONT_SIZE),
+])
+
+TOTALS_TABLE_STYLE = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('FONT', (0, 0), (-1, -2), 'Helvetica'),
+    ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('TEXTCOLOR', (0, -1), (-1, -1), colors.black),
+    ('LINEABOVE', (0, -1), (-1, -1), 1, colors.black),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+])
+
+
+class OrderLinesTable(Flowable):
+    """The order lines table, built one page's worth of rows at a time.
+
+    rows holds plain values ([page, product #, description, qty, unit price,
+    total]); a Table is only made for as many rows as could fit the space
+    being filled, and the rest is handed on as a new OrderLinesTable.
+    """
+
+    def __init__(self, rows, start=0):
+        super().__init__()
+        self.rows = rows
+        self.start = start
+        self.hAlign = 'CENTER'
+        self._table = None
+
+    def _make_table(self, count):
+        data = [LINE_HEADINGS]
+        for page, product_number, description, qty, unit_price, total in self.rows[self.start:self.start + count]:
+            if stringWidth(description, 'Helvetica', LINE_FONT_SIZE) > DESCRIPTION_WIDTH:
+                description = Paragraph(escape(description), LINE_STYLE)
+            data.append([page, product_number, description, qty, unit_price, total])
+        table = Table(data, colWidths=LINE_COL_WIDTHS, repeatRows=1)
+        table.setStyle(LINE_TABLE_STYLE)
+        return table
+
+    def _max_rows(self, availHeight):
+        # An upper bound on the rows (headings included) that availHeight can hold
+        return max(int(availHeight // MIN_ROW_HEIGHT), 1)
+
+    def wrap(self, availWidth, availHeight):
+        remaining = len(self.rows) - self.start
+        if remaining > self._max_rows(availHeight):
+            # Certainly more than fits; split() lays out this page's share
+            self._table = None
+            self.width, self.height = sum(LINE_COL_WIDTHS), availHeight + 1
+        else:
+            self._table = self._make_table(remaining)
+            self.width, self.height = self._table.wrap(availWidth, availHeight)
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        table = self._make_table(min(len(self.rows) - self.start, self._max_rows(availHeight)))
+        parts = table.split(availWidth, availHeight)
+        if not parts:
+            return []  # not even the headings and one row fit here
+        first = parts[0]
+        taken = first._nrows - 1
+        if self.start + taken >= len(self.rows):
+            return [first]
+        return [first, OrderLinesTable(self.rows, self.start + taken)]
+
+    def draw(self):
+        self._table.drawOn(self.canv, 0, 0)
+
+
+def _line_rows(lines, pricing):
+    rows = []
+    for line, total_price, discount_total in zip(lines, pricing.line_totals, pricing.line_discounts):
+        page, product_number, description, shade, qty, unit_price, _, discount_percent, _, _ = line
+        if shade.strip():
+            description += f" — {shade.strip()}"
+        if discount_percent > 0:
+            description += f" (Discount {int(discount_percent)}% for -${discount_total:.2f})"
+        rows.append([page, product_number, description, str(int(qty)),
+                     f"${unit_price:.2f}", f"${total_price:.2f}"])
+    return rows
+
+
+def _totals_table(pricing):
+    totals_data = [["Sub Total:", f"${pricing.subtotal:.2f}"]]
+    if pricing.discount_total > 0:
+        totals_data.append(["Line Item Discounts:", f"-${pricing.discount_total:.2f}"])
+    if pricing.processing_count > 0:
+        totals_data.append(["Processing:", f"${pricing.processing:.2f}"])
+    if pricing.tax > 0:
+        totals_data.append([f"Tax ({TAX_RATE * 100:g}%):", f"${pricing.tax:.2f}"])
+    totals_data.append(["Grand Total:", f"${pricing.grand_total:.2f}"])
+
+    totals_table = Table(totals_data, colWidths=[1.5 * inch, 1 * inch], hAlign='RIGHT')
+    totals_table.setStyle(TOTALS_TABLE_STYLE)
+    return totals_table
+
+
+class InvoiceTemplate:
+    """The parts of an invoice that are the same for every customer of one rep.
+
+    Built once per process by get_template() and reused for every invoice:
+    the rep header text is formatted up front, and each PDF draws the header
+    once as a form that all of its first pages (one per customer in a
+    statement) refer to.
+    """
+
+    def __init__(self, rep_info, form_name="rep_header"):
+        self.rep_info = dict(rep_info)
+        self.form_name = form_name
+        self.title = f"AVON BY {self.rep_info.get('rep_name', '')}"
+        # (y offset from the top line, text) for the right-hand rep block
+        self.rep_lines = [(0, self.rep_info.get("rep_name", "")), (15, self.rep_info.get("rep_address", ""))]
+        for key, offset, label in (("rep_office", 30, "Office: "), ("rep_email", 45, "Email: "),
+                                   ("rep_website", 60, "Visit my website at: "), ("rep_cell", 75, "Cell/Text: ")):
+            value = self.rep_info.get(key, "").strip()
+            if value:
+                if key in ("rep_office", "rep_cell"):
+                    value = format_phone(self.rep_info[key])
+                self.rep_lines.append((offset, label + value))
+
+    def _draw_rep_header(self, c):
+        if not c.hasForm(self.form_name):
+            c.beginForm(self.form_name)
+            c.setFont("Helvetica", 9)
+            for offset, text in self.rep_lines:
+                c.drawRightString(PAGE_WIDTH - MARGIN, 770 - offset, text)
+            c.setFont("Helvetica-Bold", 13)
+            c.drawCentredString(PAGE_WIDTH / 2, 735, self.title)
+            c.setFont("Helvetica-Bold", 11)
+            c.drawCentredString(PAGE_WIDTH / 2, 720, "*** CUSTOMER ORDER ***")
+            c.endForm()
+        c.doForm(self.form_name)
+
+    def draw_first_page(self, c, invoice, page_number=1):
+        c.saveState()
+        self._draw_rep_header(c)
+        c.setFont("Helvetica", 9)
+
+        # Customer Info (Top Left)
+        y_cust = 770
+        c.drawString(MARGIN, y_cust, invoice.customer_name)
+        y_cust -= 15
+        c.drawString(MARGIN, y_cust, invoice.customer_address)
+        if invoice.customer_cell.strip():
+            y_cust -= 15
+            c.drawString(MARGIN, y_cust, f"Cell: {format_phone(invoice.customer_cell)}")
+        if invoice.customer_office.strip():
+            y_cust -= 15
+            c.drawString(MARGIN, y_cust, f"Office: {format_phone(invoice.customer_office)}")
+
+        c.setFont("Helvetica", 10)
+        c.drawCentredString(PAGE_WIDTH / 2, 705, f"Campaign #{invoice.campaign_number}")
+        c.drawCentredString(PAGE_WIDTH / 2, 690, invoice.date_text)
+        c.restoreState()
+        _draw_footer(c, page_number)
+
+    def draw_later_page(self, c, invoice, page_number):
+        c.saveState()
+        c.setFont("Helvetica", 9)
+        c.drawString(MARGIN, 765, f"{invoice.customer_name} (continued)")
+        c.drawRightString(PAGE_WIDTH - MARGIN, 765, f"Campaign #{invoice.campaign_number} - {invoice.date_text}")
+        c.setLineWidth(0.5)
+        c.line(MARGIN, 758, PAGE_WIDTH - MARGIN, 758)
+        c.restoreState()
+        _draw_footer(c, page_number)
+
+    def flowables(self, invoice):
+        columns = list(zip(*invoice.lines)) or [()] * 10
+        pricing = price_order(*columns[4:])
+        return [
+            OrderLinesTable(_line_rows(invoice.lines, pricing)),
+            # The totals and the thank-you note stay together, on the last page
+            KeepTogether([
+                Spacer(1, 12),
+                _totals_table(pricing),
+                Spacer(1, 6),
+                Paragraph("Thank you for your order!", THANKS_STYLE),
+            ]),
+        ]
+
+
+def _draw_footer(c, page_number):
+    c.saveState()
+    c.setFont("Helvetica", 8)
+    c.drawCentredString(PAGE_WIDTH / 2, FOOTER_Y, f"Page {page_number}")
+    c.restoreState()
+
+
+def _body_frame(top, frame_id):
+    return Frame(MARGIN, BODY_BOTTOM, PAGE_WIDTH - 2 * MARGIN, top - BODY_BOTTOM, id=frame_id,
+                 leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0)
+
+
+_templates = {}
+
+
+def get_template(rep_info):
+    """This process's InvoiceTemplate for rep_info, built on first use."""
+    key = tuple(sorted(rep_info.items()))
+    template = _templates.get(key)
+    if template is None:
+        template = _templates[key] = InvoiceTemplate(rep_info, f"rep_header{len(_templates)}")
+    return template
+
+
+class _PendingInvoice(Flowable):
+    """Stands in for an invoice's flowables until the document reaches it."""
+
+    def __init__(self, invoice):
+        super().__init__()
+        self.invoice = invoice
+
+
+class InvoiceDocTemplate(BaseDocTemplate):
+    """A PDF of one or more invoices, each starting on a new page with its own header and page numbers.
+
+    An invoice's rows and totals are only laid out when the document gets to
+    it, so a statement of hundreds of invoices is produced in one pass without
+    building them all up front. With outline=True each invoice gets a
+    bookmark under the customer's name.
+    """
+
+    def __init__(self, filename, invoices, outline=False, **kwargs):
+        super().__init__(filename, pagesize=letter, **kwargs)
+        self.invoices = invoices
+        self.outline = outline
+        self.invoice = invoices[0] if invoices else None
+        self.invoice_count = 0
+        self.invoice_page = 0
+        self.addPageTemplates([
+            PageTemplate(id="first", frames=[_body_frame(FIRST_PAGE_BODY_TOP, "first")],
+                         onPage=self._first_page, autoNextPageTemplate="later"),
+            PageTemplate(id="later", frames=[_body_frame(LATER_PAGE_BODY_TOP, "later")],
+                         onPage=self._later_page),
+        ])
+
+    def _first_page(self, c, _doc):
+        self.invoice_count += 1
+        self.invoice_page = 1
+        get_template(self.invoice.rep_info).draw_first_page(c, self.invoice, self.invoice_page)
+        if self.outline:
+            key = f"invoice{self.invoice_count}"
+            c.bookmarkPage(key)
+            c.addOutlineEntry(self.invoice.customer_name, key, level=0)
+
+    def _later_page(self, c, _doc):
+        self.invoice_page += 1
+        get_template(self.invoice.rep_info).draw_later_page(c, self.invoice, self.invoice_page)
+
+    def handle_startInvoice(self, invoice):
+        self.invoice = invoice
+
+    def filterFlowables(self, flowables):
+        pending = flowables[0]
+        if not isinstance(pending, _PendingInvoice):
+            return
+        invoice = pending.invoice
+        expanded = get_template(invoice.rep_info).flowables(invoice)
+        if invoice is not self.invoice:
+            # Switch before the page break, so the next page is drawn for this invoice
+            expanded[:0] = [ActionFlowable(("startInvoice", invoice)), NextPageTemplate("first"), PageBreak()]
+        flowables[0:1] = expanded
+
+    def build(self):
+        super().build([_PendingInvoice(invoice) for invoice in self.invoices])
+
+
+def build_invoice(invoice, filename):
+    """Write invoice (an invoices.Invoice) to filename as a PDF."""
+    InvoiceDocTemplate(filename, [invoice], title=f"Invoice - {invoice.customer_name}").build()
+
+
+def build_statement(invoices, filename, title="Campaign Statement"):
+    """Write several invoices into one bookmarked PDF, one after another."""
+    InvoiceDocTemplate(filename, invoices, outline=True, title=title).build()
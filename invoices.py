@@ -0,0 +1,351 @@
+"""Customer invoice PDFs, one at a time or a whole campaign at once.
+
+render_invoice() needs nothing but reportlab and plain data, so invoices can
+be rendered in worker processes: print_order hands its invoice to a shared
+process pool, and a campaign's invoices are rendered in parallel. A campaign
+(or a handful of customers) can also go out as one bookmarked statement PDF.
+
+    python invoices.py 2025 7 --out C:\\Invoices       # every order in campaign 7 of 2025
+    python invoices.py 2025 7 --out C:\\Invoices --workers 4
+    python invoices.py 2025 7 --out C:\\Invoices --merged   # one statement PDF
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class Invoice:
+    """Everything printed on one invoice. Picklable, so it can be sent to a worker process."""
+
+    __slots__ = ("customer_name", "customer_address", "customer_cell", "customer_office",
+                 "rep_info", "campaign_number", "date_text", "lines")
+
+    def __init__(self, customer_name, customer_address, customer_cell, customer_office,
+                 rep_info, campaign_number, date_text, lines):
+        self.customer_name = customer_name
+        self.customer_address = customer_address
+        self.customer_cell = customer_cell
+        self.customer_office = customer_office
+        self.rep_info = rep_info
+        self.campaign_number = campaign_number
+        self.date_text = date_text
+        # (page, product_number, description, shade, qty, unit_price, reg_price, discount, tax, processing)
+        self.lines = lines
+
+
+def format_phone(raw):
+    digits = ''.join(filter(str.isdigit, raw or ""))
+    return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}" if len(digits) == 10 else (raw or "")
+
+
+def invoice_filename(customer_name, suffix):
+    """invoice-<customer>-<suffix>.pdf, with anything unsafe in a file name replaced."""
+    name = re.sub(r"[^\w.-]+", "_", customer_name.strip().lower()).strip("_") or "customer"
+    return f"invoice-{name}-{suffix}.pdf"
+
+
+def statement_filename(campaign_year, campaign_number, suffix):
+    return f"statement-{campaign_year}-c{campaign_number}-{suffix}.pdf"
+
+
+_placeholders = set()  # files claimed by unique_path() whose render has not finished yet
+
+
+def unique_path(path):
+    """path, or path with " (2)", " (3)", ... before the extension if it is taken.
+
+    The file is created empty to claim the name, so two exports started
+    together never write to the same file. Renders submitted through this
+    module delete it again if they fail; see _submit_render().
+    """
+    base, ext = os.path.splitext(path)
+    candidate, n = path, 1
+    while True:
+        try:
+            open(candidate, "x").close()
+            _placeholders.add(candidate)
+            return candidate
+        except FileExistsError:
+            n += 1
+            candidate = f"{base} ({n}){ext}"
+
+
+def downloads_path(filename):
+    """A new, unused path for filename in the user's Downloads folder (created if missing)."""
+    downloads_folder = os.path.join(os.path.expanduser("~"), "Downloads")
+    os.makedirs(downloads_folder, exist_ok=True)
+    return unique_path(os.path.join(downloads_folder, filename))
+
+
+def open_pdf(filename):
+    """Open a PDF in the system's viewer."""
+    subprocess.Popen([filename], shell=True)
+
+
+def render_invoice(invoice, filename):
+    """Write one invoice PDF, over as many pages as the order needs. Returns filename."""
+    # reportlab is only loaded where invoices are drawn, usually a worker process
+    from invoice_layout import build_invoice
+    build_invoice(invoice, filename)
+    return filename
+
+
+def render_statement(invoices, filename, title="Campaign Statement"):
+    """Write invoices one after another into a single PDF with a bookmark per customer. Returns filename."""
+    from invoice_layout import build_statement
+    build_statement(invoices, filename, title)
+    return filename
+
+
+# === PROCESS POOL ===
+# Started on first use and kept, so only the first invoice pays for the worker start-up
+
+_executor = None
+
+
+def _warm_up():
+    """Pool initializer: load reportlab and the invoice layout before the first invoice arrives."""
+    import invoice_layout  # noqa: F401
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        # One process is plenty for invoices printed one at a time
+        _executor = ProcessPoolExecutor(max_workers=1, initializer=_warm_up)
+    return _executor
+
+
+def _release(filename, failed):
+    """Forget filename's unique_path() claim, deleting the file if its render failed.
+
+    Only claimed files are deleted: a path the user picked may be a file they already had.
+    """
+    if filename not in _placeholders:
+        return
+    _placeholders.discard(filename)
+    if failed:
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+
+def _release_when_done(future, filename):
+    _release(filename, future.cancelled() or future.exception() is not None)
+
+
+def _submit_render(executor, filename, fn, *args):
+    """executor.submit(fn, *args) for a render writing filename, deleting its placeholder if the render fails."""
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        _release(filename, True)
+        raise
+    future.add_done_callback(lambda future: _release_when_done(future, filename))
+    return future
+
+
+def submit_invoice(invoice, filename):
+    """Render an invoice in a worker process. Returns a concurrent.futures.Future of the filename."""
+    return _submit_render(get_executor(), filename, render_invoice, invoice, filename)
+
+
+def submit_statement(invoices, filename, title="Campaign Statement"):
+    """render_statement() in a worker process. Returns a concurrent.futures.Future of the filename."""
+    return _submit_render(get_executor(), filename, render_statement, invoices, filename, title)
+
+
+def shutdown():
+    """Stop the worker processes (e.g. on app exit)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# === CAMPAIGN BATCH ===
+
+def load_campaign_invoices(campaign_year, campaign_number, customer_ids=None):
+    """Return [(order_id, customer_name, Invoice)] for every order in a campaign, read in two queries.
+
+    customer_ids limits it to those customers' orders.
+    """
+    # Imported here so worker processes, which only render, never touch the database setup
+    from db_utils import get_connection, get_representative_info
+
+    rep_info = get_representative_info()
+    date_text = datetime.now().strftime("%A, %B %d, %Y")
+    params = (campaign_year, campaign_number)
+    customer_filter = ""
+    if customer_ids is not None:
+        # One JSON parameter instead of one per id, however many are selected
+        customer_filter = "AND o.customer_id IN (SELECT value FROM json_each(?))"
+        params += (json.dumps(list(customer_ids)),)
+    cursor = get_connection().cursor()
+    cursor.execute(f"""
+        SELECT o.order_id, IFNULL(c.first_name, ''), IFNULL(c.last_name, ''), IFNULL(c.address, ''),
+               IFNULL(c.cell_phone, ''), IFNULL(c.office_phone, '')
+        FROM orders o
+        JOIN customers c ON c.customer_id = o.customer_id
+        WHERE o.campaign_year = ? AND o.campaign_number = ? {customer_filter}
+        ORDER BY c.last_name COLLATE NOCASE, c.first_name COLLATE NOCASE, o.order_id
+    """, params)
+    orders = cursor.fetchall()
+
+    cursor.execute(f"""
+        SELECT p.order_id, IFNULL(p.page, ''), IFNULL(p.product_number, ''), IFNULL(p.description, ''),
+               IFNULL(p.shade, ''), IFNULL(p.qty, 0), IFNULL(p.unit_price, 0), IFNULL(p.reg_price, 0),
+               IFNULL(p.discount, 0), IFNULL(p.tax, 0), IFNULL(p.processing, 0)
+        FROM order_products p
+        JOIN orders o ON o.order_id = p.order_id
+        WHERE o.campaign_year = ? AND o.campaign_number = ? {customer_filter}
+        ORDER BY p.order_id, p.product_id
+    """, params)
+    lines = {}
+    for order_id, *line in cursor.fetchall():
+        lines.setdefault(order_id, []).append(tuple(line))
+
+    invoices = []
+    for order_id, first_name, last_name, address, cell, office in orders:
+        customer_name = f"{first_name} {last_name}"
+        invoices.append((order_id, customer_name, Invoice(
+            customer_name, address, cell, office, rep_info, campaign_number, date_text,
+            lines.get(order_id, []),
+        )))
+    return invoices
+
+
+class InvoiceBatch:
+    """Renders many invoices in parallel worker processes without blocking the caller.
+
+    Call poll() (e.g. from a timer) to collect finished invoices, or wait() to block.
+    """
+
+    def __init__(self, invoices, out_dir, workers=None):
+        """invoices is [(order_id, customer_name, Invoice)] as from load_campaign_invoices()."""
+        os.makedirs(out_dir, exist_ok=True)
+        self.started = time.perf_counter()
+        self.finished_at = None
+        self.filenames = []
+        self.failed = []  # order_ids
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up) if invoices else None
+        self._futures = {}
+        for order_id, customer_name, invoice in invoices:
+            filename = unique_path(os.path.join(out_dir, invoice_filename(customer_name, order_id)))
+            self._futures[_submit_render(self._executor, filename, render_invoice, invoice, filename)] = order_id
+        self.total = len(self._futures)
+        self._pending = set(self._futures)
+        self._check_finished()
+
+    @property
+    def done(self):
+        return self.total - len(self._pending)
+
+    @property
+    def finished(self):
+        return not self._pending
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.perf_counter()) - self.started
+
+    @property
+    def rate(self):
+        """Invoices rendered per second."""
+        return len(self.filenames) / self.elapsed if self.elapsed else 0.0
+
+    def _collect(self, future):
+        self._pending.discard(future)
+        try:
+            self.filenames.append(future.result())
+        except Exception:
+            logger.exception("invoice failed order_id=%s", self._futures[future])
+            self.failed.append(self._futures[future])
+
+    def _check_finished(self):
+        if not self._pending and self.finished_at is None:
+            self.finished_at = time.perf_counter()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+
+    def poll(self):
+        """Collect whatever has finished since the last call. Returns (done, total)."""
+        for future in [future for future in self._pending if future.done()]:
+            self._collect(future)
+        self._check_finished()
+        return self.done, self.total
+
+    def wait(self, progress=None):
+        """Block until every invoice is done; progress(done, total) is called as they finish."""
+        for future in as_completed(list(self._pending)):
+            self._collect(future)
+            if progress is not None:
+                progress(self.done, self.total)
+        self._check_finished()
+
+    def cancel(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def render_campaign(campaign_year, campaign_number, out_dir, workers=None, progress=None):
+    """Render every invoice of a campaign into out_dir in parallel and wait for them. Returns the InvoiceBatch."""
+    batch = InvoiceBatch(load_campaign_invoices(campaign_year, campaign_number), out_dir, workers)
+    batch.wait(progress)
+    logger.info(
+        "campaign invoices year=%s campaign=%s rendered=%d failed=%d elapsed_s=%.2f per_s=%.1f",
+        campaign_year, campaign_number, len(batch.filenames), len(batch.failed), batch.elapsed, batch.rate,
+    )
+    return batch
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("year", type=int)
+    parser.add_argument("campaign", type=int)
+    parser.add_argument("--out", required=True, help="folder to write the PDFs to")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--merged", action="store_true", help="write one statement PDF instead of a file per order")
+    args = parser.parse_args(argv)
+
+    from db_utils import initialize_database
+    initialize_database()
+
+    if args.merged:
+        invoices = [invoice for _, _, invoice in load_campaign_invoices(args.year, args.campaign)]
+        if not invoices:
+            print(f"No orders in campaign {args.campaign} of {args.year}")
+            return 1
+        os.makedirs(args.out, exist_ok=True)
+        filename = unique_path(os.path.join(
+            args.out, statement_filename(args.year, args.campaign, datetime.now().strftime("%Y-%m-%d"))
+        ))
+        started = time.perf_counter()
+        try:
+            render_statement(invoices, filename, f"Campaign {args.campaign} of {args.year}")
+        except BaseException:
+            _release(filename, True)
+            raise
+        _release(filename, False)
+        print(f"{len(invoices)} invoices in {time.perf_counter() - started:.2f} s -> {filename}")
+        return
+
+    batch = render_campaign(args.year, args.campaign, args.out, args.workers)
+    print(f"{len(batch.filenames)} invoices in {batch.elapsed:.2f} s ({batch.rate:.1f} invoices/sec) -> {args.out}")
+    if batch.failed:
+        print(f"{len(batch.failed)} failed (order ids {', '.join(map(str, batch.failed))}); see the log")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
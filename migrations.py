@@ -0,0 +1,541 @@
+"""Versioned schema migrations, tracked with PRAGMA user_version.
+
+Each migration runs exactly once, in order, inside its own transaction.
+To change the schema, append a new function to MIGRATIONS - never edit one
+that has already shipped.
+"""
+import sqlite3
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cursor.fetchall()}
+
+
+def _add_column_if_missing(cursor, table, column, declaration):
+    if column not in _columns(cursor, table):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+def _create_base_tables(cursor):
+    """1: Base tables, plus columns older databases were patched with by hand."""
+    # Customers Table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS customers (
+            customer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT,
+            last_name TEXT,
+            address TEXT,
+            city TEXT,
+            state TEXT,
+            zip_code TEXT,
+            office_phone TEXT,
+            cell_phone TEXT,
+            email TEXT,
+            status TEXT
+        )
+    """)
+
+    # Orders Table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            campaign_year INTEGER,
+            campaign_number INTEGER,
+            order_total REAL DEFAULT 0,
+            previous_balance REAL DEFAULT 0,
+            payment REAL DEFAULT 0,
+            net_due REAL DEFAULT 0,
+            time_submitted TEXT DEFAULT (datetime('now', 'localtime')),
+            last_edited TEXT DEFAULT (datetime('now', 'localtime')),
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id)
+        )
+    """)
+
+    # Order Products Table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS order_products (
+            product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER,
+            product_number TEXT,
+            page TEXT,
+            description TEXT,
+            shade TEXT,
+            size TEXT,
+            qty INTEGER,
+            unit_price REAL,
+            reg_price REAL,
+            tax INTEGER,
+            processing INTEGER DEFAULT 0,
+            discount REAL,
+            total_price REAL,
+            FOREIGN KEY (order_id) REFERENCES orders(order_id)
+        )
+    """)
+
+    # Campaign Settings Table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS campaign_settings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            year INTEGER DEFAULT 2025,
+            campaign INTEGER DEFAULT 1,
+            last_campaign INTEGER DEFAULT 30
+        )
+    """)
+
+    # Representative Info Table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS representative_info (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            rep_name TEXT,
+            rep_address TEXT,
+            rep_office TEXT,
+            rep_cell TEXT,
+            rep_email TEXT,
+            rep_website TEXT
+        )
+    """)
+
+    # Columns added after the first release (formerly fix_database.py)
+    _add_column_if_missing(cursor, "customers", "status", "TEXT DEFAULT 'Active'")
+    _add_column_if_missing(cursor, "customers", "cell_phone", "TEXT")
+    _add_column_if_missing(cursor, "customers", "office_phone", "TEXT")
+    _add_column_if_missing(cursor, "order_products", "processing", "INTEGER DEFAULT 0")
+    _add_column_if_missing(cursor, "representative_info", "rep_office", "TEXT")
+    _add_column_if_missing(cursor, "representative_info", "rep_cell", "TEXT")
+
+    order_columns = _columns(cursor, "orders")
+    _add_column_if_missing(cursor, "orders", "time_submitted", "TEXT")
+    _add_column_if_missing(cursor, "orders", "last_edited", "TEXT")
+    if "order_date" in order_columns:
+        # Very old databases recorded the submit time as order_date
+        cursor.execute("""
+            UPDATE orders SET time_submitted = order_date
+            WHERE time_submitted IS NULL AND order_date IS NOT NULL
+        """)
+    cursor.execute("UPDATE orders SET last_edited = time_submitted WHERE last_edited IS NULL")
+
+
+def _add_order_indexes(cursor):
+    """2: Indexes for order history lookups and per-order product lookups."""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_customer_time
+        ON orders (customer_id, time_submitted)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_order_products_order
+        ON order_products (order_id)
+    """)
+
+
+def _add_customer_group_indexes(cursor):
+    """3: Indexes matching the customer tree's letter groups (see customer_model.GROUPINGS)."""
+    # The tree pages through names with row-value comparisons, which never match NULL
+    cursor.execute("UPDATE customers SET first_name = '' WHERE first_name IS NULL")
+    cursor.execute("UPDATE customers SET last_name = '' WHERE last_name IS NULL")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_customers_last_group
+        ON customers (UPPER(SUBSTR(last_name, 1, 1)), last_name COLLATE NOCASE, first_name COLLATE NOCASE)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_customers_first_group
+        ON customers (UPPER(SUBSTR(first_name, 1, 1)), first_name COLLATE NOCASE, last_name COLLATE NOCASE)
+    """)
+
+
+def digits_only(expression):
+    """SQL for expression with phone punctuation removed (also used by customer_model's LIKE searches)."""
+    for char in ("-", "(", ")", " ", ".", "+"):
+        expression = f"REPLACE({expression}, '{char}', '')"
+    return expression
+
+
+def _customer_search_values(row):
+    """Column values for one customers_fts row; phones are indexed as bare digits."""
+    cell = digits_only(f"IFNULL({row}.cell_phone, '')")
+    office = digits_only(f"IFNULL({row}.office_phone, '')")
+    return (f"{row}.customer_id, {row}.first_name, {row}.last_name, "
+            f"{cell} || ' ' || {office}, {row}.email, {row}.city")
+
+
+def _add_customer_search_index(cursor):
+    """4: FTS5 index behind the customer search boxes, kept in sync by triggers."""
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE customers_fts USING fts5(
+                first_name, last_name, phone, email, city,
+                prefix = '1 2 3',
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e).lower():
+            raise
+        # SQLite built without FTS5: customer_model falls back to LIKE searches
+        return
+
+    columns = "rowid, first_name, last_name, phone, email, city"
+    cursor.execute(f"""
+        INSERT INTO customers_fts ({columns})
+        SELECT {_customer_search_values("customers")} FROM customers
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER customers_fts_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts ({columns}) VALUES ({_customer_search_values("new")});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER customers_fts_update
+        AFTER UPDATE OF first_name, last_name, cell_phone, office_phone, email, city ON customers BEGIN
+            DELETE FROM customers_fts WHERE rowid = old.customer_id;
+            INSERT INTO customers_fts ({columns}) VALUES ({_customer_search_values("new")});
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN
+            DELETE FROM customers_fts WHERE rowid = old.customer_id;
+        END
+    """)
+
+
+def _add_order_breakdown(cursor):
+    """5: Stored discount/tax/processing per order and discount per line, plus the campaign index reports use."""
+    # Only old databases run this; keeps NumPy out of every other startup
+    from pricing import price_line, price_orders
+
+    for column in ("subtotal", "discount_total", "tax_total", "processing_total"):
+        _add_column_if_missing(cursor, "orders", column, "REAL DEFAULT 0")
+    _add_column_if_missing(cursor, "order_products", "line_discount", "REAL DEFAULT 0")
+
+    # Backfill by pricing the stored lines the way order entry does
+    cursor.execute("""
+        SELECT product_id, order_id, IFNULL(qty, 0), IFNULL(unit_price, 0), IFNULL(reg_price, 0),
+               IFNULL(discount, 0), IFNULL(tax, 0), IFNULL(processing, 0)
+        FROM order_products
+        WHERE order_id IS NOT NULL
+    """)
+    rows = cursor.fetchall()
+    if rows:
+        product_ids, order_ids, qty, unit_price, reg_price, discount, tax, processing = zip(*rows)
+        cursor.executemany(
+            "UPDATE order_products SET line_discount = ? WHERE product_id = ?",
+            [(price_line(*row[2:6])[1], row[0]) for row in rows if row[5] > 0],
+        )
+        order_pricing = price_orders(order_ids, qty, unit_price, reg_price, discount, tax, processing)
+        cursor.executemany(
+            "UPDATE orders SET subtotal = ?, discount_total = ?, tax_total = ?, processing_total = ? "
+            "WHERE order_id = ?",
+            [(pricing.subtotal, pricing.discount_total, pricing.tax, pricing.processing, order_id)
+             for order_id, pricing in order_pricing.items()],
+        )
+
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_campaign
+        ON orders (campaign_year, campaign_number, customer_id)
+    """)
+
+
+def _add_to_balance(customer_id, ordered="0", paid="0"):
+    """Trigger statement adding to one customer's ledger row, creating it on first use."""
+    return f"""
+        INSERT INTO customer_balances (customer_id, total_ordered, total_paid, balance)
+        VALUES ({customer_id}, ROUND({ordered}, 2), ROUND({paid}, 2), ROUND({ordered} - {paid}, 2))
+        ON CONFLICT (customer_id) DO UPDATE SET
+            total_ordered = ROUND(total_ordered + excluded.total_ordered, 2),
+            total_paid = ROUND(total_paid + excluded.total_paid, 2),
+            balance = ROUND(balance + excluded.balance, 2);
+    """
+
+
+def _take_from_balance(customer_id, ordered="0", paid="0"):
+    """Trigger statement undoing _add_to_balance; a customer already deleted has no row to change."""
+    return f"""
+        UPDATE customer_balances SET
+            total_ordered = ROUND(total_ordered - {ordered}, 2),
+            total_paid = ROUND(total_paid - {paid}, 2),
+            balance = ROUND(balance - ({ordered} - {paid}), 2)
+        WHERE customer_id = {customer_id};
+    """
+
+
+def _add_customer_balances(cursor):
+    """6: Payments, and a per-customer balance ledger kept up to date by triggers."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS payments (
+            payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            order_id INTEGER,
+            amount REAL NOT NULL,
+            paid_on TEXT DEFAULT (datetime('now', 'localtime')),
+            note TEXT DEFAULT '',
+            FOREIGN KEY (customer_id) REFERENCES customers(customer_id),
+            FOREIGN KEY (order_id) REFERENCES orders(order_id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_payments_customer ON payments (customer_id, paid_on)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS customer_balances (
+            customer_id INTEGER PRIMARY KEY,
+            total_ordered REAL NOT NULL DEFAULT 0,
+            total_paid REAL NOT NULL DEFAULT 0,
+            balance REAL NOT NULL DEFAULT 0
+        )
+    """)
+    # Only customers who owe money are indexed, so the "who owes" list never scans paid-up accounts
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_customer_balances_owing
+        ON customer_balances (balance) WHERE balance > 0
+    """)
+
+    # Payments typed onto orders by hand in older versions become payment rows
+    cursor.execute("""
+        INSERT INTO payments (customer_id, order_id, amount, paid_on, note)
+        SELECT customer_id, order_id, payment, IFNULL(time_submitted, datetime('now', 'localtime')), 'Imported'
+        FROM orders
+        WHERE payment > 0 AND customer_id IN (SELECT customer_id FROM customers)
+    """)
+    cursor.execute("""
+        INSERT INTO customer_balances (customer_id, total_ordered, total_paid, balance)
+        SELECT customer_id, ROUND(SUM(ordered), 2), ROUND(SUM(paid), 2), ROUND(SUM(ordered) - SUM(paid), 2)
+        FROM (
+            SELECT customer_id, IFNULL(order_total, 0) AS ordered, 0 AS paid FROM orders
+            UNION ALL
+            SELECT customer_id, 0, amount FROM payments
+        )
+        WHERE customer_id IN (SELECT customer_id FROM customers)
+        GROUP BY customer_id
+    """)
+
+    # Triggers are created after the backfill so it is not counted twice
+    cursor.execute(f"""
+        CREATE TRIGGER orders_balance_insert AFTER INSERT ON orders BEGIN
+            {_add_to_balance("new.customer_id", ordered="IFNULL(new.order_total, 0)")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER orders_balance_update AFTER UPDATE OF order_total, customer_id ON orders BEGIN
+            {_take_from_balance("old.customer_id", ordered="IFNULL(old.order_total, 0)")}
+            {_add_to_balance("new.customer_id", ordered="IFNULL(new.order_total, 0)")}
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER orders_balance_delete AFTER DELETE ON orders BEGIN
+            {_take_from_balance("old.customer_id", ordered="IFNULL(old.order_total, 0)")}
+        END
+    """)
+    # Payments are never edited - a mistake is deleted and recorded again
+    cursor.execute(f"""
+        CREATE TRIGGER payments_balance_insert AFTER INSERT ON payments BEGIN
+            {_add_to_balance("new.customer_id", paid="new.amount")}
+            UPDATE orders SET payment = payment + new.amount, net_due = net_due - new.amount
+            WHERE order_id = new.order_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER payments_balance_delete AFTER DELETE ON payments BEGIN
+            {_take_from_balance("old.customer_id", paid="old.amount")}
+            UPDATE orders SET payment = payment - old.amount, net_due = net_due + old.amount
+            WHERE order_id = old.order_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER customers_balance_delete AFTER DELETE ON customers BEGIN
+            DELETE FROM customer_balances WHERE customer_id = old.customer_id;
+        END
+    """)
+
+
+def _add_product_catalog(cursor):
+    """7: The products table order entry looks Product #s up in, with a version bumped on every change."""
+    # Some databases already have this table (it shipped before anything used it)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            product_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            price REAL,
+            shade TEXT,
+            size TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)")
+    # catalog.get_catalog() reloads its cached copy whenever this number moves
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        cursor.execute(f"""
+            CREATE TRIGGER products_version_{event.lower()} AFTER {event} ON products BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        """)
+
+
+_REP_INFO_COLUMNS = ("rep_name", "rep_address", "rep_office", "rep_cell", "rep_email", "rep_website")
+
+
+def _add_app_settings(cursor):
+    """8: One app_settings row for the campaign and rep info, with campaign changes logged to campaign_history."""
+    cursor.execute("""
+        CREATE TABLE app_settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            campaign_year INTEGER NOT NULL DEFAULT 2025,
+            campaign_number INTEGER NOT NULL DEFAULT 1,
+            last_campaign INTEGER NOT NULL DEFAULT 30,
+            rep_name TEXT DEFAULT '',
+            rep_address TEXT DEFAULT '',
+            rep_office TEXT DEFAULT '',
+            rep_cell TEXT DEFAULT '',
+            rep_email TEXT DEFAULT '',
+            rep_website TEXT DEFAULT '',
+            updated_at TEXT DEFAULT (datetime('now', 'localtime'))
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE campaign_history (
+            changed_at TEXT DEFAULT (datetime('now', 'localtime')),
+            campaign_year INTEGER,
+            campaign_number INTEGER,
+            last_campaign INTEGER
+        )
+    """)
+
+    # Options used to append a campaign_settings row on every save and every
+    # Next/Previous click; keep only the rows where the campaign changed
+    cursor.execute("""
+        INSERT INTO campaign_history (changed_at, campaign_year, campaign_number, last_campaign)
+        SELECT NULL, year, campaign, last_campaign FROM (
+            SELECT id, year, campaign, last_campaign,
+                   LAG(year) OVER byid AS previous_year,
+                   LAG(campaign) OVER byid AS previous_campaign,
+                   LAG(last_campaign) OVER byid AS previous_last
+            FROM campaign_settings
+            WINDOW byid AS (ORDER BY id)
+        )
+        WHERE previous_year IS NULL OR year IS NOT previous_year
+              OR campaign IS NOT previous_campaign OR last_campaign IS NOT previous_last
+        ORDER BY id
+    """)
+    cursor.execute("INSERT INTO app_settings (id) VALUES (1)")
+    cursor.execute("""
+        UPDATE app_settings SET (campaign_year, campaign_number, last_campaign) = (
+            SELECT IFNULL(year, 2025), IFNULL(campaign, 1), IFNULL(last_campaign, 30)
+            FROM campaign_settings ORDER BY id DESC LIMIT 1
+        )
+        WHERE EXISTS (SELECT 1 FROM campaign_settings)
+    """)
+    cursor.execute(f"""
+        UPDATE app_settings SET ({", ".join(_REP_INFO_COLUMNS)}) = (
+            SELECT IFNULL(rep_name, ''), IFNULL(rep_address, ''), IFNULL(rep_office, ''),
+                   IFNULL(rep_cell, ''), IFNULL(rep_email, ''), IFNULL(rep_website, '')
+            FROM representative_info ORDER BY id DESC LIMIT 1
+        )
+        WHERE EXISTS (SELECT 1 FROM representative_info)
+    """)
+    # Invoices used to take the rep info from settings.conf; keep it if the table had none
+    cursor.execute("SELECT 1 FROM representative_info LIMIT 1")
+    if cursor.fetchone() is None:
+        from settings import get_settings
+        rep_info = get_settings().get_section("Representative")
+        columns = [column for column in _REP_INFO_COLUMNS if rep_info.get(column)]
+        if columns:
+            cursor.execute(
+                f"UPDATE app_settings SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = 1",
+                [rep_info[column] for column in columns],
+            )
+    cursor.execute("DROP TABLE campaign_settings")
+    cursor.execute("DROP TABLE representative_info")
+
+    cursor.execute("""
+        CREATE TRIGGER app_settings_campaign_history
+        AFTER UPDATE OF campaign_year, campaign_number, last_campaign ON app_settings
+        WHEN new.campaign_year IS NOT old.campaign_year OR new.campaign_number IS NOT old.campaign_number
+             OR new.last_campaign IS NOT old.last_campaign
+        BEGIN
+            INSERT INTO campaign_history (campaign_year, campaign_number, last_campaign)
+            VALUES (new.campaign_year, new.campaign_number, new.last_campaign);
+        END
+    """)
+
+
+# Tables whose changes open windows check for before reloading; order lines
+# are covered by "orders", since saving or deleting lines always rewrites the order
+DATA_VERSION_TABLES = ("customers", "orders", "payments")
+
+
+def _add_data_versions(cursor):
+    """9: A change counter per table, so a window shown again reloads only if its data moved."""
+    cursor.execute("""
+        CREATE TABLE data_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany("INSERT INTO data_versions (name) VALUES (?)", [(table,) for table in DATA_VERSION_TABLES])
+    for table in DATA_VERSION_TABLES:
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(f"""
+                CREATE TRIGGER {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE data_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+
+
+def _stop_carrying_balances(cursor):
+    """10: orders.net_due is the order's own amount due again; the carried balance is worked out on read."""
+    # Orders saved since migration 6 stored the balance carried onto them, which went stale
+    # whenever an earlier order changed. db_utils._CARRIED_BALANCE computes it instead.
+    cursor.execute("""
+        UPDATE orders SET previous_balance = 0, net_due = ROUND(IFNULL(order_total, 0) - IFNULL(payment, 0), 2)
+    """)
+
+
+MIGRATIONS = [
+    _create_base_tables,
+    _add_order_indexes,
+    _add_customer_group_indexes,
+    _add_customer_search_index,
+    _add_order_breakdown,
+    _add_customer_balances,
+    _add_product_catalog,
+    _add_app_settings,
+    _add_data_versions,
+    _stop_carrying_balances,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Bring the database up to SCHEMA_VERSION. Returns the list of versions applied."""
+    version = get_schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this app supports ({SCHEMA_VERSION}). "
+            "Please update Avon Hello."
+        )
+
+    applied = []
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        applied.append(target)
+    return applied
@@ -1,39 +1,26 @@
-import sqlite3
-import configparser
+import logging
 import os
 from PyQt5.QtWidgets import (
     QMainWindow, QVBoxLayout, QPushButton, QLabel, 
-    QSpinBox, QHBoxLayout, QWidget, QGroupBox, QGridLayout, QLineEdit, QCheckBox, QMessageBox
+    QSpinBox, QHBoxLayout, QWidget, QGroupBox, QGridLayout, QLineEdit, QCheckBox, QMessageBox,
+    QFileDialog
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QIcon
 
-from db_utils import DB_PATH, SETTINGS_FILE
+from db_utils import CAMPAIGN_KEYS, get_app_settings, update_app_settings
+from datetime import datetime
 
+from db_worker import get_db_worker, watch_future
+from catalog_import import import_catalog
+from invoices import InvoiceBatch, load_campaign_invoices, open_pdf, statement_filename, submit_statement
+from settings import is_dark_mode_enabled, set_dark_mode
 
+logger = logging.getLogger(__name__)
 
-def load_settings():
-    config = configparser.ConfigParser()
-    if not os.path.exists(SETTINGS_FILE):
-        config['Appearance'] = {'dark_mode': 'false'}
-        with open(SETTINGS_FILE, 'w') as f:
-            config.write(f)
-    else:
-        config.read(SETTINGS_FILE)
-    return config
+# How often the campaign invoice batch reports progress
+INVOICE_POLL_MS = 200
 
-def save_settings(config):
-    with open(SETTINGS_FILE, 'w') as f:
-        config.write(f)
-
-def is_dark_mode_enabled():
-    config = load_settings()
-    return config.getboolean("Appearance", "dark_mode", fallback=False)
-
-def set_dark_mode(enabled):
-    config = load_settings()
-    config["Appearance"]["dark_mode"] = "true" if enabled else "false"
-    save_settings(config)
 
 class OptionsWindow(QMainWindow):
     def __init__(self):
@@ -41,35 +28,16 @@ class OptionsWindow(QMainWindow):
         self.setWindowTitle("Options")
         self.setGeometry(250, 250, 600, 500)
         self.setWindowIcon(QIcon("Avon256.png"))
+        self.db = get_db_worker()
         self.init_ui()
         self.load_campaign_data()
 
-    def apply_stylesheet(self):
-        if is_dark_mode_enabled():
-            self.setStyleSheet("""
-                QWidget {
-                    background-color: #121212;
-                    color: #f0f0f0;
-                }
-                QPushButton {
-                    background-color: #2c3e50;
-                    color: white;
-                    padding: 6px;
-                }
-                QLineEdit, QSpinBox, QComboBox {
-                    background-color: #1e1e1e;
-                    color: white;
-                    border: 1px solid #333;
-                }
-                QLabel, QCheckBox {
-                    color: #f0f0f0;
-                }
-            """)
-        else:
-            self.setStyleSheet("")
+    def refresh(self):
+        """Called when the window is opened again: show the saved settings, dropping unsaved edits."""
+        self.dark_mode_checkbox.setChecked(is_dark_mode_enabled())
+        self.load_campaign_data()  # served from memory unless app_settings changed
 
     def init_ui(self):
-        self.apply_stylesheet()
         layout = QVBoxLayout()
 
         title_label = QLabel("Options", self)
@@ -109,6 +77,20 @@ class OptionsWindow(QMainWindow):
         campaign_layout.addWidget(self.last_campaign_label, 0, 2)
         campaign_layout.addWidget(self.last_campaign_spin, 0, 3)
 
+        self.btn_print_invoices = QPushButton("Print Campaign Invoices")
+        self.btn_print_invoices.clicked.connect(self.print_campaign_invoices)
+        campaign_layout.addWidget(self.btn_print_invoices, 1, 2, 1, 2)
+
+        self.btn_campaign_statement = QPushButton("Campaign Statement PDF")
+        self.btn_campaign_statement.setToolTip("Every invoice of the campaign in one bookmarked PDF")
+        self.btn_campaign_statement.clicked.connect(self.print_campaign_statement)
+        campaign_layout.addWidget(self.btn_campaign_statement, 2, 2, 1, 2)
+
+        self.btn_import_catalog = QPushButton("Import Brochure Catalog")
+        self.btn_import_catalog.setToolTip("Add or update products from a CSV or JSON price list")
+        self.btn_import_catalog.clicked.connect(self.import_catalog)
+        campaign_layout.addWidget(self.btn_import_catalog, 2, 0, 1, 2)
+
         campaign_group.setLayout(campaign_layout)
         layout.addWidget(campaign_group)
 
@@ -166,87 +148,58 @@ class OptionsWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
     def load_campaign_data(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS campaign_settings (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                year INTEGER DEFAULT 2025,
-                campaign INTEGER DEFAULT 1,
-                last_campaign INTEGER DEFAULT 30
-            )
-        """)
-
-        cursor.execute("SELECT year, campaign, last_campaign FROM campaign_settings ORDER BY id DESC LIMIT 1")
-        result = cursor.fetchone()
-        if result:
-            year, campaign, last_campaign = result
-        else:
-            year, campaign, last_campaign = 2025, 1, 30
-            cursor.execute("INSERT INTO campaign_settings (year, campaign, last_campaign) VALUES (?, ?, ?)", 
-                           (year, campaign, last_campaign))
-            conn.commit()
-
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS representative_info (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                rep_name TEXT,
-                rep_address TEXT,
-                rep_cell TEXT,
-                rep_office TEXT,
-                rep_email TEXT,
-                rep_website TEXT
-            )
-        """)
-        cursor.execute("SELECT rep_name, rep_address, rep_cell, rep_office, rep_email, rep_website FROM representative_info ORDER BY id DESC LIMIT 1")
-        rep_result = cursor.fetchone()
-        conn.close()
-
-        self.year_spin.setValue(year)
-        self.campaign_spin.setValue(campaign)
-        self.last_campaign_spin.setValue(last_campaign)
-
-        if rep_result:
-            self.rep_name_input.setText(rep_result[0] or "")
-            self.rep_address_input.setText(rep_result[1] or "")
-            self.rep_cell_phone_input.setText(rep_result[2] or "")
-            self.rep_office_phone_input.setText(rep_result[3] or "")
-            self.rep_email_input.setText(rep_result[4] or "")
-            self.rep_website_input.setText(rep_result[5] or "")
+        self.btn_save_options.setEnabled(False)  # until the current values are shown
+        self.db.submit(
+            self, get_app_settings, name="options",
+            on_result=self.show_campaign_data,
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to load options: {e}"),
+        )
+
+    def show_campaign_data(self, app_settings):
+        self.year_spin.setValue(app_settings["campaign_year"])
+        self.campaign_spin.setValue(app_settings["campaign_number"])
+        self.last_campaign_spin.setValue(app_settings["last_campaign"])
+
+        for key, widget in self._rep_inputs().items():
+            widget.setText(app_settings[key] or "")
+        self.btn_save_options.setEnabled(True)
+
+    def _rep_inputs(self):
+        return {
+            "rep_name": self.rep_name_input,
+            "rep_address": self.rep_address_input,
+            "rep_cell": self.rep_cell_phone_input,
+            "rep_office": self.rep_office_phone_input,
+            "rep_email": self.rep_email_input,
+            "rep_website": self.rep_website_input,
+        }
 
     def save_campaign_data(self, year, campaign, last_campaign):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO campaign_settings (year, campaign, last_campaign) VALUES (?, ?, ?)", 
-                       (year, campaign, last_campaign))
-        conn.commit()
-        conn.close()
+        self.db.submit(
+            self, update_app_settings, dict(zip(CAMPAIGN_KEYS, (year, campaign, last_campaign))),
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to save the campaign: {e}"),
+        )
 
     def save_options(self):
-        year = self.year_spin.value()
-        campaign = self.campaign_spin.value()
-        last_campaign = self.last_campaign_spin.value()
-        self.save_campaign_data(year, campaign, last_campaign)
-
-        rep_name = self.rep_name_input.text()
-        rep_address = self.rep_address_input.text()
-        rep_cell = self.rep_cell_phone_input.text()
-        rep_office = self.rep_office_phone_input.text()
-        rep_email = self.rep_email_input.text()
-        rep_website = self.rep_website_input.text()
-
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO representative_info (rep_name, rep_address, rep_cell, rep_office, rep_email, rep_website)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (rep_name, rep_address, rep_cell, rep_office, rep_email, rep_website))
-        conn.commit()
-        conn.close()
-
-        set_dark_mode(self.dark_mode_checkbox.isChecked())
-        QMessageBox.information(self, "Saved", "Settings saved. Please restart the app to apply theme changes.")
+        values = dict(zip(CAMPAIGN_KEYS, (
+            self.year_spin.value(), self.campaign_spin.value(), self.last_campaign_spin.value()
+        )))
+        values.update((key, widget.text()) for key, widget in self._rep_inputs().items())
+
+        self.btn_save_options.setEnabled(False)
+        self.db.submit(
+            self, update_app_settings, values,
+            on_result=self._options_saved, on_error=self._save_failed,
+        )
+
+    def _options_saved(self, _):
+        self.btn_save_options.setEnabled(True)
+        set_dark_mode(self.dark_mode_checkbox.isChecked())  # themes.py restyles the open windows
+        QMessageBox.information(self, "Saved", "Settings saved.")
+
+    def _save_failed(self, error):
+        self.btn_save_options.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to save settings: {error}")
 
     def increment_campaign(self):
         current_campaign = self.campaign_spin.value()
@@ -271,3 +224,116 @@ class OptionsWindow(QMainWindow):
             self.year_spin.setValue(new_year)
         self.campaign_spin.setValue(current_campaign)
         self.save_campaign_data(self.year_spin.value(), current_campaign, last_campaign)
+
+    def print_campaign_invoices(self):
+        """Write an invoice for every order in the selected campaign, rendered in parallel."""
+        out_dir = QFileDialog.getExistingDirectory(self, "Save Campaign Invoices To")
+        if not out_dir:
+            return
+        year, campaign = self.year_spin.value(), self.campaign_spin.value()
+        self.btn_print_invoices.setEnabled(False)
+        self.btn_print_invoices.setText("Loading orders...")
+        self.db.submit(
+            self, load_campaign_invoices, year, campaign, name="campaign_invoices",
+            on_result=lambda invoices: self._start_invoice_batch(invoices, out_dir, year, campaign),
+            on_error=self._invoices_failed,
+        )
+
+    def _start_invoice_batch(self, invoices, out_dir, year, campaign):
+        if not invoices:
+            self._reset_invoice_button()
+            QMessageBox.information(self, "No Orders", f"There are no orders in campaign {campaign} of {year}.")
+            return
+        self.invoice_batch = InvoiceBatch(invoices, out_dir)
+        self.invoice_batch_info = (out_dir, year, campaign)
+        self.invoice_timer = QTimer(self)
+        self.invoice_timer.setInterval(INVOICE_POLL_MS)
+        self.invoice_timer.timeout.connect(self._check_invoice_batch)
+        self.invoice_timer.start()
+
+    def _check_invoice_batch(self):
+        batch = self.invoice_batch
+        done, total = batch.poll()
+        self.btn_print_invoices.setText(f"Printing invoices {done}/{total}...")
+        if not batch.finished:
+            return
+
+        self.invoice_timer.stop()
+        self._reset_invoice_button()
+        out_dir, year, campaign = self.invoice_batch_info
+        logger.info(
+            "campaign invoices year=%s campaign=%s rendered=%d failed=%d elapsed_s=%.2f per_s=%.1f",
+            year, campaign, len(batch.filenames), len(batch.failed), batch.elapsed, batch.rate,
+        )
+        message = (f"{len(batch.filenames)} invoices saved to:\n{out_dir}\n\n"
+                   f"{batch.elapsed:.1f} s ({batch.rate:.1f} invoices/sec)")
+        if batch.failed:
+            message += f"\n\n{len(batch.failed)} could not be created; see the log for details."
+        QMessageBox.information(self, "Invoices Printed", message)
+
+    def _invoices_failed(self, error):
+        self._reset_invoice_button()
+        QMessageBox.critical(self, "Error", f"Failed to load the campaign's orders: {error}")
+
+    def _reset_invoice_button(self):
+        self.btn_print_invoices.setEnabled(True)
+        self.btn_print_invoices.setText("Print Campaign Invoices")
+
+    def print_campaign_statement(self):
+        """Write every invoice of the selected campaign into one PDF and open it."""
+        year, campaign = self.year_spin.value(), self.campaign_spin.value()
+        default = os.path.join(os.path.expanduser("~"), "Downloads",
+                               statement_filename(year, campaign, datetime.now().strftime("%Y-%m-%d")))
+        filename, _ = QFileDialog.getSaveFileName(self, "Save Campaign Statement", default, "PDF Files (*.pdf)")
+        if not filename:
+            return
+        self.btn_campaign_statement.setEnabled(False)
+        self.db.submit(
+            self, load_campaign_invoices, year, campaign, name="campaign_statement",
+            on_result=lambda invoices: self._render_statement(invoices, filename, year, campaign),
+            on_error=self._statement_failed,
+        )
+
+    def _render_statement(self, invoices, filename, year, campaign):
+        if not invoices:
+            self.btn_campaign_statement.setEnabled(True)
+            QMessageBox.information(self, "No Orders", f"There are no orders in campaign {campaign} of {year}.")
+            return
+        future = submit_statement([invoice for _, _, invoice in invoices], filename,
+                                  f"Campaign {campaign} of {year}")
+        watch_future(self, future, self._statement_printed, self._statement_failed)
+
+    def _statement_printed(self, filename):
+        self.btn_campaign_statement.setEnabled(True)
+        open_pdf(filename)
+
+    def _statement_failed(self, error):
+        self.btn_campaign_statement.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to create the campaign statement: {error}")
+
+    def import_catalog(self):
+        """Load a brochure price list into the product catalog in the background."""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import Brochure Catalog", os.path.expanduser("~"),
+            "Catalog Files (*.csv *.json *.jsonl *.ndjson);;All Files (*)"
+        )
+        if not path:
+            return
+        self.btn_import_catalog.setEnabled(False)
+        self.btn_import_catalog.setText("Importing...")
+        self.db.submit(
+            self, import_catalog, path,
+            on_result=self._catalog_imported, on_error=self._catalog_import_failed,
+        )
+
+    def _catalog_imported(self, result):
+        self._reset_import_button()
+        QMessageBox.information(self, "Catalog Imported", str(result))
+
+    def _catalog_import_failed(self, error):
+        self._reset_import_button()
+        QMessageBox.critical(self, "Error", f"Failed to import the catalog: {error}")
+
+    def _reset_import_button(self):
+        self.btn_import_catalog.setEnabled(True)
+        self.btn_import_catalog.setText("Import Brochure Catalog")
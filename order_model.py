@@ -0,0 +1,417 @@
+import math
+
+from PyQt5.QtCore import (
+    Qt, QAbstractListModel, QAbstractTableModel, QModelIndex, QTimer, QEvent, QRect, pyqtSignal
+)
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QStyleOptionButton, QApplication, QCompleter, QLineEdit
+
+from pricing import OrderPricing, price_line, price_order
+
+# (header, OrderLine attribute) for each column of the order table
+COLUMNS = [
+    ("Product #", "product_number"),
+    ("Page", "page"),
+    ("Description", "description"),
+    ("Shade/Fragrance", "shade"),
+    ("Size", "size"),
+    ("QTY", "qty"),
+    ("Unit Price", "unit_price"),
+    ("Reg Price", "reg_price"),
+    ("Tax", "tax"),
+    ("Discount %", "discount"),
+    ("Total Price", "total_price"),
+    ("Proc. Fee", "processing"),
+]
+(PRODUCT_NUMBER, PAGE, DESCRIPTION, SHADE, SIZE, QTY, UNIT_PRICE, REG_PRICE,
+ TAX, DISCOUNT, TOTAL_PRICE, PROCESSING) = range(len(COLUMNS))
+
+TEXT_COLUMNS = (PRODUCT_NUMBER, PAGE, DESCRIPTION, SHADE, SIZE)
+MONEY_COLUMNS = (UNIT_PRICE, REG_PRICE, TOTAL_PRICE)
+CHECK_COLUMNS = (TAX, PROCESSING)
+# Columns that feed a line's Total Price
+PRICED_COLUMNS = (QTY, UNIT_PRICE, REG_PRICE, TAX, DISCOUNT, PROCESSING)
+
+
+class OrderLine:
+    """One product line of an order, held as typed values rather than cell text."""
+
+    __slots__ = ("product_id", "product_number", "page", "description", "shade", "size",
+                 "qty", "unit_price", "reg_price", "tax", "discount", "processing",
+                 "total_price", "line_discount")
+
+    def __init__(self, product_number="", page="", description="", shade="", size="", qty=1,
+                 unit_price=0.0, reg_price=0.0, tax=False, discount=0.0, processing=False,
+                 product_id=None):
+        self.product_id = product_id  # order_products row this line was loaded from
+        self.product_number = product_number
+        self.page = page
+        self.description = description
+        self.shade = shade
+        self.size = size
+        self.qty = qty
+        self.unit_price = unit_price
+        self.reg_price = reg_price
+        self.tax = tax
+        self.discount = discount
+        self.processing = processing
+        self.total_price = 0.0
+        self.line_discount = 0.0
+
+    # Column order of SELECT statements passed to from_db_row()
+    DB_COLUMNS = ("product_id, product_number, page, description, shade, size, qty, "
+                  "unit_price, reg_price, tax, discount, processing")
+
+    @classmethod
+    def from_db_row(cls, row):
+        (product_id, product_number, page, description, shade, size, qty,
+         unit_price, reg_price, tax, discount, processing) = row
+        description = description or ""
+        shade = shade or ""
+        # Older versions saved the shade appended to the description as well
+        suffix = f" — {shade.strip()}"
+        if shade.strip() and description.endswith(suffix):
+            description = description[:-len(suffix)]
+        return cls(product_number or "", page or "", description, shade, size or "", qty or 0,
+                   unit_price or 0.0, reg_price or 0.0, bool(tax), discount or 0.0,
+                   bool(processing), product_id)
+
+    def as_db_tuple(self):
+        """Values in db_utils.ORDER_PRODUCT_COLUMNS order."""
+        return (self.product_number, self.page, self.description, self.shade, self.size,
+                int(self.qty), self.unit_price, self.reg_price, int(self.tax), self.discount,
+                self.total_price, int(self.processing), self.line_discount)
+
+    def reprice(self):
+        self.total_price, self.line_discount = price_line(
+            self.qty, self.unit_price, self.reg_price, self.discount
+        )
+
+    def fill_from(self, product):
+        """Copy a catalog.Product's details onto this line; the brochure price is also the regular price."""
+        self.description = product.name or product.description
+        self.shade = product.shade
+        self.size = product.size
+        self.unit_price = product.price
+        self.reg_price = product.price
+
+
+def _parse_number(text, integer=False):
+    text = str(text).replace("$", "").strip()
+    if not text:
+        return 0
+    number = float(text)
+    if not math.isfinite(number):  # "inf" and "nan" parse as floats but cannot be priced
+        raise ValueError(f"not a finite number: {text!r}")
+    return int(number) if integer else number
+
+
+class OrderTableModel(QAbstractTableModel):
+    """Table model over a list of OrderLine objects.
+
+    Edits reprice only the line that changed; the order totals are adjusted by
+    that line's difference and published once per burst of edits through
+    totalsChanged. With a catalog set, typing a known Product # fills in the
+    rest of the line.
+    """
+
+    totalsChanged = pyqtSignal(object)  # OrderPricing
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lines = []
+        # Running (subtotal, discounts, taxable subtotal, processing count)
+        self._running_totals = [0.0, 0.0, 0.0, 0]
+        self._dirty = set()  # OrderLine objects waiting to be repriced
+        self._contributions = {}  # id(line) -> what that line adds to the running totals
+        self._totals_timer = QTimer(self)
+        self._totals_timer.setSingleShot(True)
+        self._totals_timer.setInterval(0)  # coalesce a burst of edits into one update
+        self._totals_timer.timeout.connect(self._apply_dirty_lines)
+        self.catalog = None  # catalog.Catalog, once loaded
+
+    # --- Lines ---
+
+    @property
+    def lines(self):
+        return self._lines
+
+    def set_lines(self, lines):
+        """Replace every line in one model reset and reprice the whole order."""
+        self.beginResetModel()
+        self._lines = list(lines)
+        self._dirty.clear()
+        self._contributions.clear()
+        # Price the whole order in one columnar pass rather than line by line
+        pricing = self.pricing()
+        subtotal = discounts = taxable = 0.0
+        processing_count = 0
+        for line, line_total, line_discount in zip(self._lines, pricing.line_totals, pricing.line_discounts):
+            line.total_price, line.line_discount = line_total, line_discount
+            contribution = (line_total, line_discount, line_total if line.tax else 0.0, int(line.processing))
+            self._contributions[id(line)] = contribution
+            subtotal += line_total
+            discounts += line_discount
+            taxable += contribution[2]
+            processing_count += contribution[3]
+        self._running_totals = [subtotal, discounts, taxable, processing_count]
+        self.endResetModel()
+        self.totalsChanged.emit(self.totals())
+
+    def add_line(self, line=None):
+        line = line or OrderLine()
+        row = len(self._lines)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._lines.append(line)
+        self._add_contribution(line)
+        self.endInsertRows()
+        self.totalsChanged.emit(self.totals())
+        return line
+
+    def removeRows(self, row, count, parent=QModelIndex()):
+        if parent.isValid() or row < 0 or row + count > len(self._lines):
+            return False
+        self.beginRemoveRows(parent, row, row + count - 1)
+        for line in self._lines[row:row + count]:
+            self._remove_contribution(line)
+            self._dirty.discard(line)
+        del self._lines[row:row + count]
+        self.endRemoveRows()
+        self.totalsChanged.emit(self.totals())
+        return True
+
+    # --- Pricing ---
+
+    def _add_contribution(self, line):
+        line.reprice()
+        contribution = (line.total_price, line.line_discount,
+                        line.total_price if line.tax else 0.0, int(line.processing))
+        self._contributions[id(line)] = contribution
+        self._running_totals = [total + value for total, value in zip(self._running_totals, contribution)]
+
+    def _remove_contribution(self, line):
+        contribution = self._contributions.pop(id(line), (0.0, 0.0, 0.0, 0))
+        self._running_totals = [total - value for total, value in zip(self._running_totals, contribution)]
+
+    def _apply_dirty_lines(self):
+        if not self._dirty:
+            return
+        for line in self._dirty:
+            self._remove_contribution(line)
+            self._add_contribution(line)
+        rows = [row for row, line in enumerate(self._lines) if line in self._dirty] \
+            if len(self._dirty) > 1 else [self._lines.index(next(iter(self._dirty)))]
+        self._dirty.clear()
+        self.dataChanged.emit(self.index(min(rows), TOTAL_PRICE), self.index(max(rows), TOTAL_PRICE))
+        self.totalsChanged.emit(self.totals())
+
+    def totals(self):
+        """Order totals from the running sums (cheap; no full repricing)."""
+        return OrderPricing(*self._running_totals)
+
+    def pricing(self):
+        """Price every line from scratch in one pass, e.g. for saving or printing."""
+        columns = [[getattr(line, name) for line in self._lines]
+                   for name in ("qty", "unit_price", "reg_price", "discount", "tax", "processing")]
+        return price_order(*columns)
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._lines)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return COLUMNS[section][0]
+            return str(section + 1)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        column = index.column()
+        if column in CHECK_COLUMNS:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        if column == TOTAL_PRICE:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        line = self._lines[index.row()]
+        column = index.column()
+        value = getattr(line, COLUMNS[column][1])
+
+        if column in CHECK_COLUMNS:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if value else Qt.Unchecked
+            return None
+        if role == Qt.DisplayRole:
+            if column in MONEY_COLUMNS:
+                return f"${value:.2f}"
+            if column == DISCOUNT:
+                return f"{value:g}"
+            return str(value)
+        if role == Qt.EditRole:
+            if column in MONEY_COLUMNS:
+                return f"{value:.2f}"
+            if column == DISCOUNT:
+                return f"{value:g}"
+            return str(value)
+        if role == Qt.TextAlignmentRole and column in MONEY_COLUMNS + (QTY, DISCOUNT):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def _fill_from_catalog(self, line):
+        product = self.catalog.lookup(line.product_number) if self.catalog is not None else None
+        if product is None:
+            return False
+        line.product_number = product.code
+        line.fill_from(product)
+        return True
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid():
+            return False
+        line = self._lines[index.row()]
+        column = index.column()
+        attribute = COLUMNS[column][1]
+
+        if column in CHECK_COLUMNS:
+            if role != Qt.CheckStateRole:
+                return False
+            value = Qt.CheckState(value) == Qt.Checked
+        elif role != Qt.EditRole or column == TOTAL_PRICE:
+            return False
+        elif column in TEXT_COLUMNS:
+            value = str(value)
+        else:
+            try:
+                value = _parse_number(value, integer=(column == QTY))
+            except (ValueError, OverflowError):
+                return False  # keep the previous value
+
+        setattr(line, attribute, value)
+        if column == PRODUCT_NUMBER and self._fill_from_catalog(line):
+            self.dataChanged.emit(self.index(index.row(), 0), self.index(index.row(), len(COLUMNS) - 1))
+            self._dirty.add(line)
+            self._totals_timer.start()
+            return True
+        self.dataChanged.emit(index, index)
+        if column in PRICED_COLUMNS:
+            self._dirty.add(line)
+            self._totals_timer.start()
+        return True
+
+
+class CheckBoxDelegate(QStyledItemDelegate):
+    """Paints a centred checkbox for a CheckStateRole column and toggles it on click or Space.
+
+    Used instead of a QWidget + QCheckBox per cell, so rows cost no widgets.
+    """
+
+    def _indicator_rect(self, option):
+        style = option.widget.style() if option.widget else QApplication.style()
+        size = style.subElementRect(QStyle.SE_CheckBoxIndicator, QStyleOptionButton(), option.widget).size()
+        rect = QRect(0, 0, size.width(), size.height())
+        rect.moveCenter(option.rect.center())
+        return rect, style
+
+    def paint(self, painter, option, index):
+        # Draw the background/selection without the default left-aligned check
+        self.initStyleOption(option, index)
+        option.features &= ~option.HasCheckIndicator
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, option.widget)
+
+        rect, style = self._indicator_rect(option)
+        button = QStyleOptionButton()
+        button.rect = rect
+        button.state = QStyle.State_Enabled
+        button.state |= QStyle.State_On if index.data(Qt.CheckStateRole) == Qt.Checked else QStyle.State_Off
+        style.drawPrimitive(QStyle.PE_IndicatorCheckBox, button, painter, option.widget)
+
+    def editorEvent(self, event, model, option, index):
+        if not (index.flags() & Qt.ItemIsUserCheckable):
+            return False
+        if event.type() == QEvent.MouseButtonRelease:
+            # The whole cell is the click target, not just the small indicator
+            if event.button() != Qt.LeftButton or not option.rect.contains(event.pos()):
+                return False
+        elif event.type() == QEvent.MouseButtonDblClick:
+            return True  # swallow so a double click does not toggle twice
+        elif event.type() == QEvent.KeyPress:
+            if event.key() not in (Qt.Key_Space, Qt.Key_Select):
+                return False
+        else:
+            return False
+        checked = index.data(Qt.CheckStateRole) == Qt.Checked
+        return model.setData(index, Qt.Unchecked if checked else Qt.Checked, Qt.CheckStateRole)
+
+
+class ProductCompletionModel(QAbstractListModel):
+    """The catalog's matches for what has been typed into a Product # cell.
+
+    Rows are looked up in the catalog's prefix index on every keystroke, so the
+    completer never filters the whole catalog itself.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.catalog = None
+        self._products = []
+
+    def set_prefix(self, prefix):
+        self.beginResetModel()
+        self._products = self.catalog.complete(prefix) if self.catalog is not None else []
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._products)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        product = self._products[index.row()]
+        if role == Qt.DisplayRole:
+            return product.label
+        if role == Qt.EditRole:
+            return product.code
+        return None
+
+
+class ProductNumberDelegate(QStyledItemDelegate):
+    """Product # editor with catalog completions; picking one commits the cell (and so fills the line)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.completions = ProductCompletionModel(self)
+
+    def set_catalog(self, catalog):
+        self.completions.catalog = catalog
+
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        completer = QCompleter(self.completions, editor)
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        completer.setCompletionRole(Qt.EditRole)
+        completer.setMaxVisibleItems(12)
+        editor.setCompleter(completer)
+        editor.textEdited.connect(lambda text: self._show_completions(completer, text))
+        completer.activated[str].connect(lambda _: self._commit(editor))
+        return editor
+
+    def _show_completions(self, completer, text):
+        self.completions.set_prefix(text)
+        if self.completions.rowCount():
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+    def _commit(self, editor):
+        self.commitData.emit(editor)
+        self.closeEditor.emit(editor, QStyledItemDelegate.NoHint)
@@ -0,0 +1,128 @@
+"""Order pricing shared by the order entry screen, order saving and invoices.
+
+All prices are rounded up to the next cent, matching what the invoice has
+always printed. Lines are passed as columns (one sequence per field) so a
+whole order - or a whole campaign of orders - is priced in one pass. NumPy is
+used when it is installed; the pure-Python path gives identical results.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional; pure Python is plenty for a single order
+    np = None
+
+TAX_RATE = 0.09386
+PROCESSING_FEE = 0.50
+
+
+def round_up(value):
+    """Round up to the next cent (ignoring float noise like 30.000000000000004)."""
+    return math.ceil(round(value * 100, 6)) / 100
+
+
+class OrderPricing:
+    """Priced order: per-line totals and discounts plus the order totals."""
+
+    __slots__ = ("line_totals", "line_discounts", "subtotal", "discount_total",
+                 "taxable_subtotal", "tax", "processing_count", "processing", "grand_total")
+
+    def __init__(self, subtotal, discount_total, taxable_subtotal, processing_count,
+                 line_totals=(), line_discounts=()):
+        self.line_totals = line_totals
+        self.line_discounts = line_discounts
+        self.subtotal = round(subtotal, 2)
+        self.discount_total = round(discount_total, 2)
+        self.taxable_subtotal = round(taxable_subtotal, 2)
+        self.tax = round_up(taxable_subtotal * TAX_RATE)
+        self.processing_count = int(processing_count)
+        self.processing = round_up(PROCESSING_FEE * processing_count)
+        self.grand_total = round_up(self.subtotal + self.tax + self.processing)
+
+    def __repr__(self):
+        return (f"OrderPricing(subtotal={self.subtotal:.2f}, discounts={self.discount_total:.2f}, "
+                f"tax={self.tax:.2f}, processing={self.processing:.2f}, grand_total={self.grand_total:.2f})")
+
+
+def price_line(qty, unit_price, reg_price, discount):
+    """Return (line_total, line_discount) for one line. discount is a percentage of reg_price."""
+    unit_discount = reg_price * (discount / 100)
+    line_total = round_up((unit_price - unit_discount) * qty)
+    line_discount = round_up(unit_discount * qty) if discount > 0 else 0.0
+    return line_total, line_discount
+
+
+def price_order(qty, unit_price, reg_price, discount, tax, processing):
+    """Price one order given its lines as columns. tax and processing are per-line flags."""
+    if np is not None:
+        return _price_order_numpy(qty, unit_price, reg_price, discount, tax, processing)
+
+    line_totals, line_discounts = [], []
+    taxable_subtotal = 0.0
+    for q, unit, reg, disc, taxed in zip(qty, unit_price, reg_price, discount, tax):
+        line_total, line_discount = price_line(q, unit, reg, disc)
+        line_totals.append(line_total)
+        line_discounts.append(line_discount)
+        if taxed:
+            taxable_subtotal += line_total
+    return OrderPricing(
+        math.fsum(line_totals), math.fsum(line_discounts), taxable_subtotal,
+        sum(1 for flag in processing if flag), line_totals, line_discounts,
+    )
+
+
+def _round_up_array(values):
+    return np.ceil(np.round(values * 100, 6)) / 100
+
+
+def _line_columns_numpy(qty, unit_price, reg_price, discount):
+    qty = np.asarray(qty, dtype=float)
+    discount = np.asarray(discount, dtype=float)
+    unit_discount = np.asarray(reg_price, dtype=float) * (discount / 100)
+    line_totals = _round_up_array((np.asarray(unit_price, dtype=float) - unit_discount) * qty)
+    line_discounts = np.where(discount > 0, _round_up_array(unit_discount * qty), 0.0)
+    return line_totals, line_discounts
+
+
+def _price_order_numpy(qty, unit_price, reg_price, discount, tax, processing):
+    line_totals, line_discounts = _line_columns_numpy(qty, unit_price, reg_price, discount)
+    taxed = np.asarray(tax, dtype=bool)
+    return OrderPricing(
+        math.fsum(line_totals), math.fsum(line_discounts), math.fsum(line_totals[taxed]),
+        np.count_nonzero(np.asarray(processing, dtype=bool)),
+        line_totals.tolist(), line_discounts.tolist(),
+    )
+
+
+def price_orders(order_keys, qty, unit_price, reg_price, discount, tax, processing):
+    """Price many orders at once, e.g. every line of a campaign.
+
+    order_keys gives the order each line belongs to. Returns {order_key: OrderPricing}
+    (order totals only; per-line values are not kept).
+    """
+    if np is not None:
+        keys, inverse = np.unique(np.asarray(order_keys), return_inverse=True)
+        line_totals, line_discounts = _line_columns_numpy(qty, unit_price, reg_price, discount)
+        taxed = np.asarray(tax, dtype=bool)
+        size = len(keys)
+        subtotals = np.bincount(inverse, weights=line_totals, minlength=size)
+        discounts = np.bincount(inverse, weights=line_discounts, minlength=size)
+        taxable = np.bincount(inverse, weights=np.where(taxed, line_totals, 0.0), minlength=size)
+        processing_counts = np.bincount(inverse, weights=np.asarray(processing, dtype=bool), minlength=size)
+        return {
+            key.item(): OrderPricing(subtotals[i], discounts[i], taxable[i], processing_counts[i])
+            for i, key in enumerate(keys)
+        }
+
+    sums = {}
+    for key, q, unit, reg, disc, taxed, proc in zip(order_keys, qty, unit_price, reg_price,
+                                                    discount, tax, processing):
+        line_total, line_discount = price_line(q, unit, reg, disc)
+        totals = sums.setdefault(key, [0.0, 0.0, 0.0, 0])
+        totals[0] += line_total
+        totals[1] += line_discount
+        if taxed:
+            totals[2] += line_total
+        if proc:
+            totals[3] += 1
+    return {key: OrderPricing(*totals) for key, totals in sums.items()}
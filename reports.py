@@ -0,0 +1,136 @@
+"""Campaign reports: sales, discounts, tax and processing added up in SQL.
+
+Each report is one GROUP BY query. Order-level figures come from the
+breakdown columns saved with every order (orders.subtotal, discount_total,
+tax_total, processing_total); product figures from order_products. The
+idx_orders_campaign index narrows a query to one campaign (or year) before
+anything is grouped, so even ten years of orders report in milliseconds.
+Balances come straight from the customer_balances ledger.
+"""
+from db_utils import get_connection
+
+# Column kinds, used by the Reports window for formatting and sorting. COUNT
+# and MONEY columns are added up in the totals row; NUMBER columns (distinct
+# counts) are not, since their sum means nothing.
+TEXT, NUMBER, COUNT, MONEY = "text", "number", "count", "money"
+
+# What a report is run for: one campaign, one year (or every year), or the
+# customers' accounts as they stand today.
+CAMPAIGN, YEAR, ACCOUNT = "campaign", "year", "account"
+
+
+class Report:
+    """A report's columns and the query that fills them."""
+
+    def __init__(self, title, columns, sql, scope):
+        self.title = title
+        self.columns = columns  # [(header, kind)]
+        self.sql = sql
+        self.scope = scope
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def run(self, campaign_year=None, campaign_number=None):
+        """Return the report's rows.
+
+        CAMPAIGN reports need both arguments; YEAR reports take a year, or
+        None for every year; ACCOUNT reports ignore both.
+        """
+        if self.scope == CAMPAIGN:
+            where, params = "o.campaign_year = ? AND o.campaign_number = ?", (campaign_year, campaign_number)
+        elif self.scope == YEAR and campaign_year is not None:
+            where, params = "o.campaign_year = ?", (campaign_year,)
+        else:
+            where, params = "1", ()
+        cursor = get_connection().cursor()
+        cursor.execute(self.sql.format(where=where), params)
+        return cursor.fetchall()
+
+    def totals(self, rows):
+        """A totals row for rows: sums of the money and count columns, blank elsewhere."""
+        totals = []
+        for i, (_, kind) in enumerate(self.columns):
+            if kind == MONEY:
+                totals.append(round(sum(row[i] or 0 for row in rows), 2))
+            elif kind == COUNT:
+                totals.append(sum(row[i] or 0 for row in rows))
+            else:
+                totals.append("")
+        return totals
+
+
+_ORDER_SUMS = """
+    ROUND(SUM(o.subtotal), 2), ROUND(SUM(o.discount_total), 2), ROUND(SUM(o.tax_total), 2),
+    ROUND(SUM(o.processing_total), 2), ROUND(SUM(o.order_total), 2)
+"""
+_ORDER_SUM_COLUMNS = [
+    ("Sub Total", MONEY), ("Discounts", MONEY), ("Tax", MONEY), ("Processing", MONEY), ("Total Sales", MONEY),
+]
+
+CAMPAIGNS = Report(
+    "By Campaign",
+    [("Year", TEXT), ("Campaign", TEXT), ("Orders", COUNT), ("Customers", NUMBER)] + _ORDER_SUM_COLUMNS,
+    f"""
+        SELECT o.campaign_year, o.campaign_number, COUNT(*), COUNT(DISTINCT o.customer_id), {_ORDER_SUMS}
+        FROM orders o
+        WHERE {{where}}
+        GROUP BY o.campaign_year, o.campaign_number
+        ORDER BY o.campaign_year DESC, o.campaign_number DESC
+    """,
+    scope=YEAR,
+)
+
+CUSTOMERS = Report(
+    "By Customer",
+    [("Customer", TEXT), ("Orders", COUNT)] + _ORDER_SUM_COLUMNS
+    + [("Payments", MONEY), ("Net Due", MONEY)],
+    f"""
+        SELECT IFNULL(c.last_name || ', ' || c.first_name, '(deleted customer)'), COUNT(*), {_ORDER_SUMS},
+               ROUND(SUM(o.payment), 2), ROUND(SUM(o.order_total) - SUM(o.payment), 2)
+        FROM orders o
+        LEFT JOIN customers c ON c.customer_id = o.customer_id
+        WHERE {{where}}
+        GROUP BY o.customer_id
+        ORDER BY SUM(o.order_total) DESC
+    """,
+    scope=CAMPAIGN,
+)
+
+PRODUCTS = Report(
+    "By Product",
+    [("Product #", TEXT), ("Description", TEXT), ("Qty", COUNT), ("Orders", NUMBER),
+     ("Sales", MONEY), ("Discounts", MONEY)],
+    """
+        SELECT p.product_number, MAX(p.description), SUM(p.qty), COUNT(DISTINCT p.order_id),
+               ROUND(SUM(p.total_price), 2), ROUND(SUM(p.line_discount), 2)
+        FROM orders o
+        JOIN order_products p ON p.order_id = o.order_id
+        WHERE {where}
+        GROUP BY p.product_number
+        ORDER BY SUM(p.total_price) DESC
+    """,
+    scope=CAMPAIGN,
+)
+
+BALANCES = Report(
+    "Balances Owed",
+    [("Customer", TEXT), ("Ordered", MONEY), ("Paid", MONEY), ("Balance", MONEY)],
+    """
+        SELECT c.last_name || ', ' || c.first_name, b.total_ordered, b.total_paid, b.balance
+        FROM customer_balances b
+        JOIN customers c ON c.customer_id = b.customer_id
+        WHERE b.balance > 0 AND {where}
+        ORDER BY b.balance DESC
+    """,
+    scope=ACCOUNT,
+)
+
+REPORTS = [CAMPAIGNS, CUSTOMERS, PRODUCTS, BALANCES]
+
+
+def run_report(report, campaign_year=None, campaign_number=None):
+    """(rows, totals) for a report (runs on DbWorker)."""
+    rows = report.run(campaign_year, campaign_number)
+    return rows, report.totals(rows)
@@ -0,0 +1,242 @@
+import logging
+import time
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+from PyQt5.QtGui import QIcon
+from PyQt5.QtWidgets import (
+    QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QComboBox, QSpinBox, QCheckBox,
+    QPushButton, QTableView, QHeaderView, QMessageBox
+)
+
+from db_utils import DATA_VERSION_TABLES, get_current_campaign_settings, with_data_versions
+from db_worker import get_db_worker
+from reports import ACCOUNT, CAMPAIGN, COUNT, MONEY, NUMBER, REPORTS, TEXT, YEAR, run_report
+
+logger = logging.getLogger(__name__)
+
+# Every report reads from these; see ReportsWindow.refresh()
+REPORT_TABLES = DATA_VERSION_TABLES
+
+
+def _format(value, kind):
+    if value is None or value == "":
+        return ""
+    if kind == MONEY:
+        return f"${value:,.2f}"
+    if kind in (COUNT, NUMBER):
+        return f"{int(value):,}"
+    return str(value)
+
+
+def _timed_report(report, campaign_year, campaign_number):
+    """run_report() plus how long it took (runs on DbWorker)."""
+    started = time.perf_counter()
+    rows, totals = run_report(report, campaign_year, campaign_number)
+    return rows, totals, time.perf_counter() - started
+
+
+class ReportTableModel(QAbstractTableModel):
+    """Read-only rows of one report; UserRole gives the raw value for sorting."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._columns = []
+        self._rows = []
+
+    def set_report(self, report, rows):
+        self.beginResetModel()
+        self._columns = report.columns
+        self._rows = rows
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        value = self._rows[index.row()][index.column()]
+        kind = self._columns[index.column()][1]
+        if role == Qt.DisplayRole:
+            return _format(value, kind)
+        if role == Qt.UserRole:
+            return value if value is not None else ""
+        if role == Qt.TextAlignmentRole and kind != TEXT:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+
+class ReportsWindow(QMainWindow):
+    """Campaign, customer and product totals and balances owed, recalculated as the selection changes."""
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Reports")
+        self.setGeometry(250, 250, 900, 550)
+        self.setWindowIcon(QIcon("Avon256.png"))
+        self.db = get_db_worker()
+        self.shown_report = None
+        self.current_campaign = None  # (year, campaign) the spin boxes were last set to
+        self.data_versions = None  # as of the last report run
+        self.init_ui()
+        self.db.submit(
+            self, get_current_campaign_settings, name="campaign_settings",
+            on_result=self.show_current_campaign,
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to load the current campaign: {e}"),
+        )
+
+    def refresh(self):
+        """Called when the window is opened again: rerun the report only if the campaign or its data changed."""
+        self.db.submit(
+            self, with_data_versions, REPORT_TABLES, get_current_campaign_settings, name="campaign_settings",
+            on_result=self._check_for_changes,
+            on_error=lambda e: QMessageBox.critical(self, "Error", f"Failed to load the current campaign: {e}"),
+        )
+
+    def _check_for_changes(self, result):
+        data_versions, settings = result
+        if tuple(settings) != self.current_campaign:
+            self.show_current_campaign(settings)
+        elif data_versions != self.data_versions:
+            self.run_report()
+
+    def init_ui(self):
+        layout = QVBoxLayout()
+
+        title_label = QLabel("Reports", self)
+        title_label.setStyleSheet("font-size: 24px; font-weight: bold; background-color: blue; color: white; padding: 10px;")
+        title_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(title_label)
+
+        controls = QHBoxLayout()
+        self.report_combo = QComboBox()
+        for report in REPORTS:
+            self.report_combo.addItem(report.title, report)
+        self.year_label = QLabel("Year:")
+        self.year_spin = QSpinBox()
+        self.year_spin.setRange(2000, 2100)
+        self.all_years_check = QCheckBox("All Years")
+        self.campaign_label = QLabel("Campaign:")
+        self.campaign_spin = QSpinBox()
+        self.campaign_spin.setRange(1, 30)
+        self.btn_refresh = QPushButton("Refresh")
+
+        controls.addWidget(QLabel("Report:"))
+        controls.addWidget(self.report_combo)
+        controls.addWidget(self.year_label)
+        controls.addWidget(self.year_spin)
+        controls.addWidget(self.all_years_check)
+        controls.addWidget(self.campaign_label)
+        controls.addWidget(self.campaign_spin)
+        controls.addStretch()
+        controls.addWidget(self.btn_refresh)
+        layout.addLayout(controls)
+
+        self.report_model = ReportTableModel(self)
+        self.sort_model = QSortFilterProxyModel(self)
+        self.sort_model.setSourceModel(self.report_model)
+        self.sort_model.setSortRole(Qt.UserRole)
+        self.report_table = QTableView()
+        self.report_table.setModel(self.sort_model)
+        self.report_table.setSortingEnabled(True)
+        self._unsort()
+        self.report_table.setAlternatingRowColors(True)
+        self.report_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.report_table.setSelectionBehavior(QTableView.SelectRows)
+        self.report_table.verticalHeader().setVisible(False)
+        self.report_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.report_table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.report_table)
+
+        self.totals_label = QLabel("")
+        self.totals_label.setWordWrap(True)
+        self.totals_label.setStyleSheet("font-weight: bold; padding: 4px;")
+        layout.addWidget(self.totals_label)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        btn_close = QPushButton("Close")
+        btn_close.clicked.connect(self.close)
+        layout.addWidget(btn_close)
+
+        central_widget = QWidget()
+        central_widget.setLayout(layout)
+        self.setCentralWidget(central_widget)
+
+        self.report_combo.currentIndexChanged.connect(self.run_report)
+        self.year_spin.valueChanged.connect(self.run_report)
+        self.all_years_check.toggled.connect(self.run_report)
+        self.campaign_spin.valueChanged.connect(self.run_report)
+        self.btn_refresh.clicked.connect(self.run_report)
+
+    def show_current_campaign(self, settings):
+        year, campaign = self.current_campaign = tuple(settings)
+        for spin, value in ((self.year_spin, year), (self.campaign_spin, campaign)):
+            spin.blockSignals(True)
+            spin.setValue(value)
+            spin.blockSignals(False)
+        self.run_report()
+
+    def current_report(self):
+        return self.report_combo.currentData()
+
+    def run_report(self):
+        """Recalculate the selected report in the background; a newer selection replaces a running one."""
+        report = self.current_report()
+        self.year_label.setVisible(report.scope != ACCOUNT)
+        self.year_spin.setVisible(report.scope != ACCOUNT)
+        self.all_years_check.setVisible(report.scope == YEAR)
+        self.campaign_label.setVisible(report.scope == CAMPAIGN)
+        self.campaign_spin.setVisible(report.scope == CAMPAIGN)
+        all_years = report.scope == YEAR and self.all_years_check.isChecked()
+        self.year_spin.setEnabled(not all_years)
+
+        year = None if all_years or report.scope == ACCOUNT else self.year_spin.value()
+        campaign = self.campaign_spin.value() if report.scope == CAMPAIGN else None
+        self.status_label.setText("Calculating...")
+        self.db.submit(
+            self, with_data_versions, REPORT_TABLES, _timed_report, report, year, campaign, name="report",
+            on_result=lambda result: self._report_ready(report, year, campaign, *result),
+            on_error=self._report_failed,
+        )
+
+    def _report_ready(self, report, year, campaign, data_versions, result):
+        self.data_versions = data_versions
+        self.show_report(report, year, campaign, *result)
+
+    def _unsort(self):
+        # Back to the report's own order until a column header is clicked
+        self.report_table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.sort_model.sort(-1)
+
+    def show_report(self, report, year, campaign, rows, totals, elapsed):
+        self.report_table.setUpdatesEnabled(False)
+        if report is not self.shown_report:
+            self._unsort()
+            self.shown_report = report
+        self.report_model.set_report(report, rows)
+        self.report_table.setUpdatesEnabled(True)
+
+        parts = [f"{header}: {_format(value, kind)}"
+                 for (header, kind), value in zip(report.columns, totals) if value != ""]
+        self.totals_label.setText("Totals - " + "   ".join(parts) if rows else "")
+        if report.scope == CAMPAIGN:
+            scope = f"campaign {campaign} of {year}"
+        elif report.scope == ACCOUNT:
+            scope = "all customers"
+        else:
+            scope = "all years" if year is None else str(year)
+        self.status_label.setText(f"{len(rows)} rows for {scope} in {elapsed * 1000:.0f} ms")
+        logger.info("report %s scope=%s rows=%d elapsed_ms=%.1f", report.title, scope, len(rows), elapsed * 1000)
+
+    def _report_failed(self, error):
+        self.status_label.setText("")
+        QMessageBox.critical(self, "Error", f"Failed to run the report: {error}")
@@ -0,0 +1,184 @@
+"""settings.conf, read once and kept in memory.
+
+Every value is parsed on first use and cached with the type of its default,
+so checking the theme or the rep info never touches the disk after startup.
+Changes are written atomically - a temporary file renamed over settings.conf
+- so a crash mid-save cannot leave a half-written file behind.
+
+Code subscribes to the keys it depends on and is called back when one
+changes, e.g. to restyle the app when dark mode is switched on:
+
+    get_settings().subscribe(apply_theme, DARK_MODE)
+
+Subscribers are held weakly, so a closed window is simply forgotten.
+Callbacks run on the thread that made the change.
+"""
+import configparser
+import logging
+import os
+import tempfile
+import threading
+import weakref
+
+from config import SETTINGS_FILE
+
+logger = logging.getLogger(__name__)
+
+# (section, key) of settings read in more than one place
+DARK_MODE = ("Appearance", "dark_mode")
+
+_TRUE = {"1", "yes", "true", "on"}
+
+
+def _parse(text, default):
+    if isinstance(default, bool):
+        return text.strip().lower() in _TRUE
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(text)
+        except ValueError:
+            return default
+    return text
+
+
+def _format(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class Settings:
+    """An INI settings file with a typed in-memory cache and change notifications."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._config = None  # ConfigParser, loaded on first use
+        self._values = {}  # (section, key, type of default) -> parsed value
+        self._subscribers = []  # [(weak reference to callback, set of (section, key) or None for all)]
+
+    def _loaded(self):
+        if self._config is None:
+            config = configparser.ConfigParser()
+            try:
+                config.read(self.path, encoding="utf-8")
+            except configparser.Error:
+                logger.exception("unreadable settings file %s; using defaults", self.path)
+                config = configparser.ConfigParser()
+            self._config = config
+        return self._config
+
+    def reload(self):
+        """Forget everything cached and read the file again on next use."""
+        with self._lock:
+            self._config = None
+            self._values.clear()
+
+    def get(self, section, key, default=None):
+        """The value of section/key, parsed to the type of default; default if it is not set."""
+        cache_key = (section, key, type(default))
+        with self._lock:
+            try:
+                return self._values[cache_key]
+            except KeyError:
+                pass
+            text = self._loaded().get(section, key, fallback=None)
+            value = default if text is None else _parse(text, default)
+            self._values[cache_key] = value
+            return value
+
+    def get_section(self, section):
+        """Every key of a section as {key: text}; empty if the section is missing."""
+        with self._lock:
+            config = self._loaded()
+            return dict(config[section]) if config.has_section(section) else {}
+
+    def set(self, section, key, value):
+        """Change one setting, save the file and notify subscribers."""
+        self.update(section, {key: value})
+
+    def update(self, section, values):
+        """Change several settings of one section in a single save; subscribers hear about each change."""
+        changed = []
+        with self._lock:
+            config = self._loaded()
+            if not config.has_section(section):
+                config.add_section(section)
+            for key, value in values.items():
+                text = _format(value)
+                if config.get(section, key, fallback=None) != text:
+                    config.set(section, key, text)
+                    changed.append((section, key))
+            if not changed:
+                return
+            self._write(config)
+            for cache_key in [cache_key for cache_key in self._values if cache_key[:2] in changed]:
+                del self._values[cache_key]
+        self._notify(changed)
+
+    def _write(self, config):
+        folder = os.path.dirname(self.path) or "."
+        fd, temp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=folder)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                config.write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    # --- Notifications ---
+
+    def subscribe(self, callback, *keys):
+        """Call callback() whenever one of keys ((section, key) pairs) changes; any change if none are given."""
+        reference = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else weakref.ref(callback)
+        with self._lock:
+            self._subscribers.append((reference, set(keys) or None))
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [(reference, keys) for reference, keys in self._subscribers
+                                 if reference() not in (None, callback)]
+
+    def _notify(self, changed):
+        with self._lock:
+            self._subscribers = [(reference, keys) for reference, keys in self._subscribers
+                                 if reference() is not None]
+            callbacks = [reference() for reference, keys in self._subscribers
+                         if keys is None or keys.intersection(changed)]
+        for callback in callbacks:
+            if callback is None:
+                continue
+            try:
+                callback()
+            except RuntimeError:
+                # A window whose Qt object is already gone; it is dropped next time
+                logger.debug("settings subscriber %r no longer available", callback)
+            except Exception:
+                logger.exception("settings subscriber %r failed", callback)
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    """The app's shared Settings for settings.conf."""
+    global _settings
+    with _settings_lock:
+        if _settings is None:
+            _settings = Settings(SETTINGS_FILE)
+        return _settings
+
+
+def is_dark_mode_enabled():
+    return get_settings().get(*DARK_MODE, False)
+
+
+def set_dark_mode(enabled):
+    get_settings().set(*DARK_MODE, bool(enabled))
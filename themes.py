@@ -0,0 +1,155 @@
+"""App-wide stylesheets, one per theme, set once on the QApplication.
+
+Each theme is a set of colours filled into one stylesheet template. A theme's
+stylesheet is built the first time it is used and applied to the whole
+application, so windows opened later are styled from the copy Qt has already
+parsed instead of each parsing their own. Switching theme just sets the other
+stylesheet; Qt restyles the open windows in place.
+
+Rules meant for one window are scoped by its objectName, e.g. #mainMenu.
+install() applies the theme from settings.conf and follows dark mode as it
+is switched on and off.
+"""
+import logging
+from string import Template
+
+from PyQt5.QtWidgets import QApplication
+
+from settings import DARK_MODE, get_settings, is_dark_mode_enabled
+
+logger = logging.getLogger(__name__)
+
+LIGHT = "light"
+DARK = "dark"
+
+_MAIN_MENU = Template("""
+    QMainWindow#mainMenu {
+        background-color: $menu_background;
+    }
+
+    #mainMenu QLabel#titleLabel {
+        font-size: 24px;
+        font-weight: bold;
+        color: white;
+        background-color: #2f80ed;
+        padding: 12px;
+    }
+
+    #mainMenu QLabel#dbLabel {
+        background-color: $db_background;
+        border: 1px solid $db_border;
+        padding: 8px;
+        color: $db_text;
+        font-weight: 500;
+    }
+
+    #mainMenu QPushButton {
+        background-color: $menu_button;
+        color: white;
+        padding: 10px;
+        font-size: 16px;
+        border: $menu_button_border;
+        border-radius: 5px;
+    }
+
+    #mainMenu QPushButton:hover {
+        background-color: $menu_button_hover;
+    }
+
+    #mainMenu QPushButton#exitButton {
+        background-color: $exit_button;
+    }
+
+    #mainMenu QPushButton#exitButton:hover {
+        background-color: $exit_button_hover;
+    }
+""")
+
+# Every other window keeps the native look in the light theme
+_DARK_WINDOWS = """
+    QWidget {
+        background-color: #121212;
+        color: #f0f0f0;
+    }
+    QPushButton {
+        background-color: #2c3e50;
+        color: white;
+        padding: 6px;
+    }
+    QLineEdit, QSpinBox, QDoubleSpinBox, QComboBox, QTreeView, QTableView {
+        background-color: #1e1e1e;
+        color: white;
+        border: 1px solid #333;
+    }
+    QTreeView::item {
+        color: #f0f0f0;
+    }
+    QLabel, QRadioButton, QCheckBox {
+        color: #f0f0f0;
+    }
+    QHeaderView::section {
+        background-color: #2c3e50;
+        color: white;
+        padding: 4px;
+        border: 1px solid #444;
+    }
+"""
+
+
+class Theme:
+    """A named set of colours and the app stylesheet built from them."""
+
+    def __init__(self, name, colors, window_rules=""):
+        self.name = name
+        self.colors = colors
+        self.window_rules = window_rules
+        self._stylesheet = None
+
+    @property
+    def stylesheet(self):
+        """The whole app's stylesheet, built on first use."""
+        if self._stylesheet is None:
+            self._stylesheet = self.window_rules + _MAIN_MENU.substitute(self.colors)
+        return self._stylesheet
+
+
+THEMES = {
+    LIGHT: Theme(LIGHT, {
+        "menu_background": "#f5f7fa",
+        "db_background": "#fff3cd", "db_border": "#ffeeba", "db_text": "#856404",
+        "menu_button": "#2d9cdb", "menu_button_border": "none", "menu_button_hover": "#1b7fc3",
+        "exit_button": "#e74c3c", "exit_button_hover": "#c0392b",
+    }),
+    DARK: Theme(DARK, {
+        "menu_background": "#121212",
+        "db_background": "#2d2d2d", "db_border": "#444", "db_text": "#e0e0e0",
+        "menu_button": "#3a3f44", "menu_button_border": "1px solid #555", "menu_button_hover": "#50565c",
+        "exit_button": "#c0392b", "exit_button_hover": "#96281b",
+    }, _DARK_WINDOWS),
+}
+
+_current = None
+
+
+def current_theme_name():
+    """The theme settings.conf asks for."""
+    return DARK if is_dark_mode_enabled() else LIGHT
+
+
+def apply_theme(name=None):
+    """Style the whole app with a theme (the one from settings.conf if name is None)."""
+    global _current
+    app = QApplication.instance()
+    if app is None:
+        return
+    theme = THEMES[name or current_theme_name()]
+    if theme is not _current:
+        app.setStyleSheet(theme.stylesheet)
+        _current = theme
+        logger.debug("theme %s applied", theme.name)
+
+
+def install():
+    """Apply the theme from settings.conf and switch themes whenever dark mode changes."""
+    apply_theme()
+    get_settings().subscribe(apply_theme, DARK_MODE)
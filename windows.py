@@ -0,0 +1,39 @@
+"""Keeps the app's top-level windows between openings.
+
+Closing a window only hides it. Opening it again shows the same window - its
+widgets, models and whatever was on screen - and calls its refresh(), which
+checks the data_versions counters and reloads only what changed while it was
+hidden. Only the first opening pays for building the window.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WindowManager:
+    """One instance of each window class, built on first use and shown again after that."""
+
+    def __init__(self):
+        self._windows = {}  # window class -> window
+
+    def open(self, window_class):
+        """Show the window_class window, building it the first time; returns the window."""
+        window = self._windows.get(window_class)
+        if window is None:
+            window = self._windows[window_class] = window_class()
+            logger.debug("window %s built", window_class.__name__)
+        else:
+            refresh = getattr(window, "refresh", None)
+            if refresh is not None:
+                refresh()
+        if window.isMinimized():
+            window.showNormal()
+        else:
+            window.show()
+        window.raise_()
+        window.activateWindow()
+        return window
+
+    def get(self, window_class):
+        """The window_class window if it has been opened, else None."""
+        return self._windows.get(window_class)